@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Compare cold doctor invocations against commands forwarded to `doctor serve`.
+
+Usage:
+  python bench_serve.py [--runs N] [--uv] [--json]
+
+Runs in a temporary directory with a fresh session. Cold runs start a new
+interpreter per command (optionally through `uv run`); warm runs go through
+the stdlib-only forwarding client.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+INCLUDE_DIR = Path(__file__).resolve().parent.parent / "include"
+COMMANDS = (
+    ["status"],
+    ["symptom", "benchmark symptom", "--category", "performance"],
+    ["grep", "doctor", "--count-only"],
+)
+
+
+def timed(cmd: list[str], cwd: str) -> float:
+    """Run cmd and return wall time in milliseconds."""
+    start = time.perf_counter()
+    subprocess.run(cmd, cwd=cwd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return (time.perf_counter() - start) * 1000
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    """Median, p90 and mean of samples in milliseconds."""
+    ordered = sorted(samples)
+    return {
+        "median_ms": round(statistics.median(ordered), 2),
+        "p90_ms": round(ordered[int(0.9 * (len(ordered) - 1))], 2),
+        "mean_ms": round(statistics.fmean(ordered), 2),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20, help="Invocations per command and mode")
+    parser.add_argument("--uv", action="store_true", help="Run cold commands through 'uv run'")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    cli = str(INCLUDE_DIR / "doctor_cli.py")
+    client = str(INCLUDE_DIR / "doctor_server.py")
+    cold_prefix = ["uv", "run", "--project", str(INCLUDE_DIR), "python", cli] if args.uv else [sys.executable, cli]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        subprocess.run([sys.executable, cli, "init"], cwd=tmp, check=True, stdout=subprocess.DEVNULL)
+        server = subprocess.Popen([sys.executable, cli, "serve"], cwd=tmp, stdout=subprocess.PIPE, text=True)
+        try:
+            server.stdout.readline()  # "serving: ..."
+            for command in COMMANDS:
+                cold = [timed(cold_prefix + command, tmp) for _ in range(args.runs)]
+                warm = [timed([sys.executable, client] + command, tmp) for _ in range(args.runs)]
+                results[" ".join(command[:1])] = {"cold": summarize(cold), "warm": summarize(warm)}
+        finally:
+            subprocess.run([sys.executable, cli, "serve", "--stop"], cwd=tmp, stdout=subprocess.DEVNULL)
+            server.wait(timeout=10)
+
+    if args.json:
+        print(json.dumps({"runs": args.runs, "uv": args.uv, "cpus": os.cpu_count(), "results": results}, indent=2))
+        return 0
+
+    print(f"{'command':<10} {'cold median':>12} {'warm median':>12} {'speedup':>8}")
+    for name, r in results.items():
+        cold, warm = r["cold"]["median_ms"], r["warm"]["median_ms"]
+        print(f"{name:<10} {cold:>10.1f}ms {warm:>10.1f}ms {cold / warm:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Cold-start regression check for the light doctor commands.
+
+Usage:
+  python coldstart.py [--runs N] [--max-ratio R] [--bundle FILE] [--json]
+
+Runs help, validate, status and clean --dry-run in a temporary directory
+with a fresh session, each in a new interpreter, directly and (when it has
+been built) through dist/doctor.pyz. Commands are timed in interleaved
+rounds and compared by their medians, so load on the machine affects them
+alike. Fails when:
+  - a light command imports yaml, doctor_parse or asyncio, or status
+    imports argparse (checked with python -X importtime), or
+  - status costs more than --max-ratio of what `help` costs from the same
+    entry point, both measured above a bare `python -c pass`. The budget
+    is relative to the CLI's own start-up, so it holds on slower and
+    faster machines; argparse alone is too cheap to time reliably, which
+    is why the fast path itself is checked by its imports.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+SCRIPT_DIR = Path(__file__).resolve().parent.parent
+INCLUDE_DIR = SCRIPT_DIR / "include"
+DEFAULT_BUNDLE = SCRIPT_DIR / "dist" / "doctor.pyz"
+LIGHT_COMMANDS = (["help"], ["validate"], ["status"], ["clean", "--dry-run"])
+HEAVY_MODULES = ("yaml", "doctor_parse", "asyncio")
+# Further modules a command must not import to keep its fast path
+FAST_PATH_MODULES = {"status": ("argparse",)}
+DEFAULT_MAX_RATIO = 1.0
+
+
+def timed(cmd: list[str], cwd: str) -> float:
+    """Run cmd and return wall time in milliseconds."""
+    start = time.perf_counter()
+    subprocess.run(cmd, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return (time.perf_counter() - start) * 1000
+
+
+def median_ms(cmds: dict[str, list[str]], cwd: str, runs: int) -> dict[str, float]:
+    """
+    Median wall time of each command over runs interleaved rounds, after
+    one warm-up each for the bytecode cache.
+    """
+    for cmd in cmds.values():
+        timed(cmd, cwd)
+    samples: dict[str, list[float]] = {name: [] for name in cmds}
+    for _ in range(runs):
+        for name, cmd in cmds.items():
+            samples[name].append(timed(cmd, cwd))
+    return {name: round(statistics.median(times), 2) for name, times in samples.items()}
+
+
+def heavy_imports(cmd: list[str], cwd: str, modules: tuple[str, ...]) -> list[str]:
+    """Those of modules that cmd imports, from -X importtime output."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime"] + cmd[1:], cwd=cwd, capture_output=True, text=True
+    )
+    loaded = {line.rsplit("|", 1)[-1].strip() for line in proc.stderr.splitlines() if line.startswith("import time:")}
+    return [m for m in modules if m in loaded]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=15, help="Invocations per command")
+    parser.add_argument("--max-ratio", type=float, default=DEFAULT_MAX_RATIO, help=f"status start-up budget as a fraction of help's (default {DEFAULT_MAX_RATIO:g})")
+    parser.add_argument("--bundle", type=Path, default=DEFAULT_BUNDLE, help="Zipapp to measure as well, if it exists")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    entries = {"direct": [sys.executable, str(INCLUDE_DIR / "doctor_cli.py")]}
+    if args.bundle.is_file():
+        entries["bundle"] = [sys.executable, str(args.bundle)]
+
+    failures = []
+    results: dict[str, dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        subprocess.run(entries["direct"] + ["init"], cwd=tmp, check=True, stdout=subprocess.DEVNULL)
+        subprocess.run(entries["direct"] + ["symptom", "cold start"], cwd=tmp, check=True, stdout=subprocess.DEVNULL)
+        baseline = median_ms({"pass": [sys.executable, "-c", "pass"]}, tmp, args.runs)["pass"]
+
+        for entry, prefix in entries.items():
+            results[entry] = median_ms({" ".join(c): prefix + c for c in LIGHT_COMMANDS}, tmp, args.runs)
+            for command in LIGHT_COMMANDS:
+                modules = HEAVY_MODULES + FAST_PATH_MODULES.get(" ".join(command), ())
+                loaded = heavy_imports(prefix + command, tmp, modules)
+                if loaded:
+                    failures.append(f"{entry} {' '.join(command)} imports {', '.join(loaded)}")
+            ratio = (results[entry]["status"] - baseline) / max(results[entry]["help"] - baseline, 1.0)
+            if ratio > args.max_ratio:
+                failures.append(f"{entry} status costs {ratio:.2f} of help's start-up (budget {args.max_ratio:g})")
+
+    if args.json:
+        print(json.dumps({"runs": args.runs, "baseline_ms": baseline, "results": results, "failures": failures}, indent=2))
+    else:
+        print(f"python -c pass: {baseline:.1f}ms")
+        print(f"{'command':<16}" + "".join(f"{entry:>12}" for entry in results))
+        for command in LIGHT_COMMANDS:
+            name = " ".join(command)
+            print(f"{name:<16}" + "".join(f"{results[entry][name]:>10.1f}ms" for entry in results))
+        ratios = [(results[entry]["status"] - baseline) / max(results[entry]["help"] - baseline, 1.0) for entry in results]
+        print(f"{'status / help':<16}" + "".join(f"{ratio:>12.2f}" for ratio in ratios))
+        for failure in failures:
+            print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Check that the trigram index never hides a match: every pattern must find
+the same files through the index as through a full scan, both right after
+`index build` and after files are edited or added without an update.
+
+Usage:
+  python index_check.py
+
+Exits non-zero and names the pattern when the two disagree.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+
+INCLUDE_DIR = Path(__file__).resolve().parent.parent / "include"
+
+FILES = {
+    "src/a.py": "hello world\nabcxyz\n",
+    "src/b.py": "nothing here\n",
+    "src/d.py": "xyz only\n",
+    "src/e.py": "foobarbaz\n",
+    "src/f.py": "grep -n pattern\n",
+    "src/i.py": "x = foo_bar\n",
+    "src/j.py": "]yzw\n",
+    "src/l.py": "qabcd\n",
+}
+# (pattern, file to append it to or create after the build)
+PATTERNS = [
+    ("hello", "src/b.py"),
+    (r"\(abc\)*xyz", "src/c.py"),
+    (r"\(foo\)\?barbaz", "src/b.py"),
+    (r"\(a\(bcd\)*\)efg", "src/g.py"),
+    (r"[ab]\?xyz", "src/b.py"),
+    (r"x\{2\}yzw", "src/h.py"),
+    ("foo*bar", "src/b.py"),
+    ("[[:alpha:]]oo_bar", "src/b.py"),
+    ("[]x]yzw", "src/k.py"),
+    ("[^]x]abcd", "src/b.py"),
+]
+# A line each pattern matches, written by the stale phase
+STALE_LINES = {
+    "hello": "hello again",
+    r"\(abc\)*xyz": "xyz",
+    r"\(foo\)\?barbaz": "barbaz",
+    r"\(a\(bcd\)*\)efg": "aefg",
+    r"[ab]\?xyz": "xyz",
+    r"x\{2\}yzw": "xxyzw",
+    "foo*bar": "fobar",
+    "[[:alpha:]]oo_bar": "zoo_bar",
+    "[]x]yzw": "xyzw",
+    "[^]x]abcd": "zabcd",
+}
+
+
+def main() -> int:
+    sys.path.insert(0, str(INCLUDE_DIR))
+    from doctor_index import TrigramIndex
+    from doctor_search import search_tree
+
+    failures = []
+    prev = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            for rel, content in FILES.items():
+                Path(rel).parent.mkdir(parents=True, exist_ok=True)
+                Path(rel).write_text(content, encoding="utf-8")
+            index = TrigramIndex(Path(".doctor/index"), ".")
+            index.build()
+
+            def compare(phase: str) -> None:
+                for pattern, _ in PATTERNS:
+                    full = [r[0] for r in search_tree(pattern, ".", mode="walk")]
+                    files = index.candidates(pattern, ".", mode="walk")
+                    narrowed = [r[0] for r in search_tree(pattern, ".", files=files, mode="walk")]
+                    if narrowed != full:
+                        failures.append(f"{phase}: {pattern!r} found {narrowed} through the index, {full} by a scan")
+
+            compare("fresh")
+            for pattern, rel in PATTERNS:
+                with open(rel, "a", encoding="utf-8") as f:
+                    f.write(STALE_LINES[pattern] + "\n")
+            compare("stale")
+        finally:
+            os.chdir(prev)
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    print(f"{len(PATTERNS) * 2 - len(failures)}/{len(PATTERNS) * 2} checks passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
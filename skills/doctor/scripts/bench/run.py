@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Benchmark the doctor hot paths on synthetic repositories and sessions.
+
+Usage:
+  python run.py [--sizes 1000,10000,100000] [--sessions 10,100,1000,10000]
+                [--repeat N] [--out FILE]
+
+Each measurement runs in a fresh interpreter so peak RSS and syscall
+counts belong to that operation alone. surface_cold drops the directory
+manifest first; surface runs with it warm. Per operation the JSON report has:
+  wall_ms     time spent in the operation (median of --repeat runs)
+  process_ms  whole child process, including interpreter start and imports
+  peak_rss_kb maximum resident set size of the child
+  syscr/syscw read and write syscalls issued by the operation (Linux only)
+
+Everything runs offline; synthetic trees are generated under a temporary
+directory with a fixed seed so runs are comparable across commits.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+INCLUDE_DIR = Path(__file__).resolve().parent.parent / "include"
+SEARCH_TERM = "connection timeout"
+EXTENSIONS = (".py", ".py", ".ts", ".md", ".yaml", ".json", ".txt")
+FILES_PER_DIR = 20
+DIRS_PER_DIR = 8
+
+REPO_OPS = ("surface_cold", "surface", "grep", "save_evidence")
+SESSION_OPS = ("load_session", "save_session", "add_symptom", "generate_treatment")
+
+
+def make_repo(root: Path, n_files: int, seed: int = 0) -> None:
+    """Write n_files small text files in a nested tree, some containing SEARCH_TERM."""
+    rng = random.Random(seed)
+    words = ["request", "handler", "retry", "pool", "config", "cache", "error", "client", "socket", "queue"]
+
+    dirs = [root]
+    for i in range(1, -(-n_files // FILES_PER_DIR)):
+        directory = dirs[(i - 1) // DIRS_PER_DIR] / f"d{i}"
+        directory.mkdir()
+        dirs.append(directory)
+
+    for i in range(n_files):
+        lines = []
+        for _ in range(rng.randint(10, 80)):
+            line = " ".join(rng.choice(words) for _ in range(rng.randint(3, 12)))
+            if rng.random() < 0.01:
+                line += f" {SEARCH_TERM}"
+            lines.append(line)
+        path = dirs[i // FILES_PER_DIR] / f"f{i}{rng.choice(EXTENSIONS)}"
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def _io_counters() -> dict[str, int]:
+    """Read syscall counters for this process, or {} where /proc is missing."""
+    try:
+        text = Path("/proc/self/io").read_text(encoding="ascii")
+    except OSError:
+        return {}
+    counters = dict(line.split(": ") for line in text.splitlines())
+    return {key: int(counters[key]) for key in ("syscr", "syscw")}
+
+
+def child(op: str, workdir: str, size: int) -> dict:
+    """Run one operation in this process and report its cost."""
+    os.chdir(workdir)
+    sys.path.insert(0, str(INCLUDE_DIR))
+    import doctor_parse as dp
+
+    # Unmeasured setup: cold caches and the inputs the operation needs
+    state = None
+    if op == "surface_cold":
+        dp.MANIFEST_FILE.unlink(missing_ok=True)
+    elif op == "save_evidence":
+        shutil.rmtree(dp.EVIDENCE_DIR, ignore_errors=True)
+        state = dp.grep_search(SEARCH_TERM, max_matches=None)
+    elif op == "save_session":
+        state = dp.load_session()
+
+    ops = {
+        "surface_cold": lambda: dp.surface_scan(),
+        "surface": lambda: dp.surface_scan(),
+        "grep": lambda: dp.grep_search(SEARCH_TERM),
+        "save_evidence": lambda: dp.save_evidence(SEARCH_TERM, *state),
+        "load_session": lambda: dp.load_session(),
+        "save_session": lambda: dp.save_session(state),
+        "add_symptom": lambda: dp.add_symptom("benchmark symptom", "performance"),
+        "generate_treatment": lambda: dp.generate_treatment(
+            {"summary": "pool exhaustion", "confidence": 80},
+            [{"name": f"option {i}", "steps": [f"step {j}" for j in range(5)]} for i in range(size // 10 + 1)],
+        ),
+    }
+
+    before = _io_counters()
+    start = time.perf_counter()
+    ops[op]()
+    wall_ms = (time.perf_counter() - start) * 1000
+    after = _io_counters()
+
+    result = {"wall_ms": round(wall_ms, 3), "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+    result.update({key: after[key] - before[key] for key in after})
+    return result
+
+
+def measure(op: str, workdir: str, size: int, repeat: int) -> dict:
+    """Run op in fresh child processes and keep the median run."""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, __file__, "--child", op, workdir, str(size)],
+            check=True,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        run = json.loads(proc.stdout)
+        run["process_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        runs.append(run)
+    runs.sort(key=lambda r: r["wall_ms"])
+    result = dict(runs[len(runs) // 2])
+    if repeat > 1:
+        result["wall_ms_spread"] = [runs[0]["wall_ms"], runs[-1]["wall_ms"]]
+        result["wall_ms_mean"] = round(statistics.fmean(r["wall_ms"] for r in runs), 3)
+    return result
+
+
+def make_session(workdir: str, n: int) -> None:
+    """Initialize a session holding n symptoms and n hypotheses."""
+    script = (
+        "import sys; sys.path.insert(0, sys.argv[1]);"
+        "import doctor_parse as dp;"
+        "s = dp.init_session('bench');"
+        "n = int(sys.argv[2]);"
+        "s['symptoms'] = [{'description': f'symptom {i}', 'category': 'performance', 'evidence': ''} for i in range(n)];"
+        "s['hypotheses'] = [{'description': f'hypothesis {i}', 'confidence': i % 100, 'evidence_for': [],"
+        " 'evidence_against': [], 'falsifiable_by': ''} for i in range(n)];"
+        "dp.save_session(s)"
+    )
+    subprocess.run([sys.executable, "-c", script, str(INCLUDE_DIR), str(n)], cwd=workdir, check=True)
+
+
+def _git_commit() -> str | None:
+    """Current commit of the checkout, if git is available."""
+    try:
+        proc = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=INCLUDE_DIR,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+    except OSError:
+        return None
+    return proc.stdout.strip() or None
+
+
+def _int_list(value: str) -> list[int]:
+    """Parse a comma separated list of integers."""
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main() -> int:
+    if len(sys.argv) == 5 and sys.argv[1] == "--child":
+        print(json.dumps(child(sys.argv[2], sys.argv[3], int(sys.argv[4]))))
+        return 0
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=_int_list, default=[1000, 10000, 100000], help="Repository sizes in files")
+    parser.add_argument("--sessions", type=_int_list, default=[10, 100, 1000, 10000], help="Session sizes in entries")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the median is kept")
+    parser.add_argument("--out", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "repeat": args.repeat,
+        "repos": {},
+        "sessions": {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            workdir = Path(tmp, f"repo{size}")
+            workdir.mkdir()
+            print(f"repo: {size} files", file=sys.stderr)
+            make_repo(workdir, size)
+            make_session(str(workdir), 0)
+            report["repos"][size] = {op: measure(op, str(workdir), size, args.repeat) for op in REPO_OPS}
+
+        for n in args.sessions:
+            workdir = Path(tmp, f"session{n}")
+            workdir.mkdir()
+            print(f"session: {n} entries", file=sys.stderr)
+            make_session(str(workdir), n)
+            report["sessions"][n] = {op: measure(op, str(workdir), n, args.repeat) for op in SESSION_OPS}
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Fire N parallel `doctor symptom` commands at one session and check that
+every one of them was recorded.
+
+Usage:
+  python stress_session.py [-n N]
+
+Exits non-zero if any symptom was lost or the session failed to load.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+INCLUDE_DIR = Path(__file__).resolve().parent.parent / "include"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=50, help="Parallel symptom commands")
+    args = parser.parse_args()
+
+    cli = str(INCLUDE_DIR / "doctor_cli.py")
+    with tempfile.TemporaryDirectory() as tmp:
+        subprocess.run([sys.executable, cli, "init"], cwd=tmp, check=True, stdout=subprocess.DEVNULL)
+
+        def add(i: int) -> int:
+            cmd = [sys.executable, cli, "symptom", f"stress symptom {i}"]
+            return subprocess.run(cmd, cwd=tmp, stdout=subprocess.DEVNULL).returncode
+
+        with ThreadPoolExecutor(max_workers=args.n) as pool:
+            failures = sum(1 for code in pool.map(add, range(args.n)) if code != 0)
+
+        sys.path.insert(0, str(INCLUDE_DIR))
+        from doctor_parse import load_session
+
+        prev = os.getcwd()
+        os.chdir(tmp)
+        try:
+            session = load_session() or {}
+        finally:
+            os.chdir(prev)
+        recorded = {s["description"] for s in session.get("symptoms", [])}
+        missing = [i for i in range(args.n) if f"stress symptom {i}" not in recorded]
+
+    print(f"commands: {args.n}")
+    print(f"failed: {failures}")
+    print(f"recorded: {len(recorded)}")
+    if failures or missing:
+        print(f"missing: {missing}")
+        return 1
+    print("ok: all symptoms recorded")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Build dist/doctor.pyz, a single-file zipapp of the doctor CLI.
+
+Usage:
+  python build_bundle.py [--out FILE]
+
+The archive holds include/*.py and the pure-Python part of the PyYAML
+installed in the building interpreter (the libyaml extension cannot load
+from a zip; the bundle uses PyYAML's Python loader instead). Each module is
+stored with a .pyc compiled by this interpreter, so the same Python version
+skips compilation at start-up; other versions fall back to the sources.
+skill.sh runs the bundle with plain python3, without uv, while it is newer
+than every file in include/.
+"""
+
+import argparse
+import importlib.util
+import marshal
+import sys
+import time
+import zipfile
+from pathlib import Path
+
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+INCLUDE_DIR = SCRIPT_DIR / "include"
+DEFAULT_OUT = SCRIPT_DIR / "dist" / "doctor.pyz"
+
+MAIN = """\
+import sys
+
+import doctor_cli
+
+sys.exit(doctor_cli.main())
+"""
+
+
+def _pyc(source: str, name: str) -> bytes:
+    """Unchecked-hash .pyc for source, as zipimport reads next to the .py."""
+    code = compile(source, name, "exec", dont_inherit=True)
+    flags = (1).to_bytes(4, "little")  # hash-based, not checked against the source
+    return importlib.util.MAGIC_NUMBER + flags + bytes(8) + marshal.dumps(code)
+
+
+def _add(zf: zipfile.ZipFile, arcname: str, source: str) -> None:
+    """Store a module's source and compiled form."""
+    zf.writestr(arcname, source)
+    zf.writestr(arcname + "c", _pyc(source, arcname))
+
+
+def build(out: Path) -> int:
+    """Write the bundle to out. Returns the number of modules stored."""
+    try:
+        import yaml
+    except ImportError:
+        print("error: PyYAML is not installed in this interpreter", file=sys.stderr)
+        return 0
+    yaml_dir = Path(yaml.__file__).parent
+
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(out.name + ".tmp")
+    count = 0
+    with open(tmp, "wb") as f:
+        f.write(b"#!/usr/bin/env python3\n")
+        with zipfile.ZipFile(f, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("__main__.py", MAIN)
+            for path in sorted(INCLUDE_DIR.glob("*.py")):
+                _add(zf, path.name, path.read_text(encoding="utf-8"))
+                count += 1
+            for path in sorted(yaml_dir.glob("*.py")):
+                _add(zf, f"yaml/{path.name}", path.read_text(encoding="utf-8"))
+                count += 1
+    tmp.chmod(0o755)
+    tmp.replace(out)
+    return count
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", type=Path, default=DEFAULT_OUT, help=f"Output file (default {DEFAULT_OUT})")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    count = build(args.out)
+    if not count:
+        return 1
+    size = args.out.stat().st_size
+    print(f"built: {args.out} ({count} modules, {size // 1024} KiB, python {sys.version_info[0]}.{sys.version_info[1]}) "
+          f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""LRU result cache for repeated doctor queries."""
+
+import gzip
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+from doctor_search import EXCLUDE_DIRS, iter_files
+
+
+INDEX_NAME = "index.json"
+CACHE_MAX_ENTRIES = 256
+CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+
+def _git_dir(path: str) -> str | None:
+    """Find the .git directory for path by walking up."""
+    current = os.path.abspath(path)
+    while True:
+        candidate = os.path.join(current, ".git")
+        if os.path.isdir(candidate):
+            return candidate
+        parent = os.path.dirname(current)
+        if parent == current:
+            return None
+        current = parent
+
+
+def _git_state(path: str) -> list[Any]:
+    """HEAD contents plus the identity of the ref and the git index, without running git."""
+    git_dir = _git_dir(path)
+    if git_dir is None:
+        return []
+    state: list[Any] = []
+    try:
+        head = Path(git_dir, "HEAD").read_text(encoding="utf-8").strip()
+    except OSError:
+        return []
+    state.append(head)
+    files = ["index"]
+    if head.startswith("ref: "):
+        files.append(head[5:])
+    for name in files:
+        try:
+            st = os.stat(os.path.join(git_dir, name))
+            state.append((name, st.st_mtime_ns, st.st_size))
+        except OSError:
+            state.append((name, None))
+    return state
+
+
+def tree_fingerprint(
+    path: str = ".",
+    exclude_dirs: tuple[str, ...] = EXCLUDE_DIRS,
+    files: list[str] | None = None,
+) -> str:
+    """
+    Fingerprint of the files a search would read: each file's path, mtime
+    and size (catching added, removed and renamed files as well as in-place
+    edits) plus git HEAD and index state. Files are stat'ed, never read.
+    Pass the listing the search will use (e.g. from git); without one the
+    tree under path is walked.
+    """
+    if files is None:
+        files = list(iter_files(path, exclude_dirs=exclude_dirs))
+    digest = hashlib.sha256()
+    digest.update(json.dumps(_git_state(path)).encode("utf-8"))
+    for file in files:
+        try:
+            st = os.stat(file)
+            digest.update(f"{file}\0{st.st_mtime_ns}\0{st.st_size}\n".encode("utf-8", "surrogateescape"))
+        except OSError:
+            digest.update(f"{file}\0\n".encode("utf-8", "surrogateescape"))
+    return digest.hexdigest()[:16]
+
+
+def file_stats(files: list[str]) -> list[list[Any]]:
+    """Record (file, mtime, size) for files a cached result depends on."""
+    stats = []
+    for file in files:
+        try:
+            st = os.stat(file)
+            stats.append([file, st.st_mtime_ns, st.st_size])
+        except OSError:
+            stats.append([file, None, None])
+    return stats
+
+
+class QueryCache:
+    """
+    Query results stored as compressed JSON under one directory, with an
+    index tracking size and recency. Least recently used entries are evicted
+    once the entry or byte cap is exceeded.
+    """
+
+    def __init__(self, cache_dir: Path, max_entries: int = CACHE_MAX_ENTRIES, max_bytes: int = CACHE_MAX_BYTES) -> None:
+        self.cache_dir = cache_dir
+        self.index_file = cache_dir / INDEX_NAME
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.meta = self._load_meta()
+
+    def _load_meta(self) -> dict[str, Any]:
+        """Read the cache index, tolerating a missing or corrupt file."""
+        try:
+            meta = json.loads(self.index_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            meta = {}
+        meta.setdefault("entries", {})
+        meta.setdefault("hits", 0)
+        meta.setdefault("misses", 0)
+        meta.setdefault("clock", 0)
+        return meta
+
+    def _save_meta(self) -> None:
+        """Write the cache index atomically."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.index_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.meta), encoding="utf-8")
+        os.replace(tmp, self.index_file)
+
+    @staticmethod
+    def key(*parts: Any) -> str:
+        """Derive a cache key from query parameters."""
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()[:24]
+
+    def _tick(self) -> int:
+        """Advance the logical clock used for recency."""
+        self.meta["clock"] += 1
+        return self.meta["clock"]
+
+    def get(self, key: str, fingerprint: str) -> Any | None:
+        """
+        Return the cached value if its fingerprint matches and none of the
+        files it depends on changed; otherwise count a miss.
+        """
+        entry = self.meta["entries"].get(key)
+        value = None
+        if entry is not None and entry["fingerprint"] == fingerprint:
+            try:
+                record = json.loads(gzip.decompress((self.cache_dir / f"{key}.json.gz").read_bytes()))
+            except (OSError, ValueError):
+                record = None
+            if record is not None and file_stats([f for f, _, _ in record["files"]]) == record["files"]:
+                value = record["value"]
+
+        if value is None:
+            self.meta["misses"] += 1
+            if entry is not None:
+                self._drop(key)
+        else:
+            self.meta["hits"] += 1
+            entry["hits"] += 1
+            entry["last_used"] = self._tick()
+        self._save_meta()
+        return value
+
+    def put(self, key: str, fingerprint: str, value: Any, files: list[str]) -> None:
+        """Store value, then evict least recently used entries over the caps."""
+        record = {"value": value, "files": file_stats(files)}
+        data = gzip.compress(json.dumps(record).encode("utf-8"), mtime=0)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        (self.cache_dir / f"{key}.json.gz").write_bytes(data)
+        self.meta["entries"][key] = {
+            "fingerprint": fingerprint,
+            "size": len(data),
+            "hits": 0,
+            "last_used": self._tick(),
+        }
+        self._evict()
+        self._save_meta()
+
+    def _drop(self, key: str) -> None:
+        """Remove one entry and its data file."""
+        self.meta["entries"].pop(key, None)
+        (self.cache_dir / f"{key}.json.gz").unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until both caps hold."""
+        entries = self.meta["entries"]
+        by_age = sorted(entries, key=lambda k: entries[k]["last_used"])
+        total = sum(e["size"] for e in entries.values())
+        for key in by_age:
+            if len(entries) <= self.max_entries and total <= self.max_bytes:
+                break
+            total -= entries[key]["size"]
+            self._drop(key)
+
+    def stats(self) -> dict[str, int]:
+        """Entry count, bytes on disk, hits and misses."""
+        entries = self.meta["entries"]
+        return {
+            "entries": len(entries),
+            "bytes": sum(e["size"] for e in entries.values()),
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.meta["hits"],
+            "misses": self.meta["misses"],
+        }
+
+    def clear(self) -> int:
+        """Remove every entry and reset counters. Returns entries removed."""
+        removed = len(self.meta["entries"])
+        for key in list(self.meta["entries"]):
+            self._drop(key)
+        self.meta = {"entries": {}, "hits": 0, "misses": 0, "clock": 0}
+        self._save_meta()
+        return removed
@@ -0,0 +1,161 @@
+"""Cached file classification that keeps binary, minified and generated files out of searches."""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+from doctor_search import BINARY_SNIFF_BYTES
+
+
+CLASSIFY_VERSION = 2
+# Bytes read from the head of a file to classify it.
+CLASSIFY_SNIFF_BYTES = 16 * 1024
+# Head size below which line lengths say nothing about minification.
+MINIFIED_MIN_HEAD = 2048
+# Average or longest line length (bytes) in the head that marks a file as minified.
+MINIFIED_AVG_LINE = 300
+MINIFIED_MAX_LINE = 5000
+# Data files (JSON, CSV, ...) at least this big are treated as fixtures.
+FIXTURE_MIN_SIZE = 1024 * 1024
+# Bytes at the top of a file searched for a generated-file marker.
+GENERATED_HEAD = 1024
+
+TEXT = "text"
+BINARY = "binary"
+# Verdicts searched only with include_generated; binaries are never searched.
+SKIPPABLE = ("generated", "minified", "lockfile", "data")
+
+LOCKFILES = frozenset({
+    "package-lock.json", "npm-shrinkwrap.json", "yarn.lock", "pnpm-lock.yaml", "bun.lockb",
+    "poetry.lock", "Pipfile.lock", "pdm.lock", "uv.lock", "Cargo.lock", "Gemfile.lock",
+    "composer.lock", "go.sum", "mix.lock", "pubspec.lock", "packages.lock.json", "flake.lock",
+})
+# Only code and bundle files are judged minified by their line lengths; logs
+# and other data often have long lines and are what a search is for.
+MINIFIED_EXTENSIONS = frozenset({".js", ".mjs", ".cjs", ".css", ".json", ".map"})
+MINIFIED_SUFFIXES = (".min.js", ".min.mjs", ".min.css", ".js.map", ".css.map")
+GENERATED_SUFFIXES = ("_pb2.py", "_pb2_grpc.py", ".pb.go", ".pb.cc", ".pb.h", ".g.dart", ".designer.cs")
+DATA_EXTENSIONS = frozenset({".json", ".jsonl", ".ndjson", ".geojson", ".csv", ".tsv", ".xml", ".svg"})
+GENERATED_MARKERS = (
+    b"@generated", b"do not edit", b"code generated", b"autogenerated", b"auto-generated",
+    b"automatically generated",
+)
+
+_SAVE_LOCK = threading.Lock()
+
+
+def classify(path: str, size: int) -> str:
+    """
+    Verdict for one file of the given size: "text", "binary", or one of
+    SKIPPABLE. Names decide lockfiles and conventional minified or
+    generated outputs without a read; otherwise only the head of the file
+    is read: NUL bytes mean binary, a generated-file marker near the top
+    means generated, and very long lines in a code or bundle file
+    (MINIFIED_EXTENSIONS) mean minified.
+    """
+    name = os.path.basename(path)
+    lower = name.lower()
+    if name in LOCKFILES:
+        return "lockfile"
+    if lower.endswith(MINIFIED_SUFFIXES):
+        return "minified"
+    if lower.endswith(GENERATED_SUFFIXES):
+        return "generated"
+    if size == 0:
+        return TEXT
+    try:
+        with open(path, "rb") as f:
+            head = f.read(CLASSIFY_SNIFF_BYTES)
+    except OSError:
+        return TEXT
+    if b"\0" in head[:BINARY_SNIFF_BYTES]:
+        return BINARY
+    top = head[:GENERATED_HEAD].lower()
+    if any(marker in top for marker in GENERATED_MARKERS):
+        return "generated"
+    ext = os.path.splitext(lower)[1]
+    if ext in MINIFIED_EXTENSIONS and len(head) >= MINIFIED_MIN_HEAD:
+        lines = head.split(b"\n")
+        # The last line may be cut by the sniff; it still counts toward the longest
+        if len(head) / len(lines) > MINIFIED_AVG_LINE or max(map(len, lines)) > MINIFIED_MAX_LINE:
+            return "minified"
+    if size >= FIXTURE_MIN_SIZE and ext in DATA_EXTENSIONS:
+        return "data"
+    return TEXT
+
+
+class FileClassifier:
+    """
+    Verdicts keyed by absolute path, each with the (mtime, size) it was
+    taken at, so unchanged files are never re-read to be classified again.
+    A search calls keep() from its worker threads as it reaches each file.
+    """
+
+    def __init__(self, classify_file: Path) -> None:
+        self.classify_file = classify_file
+        self.files: dict[str, list[Any]] = {}
+        self.fresh: dict[str, list[Any]] = {}
+        # Files dropped by keep(), per verdict
+        self.skipped: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, classify_file: Path) -> "FileClassifier":
+        """Load verdicts from disk; a missing or stale file yields an empty classifier."""
+        classifier = cls(classify_file)
+        try:
+            data = json.loads(classify_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return classifier
+        if data.get("version") == CLASSIFY_VERSION:
+            classifier.files = data.get("files", {})
+        return classifier
+
+    def save(self) -> None:
+        """
+        Merge this run's new verdicts into the file on disk and write it
+        atomically, so searches of several roots at once keep each other's
+        verdicts.
+        """
+        # A copy, as scans abandoned at a deadline may still add verdicts
+        fresh = dict(self.fresh)
+        if not fresh:
+            return
+        with _SAVE_LOCK:
+            files = FileClassifier.load(self.classify_file).files
+            files.update(fresh)
+            self.classify_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.classify_file.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_text(json.dumps({"version": CLASSIFY_VERSION, "files": files}), encoding="utf-8")
+            os.replace(tmp, self.classify_file)
+        self.files = files
+        self.fresh = {}
+
+    def verdict(self, path: str) -> str:
+        """Cached verdict for path, classifying it when new or changed since."""
+        full = os.path.abspath(path)
+        try:
+            st = os.stat(full)
+        except OSError:
+            return TEXT
+        entry = self.fresh.get(full) or self.files.get(full)
+        if entry is not None and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            return entry[2]
+        verdict = classify(full, st.st_size)
+        self.fresh[full] = [st.st_mtime_ns, st.st_size, verdict]
+        return verdict
+
+    def keep(self, path: str, include_generated: bool = False) -> bool:
+        """
+        True if the file is worth searching. Binaries are always dropped; the
+        SKIPPABLE verdicts are dropped unless include_generated. Dropped
+        files are counted per verdict in skipped.
+        """
+        verdict = self.verdict(path)
+        if verdict == TEXT or (include_generated and verdict != BINARY):
+            return True
+        with self._lock:
+            self.skipped[verdict] = self.skipped.get(verdict, 0) + 1
+        return False
@@ -1,30 +1,40 @@
 #!/usr/bin/env python3
 """Doctor CLI - Diagnostic skill with parameterized subjectivity."""
 
-import argparse
+from __future__ import annotations
+
+import os
 import sys
+import time
+from datetime import datetime
 from pathlib import Path
+from typing import TYPE_CHECKING
+
+# Taken before the doctor modules load, for the "import" phase. Commands import
+# doctor_parse (and PyYAML) themselves, so light ones never pay for it.
+_IMPORT_START = time.perf_counter()
+_IMPORT_START_NS = time.time_ns()
+
+import doctor_trace
+from doctor_config import DOCTOR_DIR, GREP_MATCH_LIMIT, LOG_LEVELS, RECALL_LIMIT, SESSION_FILE, TRACE_DIR, WATCH_DEBOUNCE
+
+if TYPE_CHECKING:
+    import argparse
 
-from doctor_parse import (
-    DOCTOR_DIR,
-    add_hypothesis,
-    add_symptom,
-    clean_doctor,
-    generate_treatment,
-    get_status,
-    grep_search,
-    init_session,
-    load_session,
-    save_evidence,
-    session_exists,
-    set_diagnosis,
-    surface_scan,
-)
+    from doctor_search import SearchProgress
+
+_import_span: tuple[float, float] | None = (_IMPORT_START, time.perf_counter())
 
 
 def cmd_status(args: argparse.Namespace) -> int:
     """Show current session status."""
-    status = get_status()
+    from doctor_status import fast_status
+
+    # The status.json sidecar answers without PyYAML while it matches the session
+    status = fast_status()
+    if status is None:
+        from doctor_parse import get_status
+        status = get_status()
     
     if not status.get("exists"):
         print("no active session")
@@ -44,28 +54,48 @@ def cmd_status(args: argparse.Namespace) -> int:
 
 def cmd_init(args: argparse.Namespace) -> int:
     """Initialize a new diagnosis session."""
+    from doctor_parse import clean_doctor, init_session, session_exists
+
     if session_exists() and not args.force:
         print("error: session already exists", file=sys.stderr)
         print("use --force to overwrite", file=sys.stderr)
         return 1
     
     if session_exists() and args.force:
+        if args.archive and not _archive():
+            return 1
         clean_doctor()
     
+    missing = [root for root in args.roots or [] if not os.path.isdir(root)]
+    if missing:
+        print(f"error: not a directory: {', '.join(missing)}", file=sys.stderr)
+        return 1
+    
     patient = args.patient or ""
-    session = init_session(patient)
+    session = init_session(patient, args.roots)
     print(f"created: {DOCTOR_DIR}")
     print(f"patient: {session['patient']}")
     print(f"status: {session['status']}")
+    if session.get("roots"):
+        print(f"roots: {', '.join(session['roots'])}")
     return 0
 
 
 def cmd_surface(args: argparse.Namespace) -> int:
     """Scan for relevant files (deterministic globbing)."""
+    from doctor_parse import surface_scan
+
     patterns = args.patterns if args.patterns else None
     path = args.path or "."
+    roots = _search_roots(args)
+    if roots:
+        return _surface_roots(patterns, roots, _listing_mode(args))
     
-    files = surface_scan(patterns, path)
+    try:
+        files = surface_scan(patterns, path, _listing_mode(args))
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
     
     if not files:
         print("no files found")
@@ -81,36 +111,570 @@ def cmd_surface(args: argparse.Namespace) -> int:
     return 0
 
 
+def _surface_roots(patterns: list[str] | None, roots: list[str], mode: str) -> int:
+    """Scan several repositories at once and list files with repo-qualified paths."""
+    from doctor_parse import surface_scan_roots
+
+    results = surface_scan_roots(patterns, roots, mode)
+    files = [_qualify(r, f) for r in results for f in r.get("files", [])]
+    print(f"found {len(files)} files in {len(roots)} roots:")
+    for r in results:
+        print(f"  {r['root']}: " + (f"error: {r['error']}" if "error" in r else f"{len(r['files'])} files"))
+    
+    if files:
+        print()
+    for f in files[:50]:
+        print(f"  {f}")
+    if len(files) > 50:
+        print(f"  ... and {len(files) - 50} more")
+    
+    return 1 if all("error" in r for r in results) else 0
+
+
+def _search_roots(args: argparse.Namespace) -> list[str] | None:
+    """Repositories to fan out over: --root, else the session's roots unless --path was given."""
+    if args.roots:
+        return args.roots
+    if args.path:
+        return None
+    from doctor_parse import session_roots
+    return session_roots() or None
+
+
+def _qualify(result: dict, file: str) -> str:
+    """A path from one root's results as label:path-within-the-root."""
+    return f"{result['root']}:{os.path.relpath(file, result['path'])}"
+
+
+def _listing_mode(args: argparse.Namespace) -> str:
+    """Map --git / --no-git to a file listing mode."""
+    if args.git:
+        return "git"
+    return "walk" if args.no_git else "auto"
+
+
+def _grep_terms(args: argparse.Namespace) -> list[str]:
+    """Collect search terms from the positional term, --term and --terms-file."""
+    terms = [args.term] if args.term is not None else []
+    terms.extend(args.terms or [])
+    if args.terms_file:
+        for line in Path(args.terms_file).read_text(encoding="utf-8").splitlines():
+            line = line.strip()
+            if line and not line.startswith("#"):
+                terms.append(line)
+    return list(dict.fromkeys(terms))
+
+
+def _print_matches(matches: list[dict], count: int) -> None:
+    """Print a match summary and the first 20 matches."""
+    if count == 0:
+        print("no matches found")
+        return
+    
+    print(f"found {count} matches:" if matches else f"found {count} matches")
+    shown = matches[:20]
+    for m in shown:
+        score = f" [{m['score']:.2f}]" if "score" in m else f" [{m['kind']}]" if "kind" in m else ""
+        print(f"  {m['file']}:{m['line']}{score} — {m['content'][:60]}")
+    
+    if shown and count > len(shown):
+        print(f"  ... and {count - len(shown)} more")
+
+
+def _print_groups(groups: list[dict], count: int) -> None:
+    """Print context blocks grouped by file for the first 20 matches."""
+    print(f"found {count} matches in {len(groups)} files:")
+    shown = 0
+    for group in groups:
+        if shown >= 20:
+            break
+        ranges = ", ".join(f"{b['start']}-{b['end']}" for b in group["blocks"])
+        print(f"  {group['file']} ({group['count']} matches, lines {ranges})")
+        matched = set(group["lines"])
+        for block in group["blocks"]:
+            for offset, line in enumerate(block["lines"]):
+                lineno = block["start"] + offset
+                marker = ">" if lineno in matched else " "
+                print(f"    {marker} {lineno:>5} | {line[:160]}")
+            print("    --")
+        shown += len(group["lines"])
+    
+    if count > shown:
+        print(f"  ... and {count - shown} more")
+
+
 def cmd_grep(args: argparse.Namespace) -> int:
     """Search for term (parameterized determinism)."""
-    term = args.term
+    from doctor_search import SearchProgress
+    from doctor_parse import (
+        grep_search_cached,
+        grep_search_grouped,
+        grep_search_ranked,
+        save_evidence,
+    )
+
+    if args.define or args.refs:
+        return _grep_symbol(args)
+    try:
+        terms = _grep_terms(args)
+    except OSError as e:
+        print(f"error: cannot read terms file: {e}", file=sys.stderr)
+        return 1
+    if not terms:
+        print("error: no search term given", file=sys.stderr)
+        return 1
+    
     path = args.path or "."
     file_type = args.type or ""
+    if args.count_only:
+        max_matches = 0
+    elif args.max_matches is not None:
+        max_matches = args.max_matches
+    else:
+        # Evidence keeps the full match set
+        max_matches = None if args.save else GREP_MATCH_LIMIT
+    
+    mode = _listing_mode(args)
+    context = max(0, args.context or 0)
+    roots = _search_roots(args)
+    if roots:
+        if len(terms) > 1 or args.rank:
+            print("error: searching several roots supports a single term, without --rank", file=sys.stderr)
+            return 1
+        return _grep_roots(
+            terms[0], roots, file_type, max_matches, args.save, mode, context, args.timeout, args.no_cache,
+            args.include_generated,
+        )
+    if len(terms) > 1:
+        if context or args.rank:
+            print("error: --context and --rank support a single search term", file=sys.stderr)
+            return 1
+        return _grep_many(terms, path, file_type, max_matches, args.save, mode, args.timeout, args.include_generated)
+    if context and args.rank:
+        print("error: --context and --rank cannot be combined", file=sys.stderr)
+        return 1
     
+    term = terms[0]
     print(f"searching: '{term}'")
-    matches, count = grep_search(term, path, file_type)
+    # Always tracked, so Ctrl-C returns what was found instead of a traceback
+    progress = SearchProgress(args.timeout)
+    try:
+        if args.rank:
+            # Scores depend on the session and file mtimes, so ranked results are not cached
+            matches, count = grep_search_ranked(term, path, file_type, max_matches, mode, progress, args.include_generated)
+            groups, cached = [], False
+        elif args.no_cache:
+            matches, count, groups = grep_search_grouped(
+                term, path, file_type, max_matches, mode, context, progress, args.include_generated
+            )
+            cached = False
+        else:
+            matches, count, groups, cached = grep_search_cached(
+                term, path, file_type, max_matches, mode, context, progress, args.include_generated
+            )
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
     
-    if not matches:
-        print("no matches found")
+    if cached:
+        print("cache: hit")
+    if context and matches:
+        _print_groups(groups, count)
+    else:
+        _print_matches(matches, count)
+    _print_partial(progress)
+    _print_skipped(progress)
+    if count == 0:
         return 0
     
-    print(f"found {count} matches:")
-    for m in matches[:20]:
-        print(f"  {m['file']}:{m['line']} — {m['content'][:60]}")
-    
-    if count > 20:
-        print(f"  ... and {count - 20} more")
-    
     # Save evidence
     if args.save:
-        filename = save_evidence(term, matches, count)
-        print(f"\nevidence saved: .doctor/evidence/{filename}")
+        key = save_evidence(term, matches, count, path, file_type, groups if context else None)
+        print(f"\nevidence saved: {key}")
+        print(f"view: doctor evidence show {key}")
+        if progress.partial:
+            print("note: evidence holds a partial result")
+    
+    return 0
+
+
+def _grep_symbol(args: argparse.Namespace) -> int:
+    """Answer grep --def / --refs from the symbol table."""
+    from doctor_parse import find_symbol, save_evidence
+
+    if args.term or args.terms or args.terms_file or args.roots or args.rank or args.context:
+        print("error: --def and --refs take the name alone, without search terms, --root, --rank or --context", file=sys.stderr)
+        return 1
+    name = args.define or args.refs
+    what = "definitions" if args.define else "references"
+    path = args.path or "."
+    file_type = args.type or ""
+    if args.count_only:
+        max_matches = 0
+    elif args.max_matches is not None:
+        max_matches = args.max_matches
+    else:
+        max_matches = None if args.save else GREP_MATCH_LIMIT
+    
+    print(f"{what} of '{name}'")
+    matches, count = find_symbol(name, bool(args.refs), path, file_type, max_matches)
+    _print_matches(matches, count)
+    
+    if args.save and count:
+        key = save_evidence(f"{'--def' if args.define else '--refs'} {name}", matches, count, path, file_type)
+        print(f"\nevidence saved: {key}")
+        print(f"view: doctor evidence show {key}")
+    return 0
+
+
+def _print_partial(progress: SearchProgress) -> None:
+    """Say when a search stopped early, so a short result is not read as complete."""
+    if not progress.partial:
+        return
+    remaining = progress.remaining
+    left = "unknown" if remaining is None else str(remaining)
+    print(f"\npartial: {progress.stopped} after {progress.scanned} files, {left} remaining")
+
+
+def _skipped_note(progress: SearchProgress) -> str:
+    """Files classification kept out of a search, e.g. "3 minified, 1 lockfile"; binaries are not mentioned."""
+    return ", ".join(f"{n} {verdict}" for verdict, n in sorted(progress.skipped.items()) if verdict != "binary")
+
+
+def _print_skipped(progress: SearchProgress) -> None:
+    """Say when generated-looking files were left out, so a missing match can be found with --include-generated."""
+    note = _skipped_note(progress)
+    if note:
+        print(f"\nskipped: {note} (search them with --include-generated)")
+
+
+def _grep_roots(
+    term: str,
+    roots: list[str],
+    file_type: str,
+    max_matches: int | None,
+    save: bool,
+    mode: str,
+    context: int,
+    timeout: float | None,
+    no_cache: bool,
+    include_generated: bool = False,
+) -> int:
+    """Search several repositories at once; print each root's matches as it finishes, then per-root counts."""
+    from doctor_parse import grep_search_roots, save_evidence_roots
+
+    print(f"searching: '{term}' in {len(roots)} roots")
+
+    def report(r: dict) -> dict:
+        # Printed as each root finishes; matches are only held on for --save
+        if r.get("count"):
+            print(f"\n[{r['root']}] {r['path']}")
+            if context and r["matches"]:
+                groups = [dict(g, file=_qualify(r, g["file"])) for g in r["groups"]]
+                _print_groups(groups, r["count"])
+            else:
+                _print_matches([dict(m, file=_qualify(r, m["file"])) for m in r["matches"]], r["count"])
+            _print_partial(r["progress"])
+            sys.stdout.flush()
+        if save:
+            return r
+        return {k: v for k, v in r.items() if k not in ("matches", "groups")}
+
+    results = grep_search_roots(
+        term, roots, file_type, max_matches, mode, context, timeout, cached=not no_cache,
+        include_generated=include_generated, on_result=report,
+    )
+    
+    total = sum(r.get("count", 0) for r in results)
+    print(f"\nfound {total} matches:")
+    for r in results:
+        if "error" in r:
+            print(f"  {r['root']}: error: {r['error']}")
+            continue
+        notes = ["cached"] if r["cached"] else []
+        if r["progress"].partial:
+            notes.append(f"partial: {r['progress'].stopped}")
+        if _skipped_note(r["progress"]):
+            notes.append(f"skipped {_skipped_note(r['progress'])}")
+        print(f"  {r['root']}: {r['count']} matches" + (f" ({', '.join(notes)})" if notes else ""))
+    
+    if save and total:
+        keys = save_evidence_roots(term, results, file_type, bool(context))
+        print()
+        for label, key in keys.items():
+            print(f"evidence saved: {key} ({label})")
+        if any(r["progress"].partial for r in results if r.get("count")):
+            print("note: evidence holds a partial result")
+    
+    return 1 if all("error" in r for r in results) else 0
+
+
+def _grep_many(
+    terms: list[str],
+    path: str,
+    file_type: str,
+    max_matches: int | None,
+    save: bool,
+    mode: str,
+    timeout: float | None = None,
+    include_generated: bool = False,
+) -> int:
+    """Search several terms in a single tree pass."""
+    from doctor_search import SearchProgress
+    from doctor_parse import grep_search_many, save_evidence_many
+
+    print(f"searching {len(terms)} terms")
+    progress = SearchProgress(timeout)
+    try:
+        results = grep_search_many(terms, path, file_type, max_matches, mode, progress, include_generated)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    
+    for term, (matches, count) in results.items():
+        print(f"\n[{term}]")
+        _print_matches(matches, count)
+    _print_partial(progress)
+    _print_skipped(progress)
+    
+    if save:
+        found = {term: result for term, result in results.items() if result[1] > 0}
+        keys = save_evidence_many(found, path, file_type)
+        if keys:
+            print()
+        for term, key in keys.items():
+            print(f"evidence saved: {key} ({term})")
+    
+    return 0
+
+
+def cmd_run(args: argparse.Namespace) -> int:
+    """Run the operations of a plan file concurrently."""
+    import asyncio
+    
+    from doctor_plan import DEFAULT_CONCURRENCY, load_plan, run_plan
+    
+    try:
+        operations, concurrency = load_plan(args.plan)
+    except (OSError, ValueError) as e:
+        print(f"error: cannot load plan: {e}", file=sys.stderr)
+        return 1
+    concurrency = args.concurrency or concurrency or DEFAULT_CONCURRENCY
+    if concurrency < 1:
+        print("error: --concurrency must be at least 1", file=sys.stderr)
+        return 1
+    
+    print(f"running {len(operations)} operations, {concurrency} at a time")
+    start = time.perf_counter()
+    results = asyncio.run(run_plan(operations, concurrency))
+    elapsed = time.perf_counter() - start
+    
+    failed = 0
+    for n, (op, result) in enumerate(zip(operations, results), 1):
+        label = f"grep '{op['term']}'" if op["op"] == "grep" else op["op"]
+        print(f"\n[{n}] {label} ({result['ms']:.0f} ms)")
+        if "error" in result:
+            failed += 1
+            print(f"error: {result['error']}")
+        elif op["op"] == "surface":
+            files = result["files"]
+            print(f"found {len(files)} files" if files else "no files found")
+        else:
+            _print_matches(result["matches"], result["count"])
+            _print_partial(result["progress"])
+            if result["evidence"]:
+                print(f"evidence saved: {result['evidence']}")
+    
+    print(f"\ndone: {len(operations) - failed} ok, {failed} failed in {elapsed:.2f}s")
+    return 1 if failed else 0
+
+
+def cmd_watch(args: argparse.Namespace) -> int:
+    """Keep the search index and manifest current until interrupted."""
+    import signal
+
+    from doctor_parse import watch_tree
+
+    def report(update: dict) -> None:
+        action = update["action"]
+        if action == "build":
+            print(f"indexed: {update['files']} files")
+        elif action == "sync":
+            print(f"synced: {update['changed']} changed, {update['removed']} removed ({update['files']} files)")
+        elif action == "watch":
+            print(f"watching {args.path or '.'} ({update['watcher']}); Ctrl-C to stop")
+        elif update["changed"] or update["removed"] or update["relisted"]:
+            print(
+                f"updated: {update['changed']} changed, {update['removed']} removed, "
+                f"{update['relisted']} dirs relisted in {update['ms']:.0f} ms ({update['files']} files)"
+            )
+        sys.stdout.flush()
+    
+    def interrupt(signum: int, frame: object) -> None:
+        raise KeyboardInterrupt
     
+    # Stop cleanly on kill too, as when started in the background with 'doctor watch &'
+    signal.signal(signal.SIGTERM, interrupt)
+    watch_tree(args.path or ".", report, args.debounce, args.poll)
+    print("stopped")
+    return 0
+
+
+def cmd_cache(args: argparse.Namespace) -> int:
+    """Show query cache statistics or clear the cache."""
+    from doctor_parse import cache_stats, clear_cache
+
+    if args.action == "clear":
+        removed = clear_cache()
+        print(f"cleared: {removed} entries")
+        return 0
+    
+    stats = cache_stats()
+    lookups = stats["hits"] + stats["misses"]
+    hit_rate = f"{100 * stats['hits'] / lookups:.0f}%" if lookups else "n/a"
+    print(f"entries: {stats['entries']}/{stats['max_entries']}")
+    print(f"size: {stats['bytes']}/{stats['max_bytes']} bytes")
+    print(f"hits: {stats['hits']}")
+    print(f"misses: {stats['misses']}")
+    print(f"hit rate: {hit_rate}")
+    return 0
+
+
+def cmd_evidence(args: argparse.Namespace) -> int:
+    """List or render stored evidence."""
+    from doctor_parse import list_evidence, render_evidence
+
+    if args.action == "show":
+        if not args.key:
+            print("error: evidence key required", file=sys.stderr)
+            return 1
+        content = render_evidence(args.key)
+        if content is None:
+            print(f"error: no evidence matching '{args.key}'", file=sys.stderr)
+            return 1
+        print(content, end="")
+        return 0
+    
+    index = list_evidence()
+    if not index:
+        print("no evidence saved")
+        return 0
+    for key, entry in index.items():
+        where = entry["path"] + (f" *.{entry['type']}" if entry["type"] else "")
+        print(f"  {key}  {entry['count']:>6} matches  '{entry['term']}'  {where}")
+    return 0
+
+
+def cmd_logs(args: argparse.Namespace) -> int:
+    """Ingest logs, list templates, show one, or record one as a symptom."""
+    from doctor_logs import read_line_at
+    from doctor_parse import add_log_symptom, ingest_logs, log_template, log_templates
+
+    if args.action == "ingest":
+        if not args.targets:
+            print("error: log file required", file=sys.stderr)
+            return 1
+        try:
+            stats = ingest_logs(args.targets, args.min_level or "warning")
+        except OSError as e:
+            print(f"error: {e}", file=sys.stderr)
+            return 1
+        for path, s in stats.items():
+            print(f"  {path}: {s['lines']} lines, {s['kept']} kept, {s['new']} new templates")
+        print(f"templates: {len(log_templates())}")
+        return 0
+    
+    if args.action in ("show", "symptom"):
+        if len(args.targets) != 1:
+            print("error: one template id required", file=sys.stderr)
+            return 1
+        tid = args.targets[0]
+        if args.action == "symptom":
+            symptom = add_log_symptom(tid, args.category or "")
+            if symptom is None:
+                print(f"error: no log template matching '{tid}'", file=sys.stderr)
+                return 1
+            print(f"added symptom: {symptom['description']}")
+            print(f"evidence: {symptom['evidence']}")
+            return 0
+        found = log_template(tid)
+        if found is None:
+            print(f"error: no log template matching '{tid}'", file=sys.stderr)
+            return 1
+        tid, entry = found
+        print(f"template: {entry['template']}")
+        print(f"id: {tid}")
+        print(f"level: {entry['level']}")
+        print(f"count: {entry['count']}")
+        print(f"first seen: {entry['first_seen'] or 'n/a'}")
+        print(f"last seen: {entry['last_seen'] or 'n/a'}")
+        for source, n in entry["sources"].items():
+            print(f"  {source}: {n}")
+        print("samples:")
+        for source, offset, line in entry["samples"]:
+            print(f"  {source}@{offset}")
+            print(f"    {line[:200]}")
+            if read_line_at(source, offset) != line:
+                print("    (log changed since ingest)")
+        return 0
+    
+    templates = log_templates(args.top, args.min_level or "trace")
+    if not templates:
+        print("no log templates (run 'doctor logs ingest FILE')")
+        return 0
+    for tid, entry in templates:
+        print(f"  {tid}  {entry['count']:>8}  {entry['level']:<8}  {entry['template'][:100]}")
+    return 0
+
+
+def cmd_index(args: argparse.Namespace) -> int:
+    """Build or update the trigram search index."""
+    from doctor_parse import build_index, update_index
+
+    if args.action == "build":
+        path = args.path or "."
+        count = build_index(path)
+        print(f"indexed: {count} files")
+        print(f"root: {path}")
+        return 0
+
+    result = update_index()
+    if result is None:
+        print("error: no index", file=sys.stderr)
+        print("run 'doctor index build' first", file=sys.stderr)
+        return 1
+    print(f"changed: {result['changed']}")
+    print(f"removed: {result['removed']}")
+    print(f"indexed: {result['files']} files")
+    return 0
+
+
+def cmd_symbols(args: argparse.Namespace) -> int:
+    """Build, update or describe the symbol table behind grep --def / --refs."""
+    from doctor_parse import build_symbols, symbol_stats, update_symbols
+
+    if args.action == "build":
+        path = args.path or "."
+        start = time.perf_counter()
+        count = build_symbols(path)
+        print(f"parsed: {count} files in {time.perf_counter() - start:.2f}s")
+        print(f"root: {path}")
+        return 0
+
+    result = update_symbols() if args.action == "update" else symbol_stats()
+    if result is None:
+        print("error: no symbol table", file=sys.stderr)
+        print("run 'doctor symbols build' first", file=sys.stderr)
+        return 1
+    for key, value in result.items():
+        print(f"{key}: {value}")
     return 0
 
 
 def cmd_symptom(args: argparse.Namespace) -> int:
     """Add a symptom to the session."""
+    from doctor_parse import add_symptom
+
     description = args.description
     category = args.category or "unknown"
     evidence = args.evidence or ""
@@ -123,6 +687,8 @@ def cmd_symptom(args: argparse.Namespace) -> int:
 
 def cmd_hypothesize(args: argparse.Namespace) -> int:
     """Add a hypothesis with confidence."""
+    from doctor_parse import add_hypothesis
+
     description = args.description
     confidence = args.confidence
     falsifiable = args.falsifiable or ""
@@ -136,6 +702,8 @@ def cmd_hypothesize(args: argparse.Namespace) -> int:
 
 def cmd_diagnose(args: argparse.Namespace) -> int:
     """Set the diagnosis."""
+    from doctor_parse import set_diagnosis
+
     summary = args.summary
     confidence = args.confidence
     root_cause = args.cause or ""
@@ -150,6 +718,8 @@ def cmd_diagnose(args: argparse.Namespace) -> int:
 
 def cmd_treat(args: argparse.Namespace) -> int:
     """Generate treatment plan from diagnosis."""
+    from doctor_parse import generate_treatment, load_session
+
     session = load_session()
     if session is None or session.get("diagnosis") is None:
         print("error: no diagnosis set", file=sys.stderr)
@@ -192,15 +762,76 @@ def cmd_treat(args: argparse.Namespace) -> int:
     return 0
 
 
+def _archive() -> bool:
+    """Archive the current session into the history database, reporting the outcome."""
+    import sqlite3
+    from doctor_parse import archive_session
+
+    try:
+        result = archive_session()
+    except (OSError, sqlite3.Error) as e:
+        print(f"error: cannot archive session: {e}", file=sys.stderr)
+        return False
+    if result is None:
+        print("no session to archive")
+        return True
+    action = "archived" if result["created"] else "updated"
+    print(f"{action}: session #{result['id']} ({result['total']} in {result['path']})")
+    return True
+
+
+def cmd_archive(args: argparse.Namespace) -> int:
+    """Save the current session to the cross-session history."""
+    return 0 if _archive() else 1
+
+
+def cmd_recall(args: argparse.Namespace) -> int:
+    """Find past diagnoses similar to a symptom description."""
+    import sqlite3
+    from doctor_parse import recall_sessions
+
+    try:
+        results = recall_sessions(args.text, args.limit, args.this_project)
+    except (OSError, sqlite3.Error) as e:
+        print(f"error: cannot read history: {e}", file=sys.stderr)
+        return 1
+    if not results:
+        print("no similar sessions found")
+        return 0
+    
+    print(f"found {len(results)} similar sessions:")
+    for r in results:
+        diagnosis = r.get("diagnosis") or {}
+        summary = diagnosis.get("summary") or "(no diagnosis)"
+        confidence = f" ({diagnosis['confidence']}%)" if diagnosis.get("confidence") is not None else ""
+        print(f"\n#{r['id']} {r['patient']} — {summary}{confidence}")
+        print(f"  {r['status']}, archived {r['archived_at'][:10]}, {r['project']}")
+        if diagnosis.get("root_cause"):
+            print(f"  root cause: {diagnosis['root_cause']}")
+        symptoms = [s.get("description", "") for s in r.get("symptoms") or []]
+        if symptoms:
+            print(f"  symptoms: {'; '.join(d[:60] for d in symptoms[:3])}")
+        terms = [f"{e['term']} ({e['count']})" for e in r.get("evidence") or []]
+        if terms:
+            print(f"  evidence: {', '.join(terms[:5])}")
+    
+    return 0
+
+
 def cmd_clean(args: argparse.Namespace) -> int:
     """Remove .doctor directory."""
     if args.dry_run:
-        if session_exists():
+        if SESSION_FILE.exists():
             print(f"would remove: {DOCTOR_DIR}")
         else:
             print("no session to clean")
         return 0
     
+    from doctor_parse import clean_doctor, session_exists
+
+    if args.archive and session_exists() and not _archive():
+        return 1
+    
     if clean_doctor():
         print(f"removed: {DOCTOR_DIR}")
     else:
@@ -209,6 +840,32 @@ def cmd_clean(args: argparse.Namespace) -> int:
     return 0
 
 
+def cmd_serve(args: argparse.Namespace) -> int:
+    """Run or stop the resident command server."""
+    from doctor_server import serve, stop
+
+    if args.stop:
+        if stop():
+            print("server stopped")
+        else:
+            print("no server running")
+        return 0
+    # Load the heavy modules up front; forwarded commands would import them anyway
+    import doctor_parse  # noqa: F401
+    return serve()
+
+
+def cmd_compact(args: argparse.Namespace) -> int:
+    """Fold the session journal into session.yaml."""
+    from doctor_parse import compact_session
+
+    if not compact_session():
+        print("no active session")
+        return 0
+    print("compacted: .doctor/session.yaml")
+    return 0
+
+
 def cmd_help(args: argparse.Namespace) -> int:
     """Show help."""
     print("""doctor - Diagnostic skill with parameterized subjectivity
@@ -217,27 +874,67 @@ Commands:
   help                 Show this help message
   validate             Verify the skill is runnable
   status               Show current session status
-  init [--patient X]   Start new diagnosis session
+  init [--patient X]   Start new diagnosis session (--root R... to span repositories)
   surface              Scan for relevant files (globbing)
   grep <term>          Search for term (parameterized determinism)
+  grep --def|--refs N  Find where a symbol is defined or used, from the symbol table
+  run <plan.yaml>      Run independent surface/grep operations concurrently
+  evidence [show KEY]  List saved evidence, or render one record
+  logs ingest FILE...  Cluster log lines into templates (plain or .gz)
+  logs list|show|symptom  List templates, show one, or record it as a symptom
+  cache stats|clear    Inspect or empty the grep query cache
+  index build|update   Build or refresh the trigram search index
+  symbols build|update|stats  Parse Python/JS/TS/YAML definitions and references
+  watch [--path P]     Keep the index and manifest current as files change
   symptom <desc>       Add a symptom to the session
   intake <desc>        Alias for symptom
   hypothesize <desc>   Add a hypothesis with confidence
   diagnose <summary>   Set the diagnosis
   treat                Generate treatment plan from schema
-  clean                Remove .doctor/ artifacts
+  compact              Fold the session journal into session.yaml
+  clean [--archive]    Remove .doctor/ artifacts, optionally archiving the session
+  archive              Save the session to the cross-session history
+  recall <text>        Find past diagnoses similar to a symptom description
+  serve [--stop]       Keep a warm server that skill.sh forwards commands to
 
 Usage:
   doctor init --patient "my-service"
   doctor surface --patterns "*.py" "*.yaml"
   doctor grep "connection timeout" --save
   doctor grep "database" --type py --path src/
+  doctor grep "error" --count-only
+  doctor grep "pool exhausted" --context 5 --save
+  doctor grep "timeout" --rank --max-matches 20
+  doctor grep "timeout" --timeout 5
+  doctor grep "TODO" --no-git
+  doctor grep "apiKey" --include-generated
+  doctor grep "order_id" --root ../api --root ../billing --timeout 10
+  doctor grep --term "connection timeout" --term "database pool" --save
+  doctor grep --terms-file terms.txt --type py
+  doctor grep --def grep_search --type py
+  doctor grep --refs SearchProgress.cancel
+  doctor run plan.yaml --concurrency 8
+  doctor evidence show 3f2a9c
+  doctor logs ingest /var/log/app.log app.log.1.gz --min-level error
+  doctor logs symptom 9c1e2f
+  doctor cache stats
+  doctor index build --path src/
+  doctor index update
+  doctor watch &
   doctor symptom "API returns 500" --category error
   doctor intake "API returns 500" --category error
   doctor hypothesize "Race condition in cache" --confidence 70
   doctor diagnose "Cache invalidation bug" --confidence 85 --cause "Stale TTL"
   doctor treat --option "Fix TTL:Update cache TTL logic:low"
-  doctor clean
+  doctor archive
+  doctor recall "API returns 500 after deploy" --limit 3
+  doctor clean --archive
+  doctor serve &
+  doctor grep "timeout" --profile
+  DOCTOR_TRACE=cprofile doctor status
+
+Every command accepts --profile [summary|trace|cprofile] (or DOCTOR_TRACE=1):
+per-phase timings go to stderr, traces to .doctor/traces/
 
 Artifacts are stored in .doctor/
 
@@ -254,13 +951,15 @@ def cmd_validate(args: argparse.Namespace) -> int:
     import shutil
     errors = []
 
+    include_dir = Path(__file__).resolve().parent
+    if include_dir.is_file():
+        # Running from the dist/doctor.pyz bundle, which carries PyYAML and needs no uv
+        print("ok: doctor bundle is runnable")
+        return 0
+
     if shutil.which("uv") is None:
         errors.append("missing command: uv")
 
-    if shutil.which("grep") is None:
-        errors.append("missing command: grep")
-
-    include_dir = Path(__file__).resolve().parent
     if not (include_dir / "pyproject.toml").is_file():
         errors.append(f"missing {include_dir / 'pyproject.toml'}")
     
@@ -273,7 +972,66 @@ def cmd_validate(args: argparse.Namespace) -> int:
     return 0
 
 
-def main() -> int:
+def _add_listing_flags(parser: argparse.ArgumentParser) -> None:
+    """Add the mutually exclusive --git / --no-git flags."""
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--git", action="store_true", help="List files from git (default inside a work tree)")
+    group.add_argument("--no-git", action="store_true", help="Walk the filesystem even inside a git work tree")
+
+
+def _add_root_flags(parser: argparse.ArgumentParser) -> None:
+    """Add the mutually exclusive --path / --root flags."""
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--path", help="Search path")
+    group.add_argument("--root", dest="roots", action="append", help="Repository to search; repeatable, searched concurrently")
+
+
+def _run_profiled(command, args: argparse.Namespace, mode: str) -> int:
+    """Run a command with phase tracing, print the summary and save the trace."""
+    global _import_span
+    doctor_trace.enable()
+    if _import_span is not None:
+        # Only the first command of a process (or a doctor serve daemon) pays for imports
+        doctor_trace.record_startup(_import_span[0], _IMPORT_START_NS)
+        doctor_trace.record("import", *_import_span)
+        _import_span = None
+
+    profiler = None
+    if mode == "cprofile":
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        with doctor_trace.span("command"):
+            code = command(args)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        end = time.perf_counter()
+        doctor_trace.disable()
+
+    doctor_trace.print_summary(doctor_trace.elapsed(end))
+    if mode != "summary":
+        stem = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{args.command}"
+        if profiler is not None:
+            TRACE_DIR.mkdir(parents=True, exist_ok=True)
+            path = TRACE_DIR / f"{stem}.prof"
+            profiler.dump_stats(path)
+        else:
+            path = doctor_trace.write_chrome_trace(TRACE_DIR / f"{stem}.json", {"argv": sys.argv[1:]})
+        print(f"trace: {path}", file=sys.stderr)
+    return code
+
+
+def main(argv: list[str] | None = None) -> int:
+    if argv is None:
+        argv = sys.argv[1:]
+    # Bare status skips argparse: it is what agents poll between steps
+    if argv == ["status"] and doctor_trace.env_mode() is None:
+        return cmd_status(None)
+
+    import argparse
+
     parser = argparse.ArgumentParser(prog="doctor", description="Diagnostic skill")
     subparsers = parser.add_subparsers(dest="command")
     
@@ -284,16 +1042,63 @@ def main() -> int:
     p_init = subparsers.add_parser("init", help="Start session")
     p_init.add_argument("--patient", help="Patient name")
     p_init.add_argument("--force", action="store_true", help="Overwrite existing")
+    p_init.add_argument("--archive", action="store_true", help="With --force, archive the old session first")
+    p_init.add_argument("--root", dest="roots", action="append", help="Repository grep and surface search by default; repeatable")
     
     p_surface = subparsers.add_parser("surface", help="Scan for files")
     p_surface.add_argument("--patterns", nargs="*", help="Glob patterns")
-    p_surface.add_argument("--path", help="Search path")
+    _add_root_flags(p_surface)
+    _add_listing_flags(p_surface)
     
     p_grep = subparsers.add_parser("grep", help="Search for term")
-    p_grep.add_argument("term", help="Search term")
-    p_grep.add_argument("--path", help="Search path")
+    p_grep.add_argument("term", nargs="?", help="Search term")
+    p_grep.add_argument("--term", dest="terms", action="append", help="Additional search term; repeatable")
+    p_grep.add_argument("--terms-file", help="File with one search term per line")
+    _add_root_flags(p_grep)
     p_grep.add_argument("--type", help="File extension")
     p_grep.add_argument("--save", action="store_true", help="Save evidence")
+    p_grep.add_argument("--max-matches", type=int, help=f"Matches to keep in detail (default {GREP_MATCH_LIMIT}; all with --save)")
+    p_grep.add_argument("--count-only", action="store_true", help="Only count matches")
+    p_grep.add_argument("--rank", action="store_true", help="Keep the most relevant matches instead of the first ones")
+    p_grep.add_argument("-C", "--context", type=int, help="Lines of context around each match, grouped by file")
+    p_grep.add_argument("--no-cache", action="store_true", help="Bypass the query cache")
+    p_grep.add_argument("--include-generated", action="store_true", help="Also search generated, minified, lockfile and large data files")
+    p_grep.add_argument("--timeout", type=float, help="Stop after this many seconds and report partial results")
+    p_symbol = p_grep.add_mutually_exclusive_group()
+    p_symbol.add_argument("--def", dest="define", metavar="NAME", help="Where NAME is defined, from the symbol table")
+    p_symbol.add_argument("--refs", metavar="NAME", help="Lines using NAME, from the symbol table")
+    _add_listing_flags(p_grep)
+    
+    p_run = subparsers.add_parser("run", help="Run a plan of operations concurrently")
+    p_run.add_argument("plan", help="Plan file (YAML list of surface/grep operations)")
+    p_run.add_argument("--concurrency", type=int, help="Operations in flight at once (default: plan or 4)")
+    
+    p_watch = subparsers.add_parser("watch", help="Keep index and manifest current")
+    p_watch.add_argument("--path", help="Tree to watch (default .)")
+    p_watch.add_argument("--debounce", type=float, default=WATCH_DEBOUNCE, help=f"Quiet seconds before applying a batch (default {WATCH_DEBOUNCE})")
+    p_watch.add_argument("--poll", action="store_true", help="Poll for changes instead of using inotify")
+    
+    p_cache = subparsers.add_parser("cache", help="Manage query cache")
+    p_cache.add_argument("action", nargs="?", choices=["stats", "clear"], default="stats", help="Cache action")
+    
+    p_evidence = subparsers.add_parser("evidence", help="List or show evidence")
+    p_evidence.add_argument("action", nargs="?", choices=["list", "show"], default="list", help="Evidence action")
+    p_evidence.add_argument("key", nargs="?", help="Evidence key or unique prefix")
+    
+    p_logs = subparsers.add_parser("logs", help="Ingest logs into symptom templates")
+    p_logs.add_argument("action", choices=["ingest", "list", "show", "symptom"], help="Logs action")
+    p_logs.add_argument("targets", nargs="*", help="Log files (ingest) or a template id (show, symptom)")
+    p_logs.add_argument("--min-level", choices=LOG_LEVELS, help="Lowest level kept (ingest default warning) or listed")
+    p_logs.add_argument("--top", type=int, default=20, help="Templates to list")
+    p_logs.add_argument("--category", help="Symptom category (symptom)")
+    
+    p_index = subparsers.add_parser("index", help="Manage search index")
+    p_index.add_argument("action", choices=["build", "update"], help="Index action")
+    p_index.add_argument("--path", help="Root to index (build only)")
+    
+    p_symbols = subparsers.add_parser("symbols", help="Manage the symbol table")
+    p_symbols.add_argument("action", choices=["build", "update", "stats"], help="Symbol table action")
+    p_symbols.add_argument("--path", help="Root to parse (build only)")
     
     p_symptom = subparsers.add_parser("symptom", help="Add symptom")
     p_symptom.add_argument("description", help="Symptom description")
@@ -320,10 +1125,32 @@ def main() -> int:
     p_treat.add_argument("--option", action="append", help="Option (name:desc:risk); repeatable")
     p_treat.add_argument("--recommend", help="Recommended option name")
     
+    subparsers.add_parser("compact", help="Compact session journal")
+    
     p_clean = subparsers.add_parser("clean", help="Remove artifacts")
     p_clean.add_argument("--dry-run", action="store_true", help="Show what would be removed")
+    p_clean.add_argument("--archive", action="store_true", help="Archive the session before removing it")
+    
+    subparsers.add_parser("archive", help="Save session to history")
+    
+    p_recall = subparsers.add_parser("recall", help="Find similar past diagnoses")
+    p_recall.add_argument("text", help="Symptom description")
+    p_recall.add_argument("--limit", type=int, default=RECALL_LIMIT, help=f"Sessions to show (default {RECALL_LIMIT})")
+    p_recall.add_argument("--this-project", action="store_true", help="Only sessions archived from this directory")
+    
+    p_serve = subparsers.add_parser("serve", help="Run command server")
+    p_serve.add_argument("--stop", action="store_true", help="Stop a running server")
+    
+    for sub in subparsers.choices.values():
+        sub.add_argument(
+            "--profile",
+            nargs="?",
+            const="trace",
+            choices=doctor_trace.TRACE_MODES,
+            help="Time each phase; write a Chrome trace (default) or cProfile stats to .doctor/traces/",
+        )
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     commands = {
         "help": cmd_help,
@@ -332,12 +1159,23 @@ def main() -> int:
         "init": cmd_init,
         "surface": cmd_surface,
         "grep": cmd_grep,
+        "run": cmd_run,
+        "watch": cmd_watch,
+        "cache": cmd_cache,
+        "evidence": cmd_evidence,
+        "logs": cmd_logs,
+        "index": cmd_index,
+        "symbols": cmd_symbols,
         "symptom": cmd_symptom,
         "intake": cmd_symptom,
         "hypothesize": cmd_hypothesize,
         "diagnose": cmd_diagnose,
         "treat": cmd_treat,
+        "compact": cmd_compact,
         "clean": cmd_clean,
+        "archive": cmd_archive,
+        "recall": cmd_recall,
+        "serve": cmd_serve,
     }
     
     cmd = args.command or "help"
@@ -345,6 +1183,9 @@ def main() -> int:
         print(f"error: unknown command '{cmd}'", file=sys.stderr)
         return 1
     
+    mode = getattr(args, "profile", None) or doctor_trace.env_mode()
+    if mode is not None:
+        return _run_profiled(commands[cmd], args, mode)
     return commands[cmd](args)
 
 
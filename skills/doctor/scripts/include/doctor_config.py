@@ -0,0 +1,29 @@
+"""
+Artifact paths and defaults shared by the CLI and the modules behind it.
+Imports nothing beyond pathlib, so the CLI can build its parser and light
+commands can run without loading PyYAML or the search engine.
+"""
+
+from pathlib import Path
+
+
+DOCTOR_DIR = Path(".doctor")
+CACHE_DIR = DOCTOR_DIR / "cache"
+CLASSIFY_FILE = DOCTOR_DIR / "classify.json"
+EVIDENCE_DIR = DOCTOR_DIR / "evidence"
+INDEX_DIR = DOCTOR_DIR / "index"
+JOURNAL_FILE = DOCTOR_DIR / "journal"
+LOGS_DIR = DOCTOR_DIR / "logs"
+LOCK_FILE = DOCTOR_DIR / "session.lock"
+MANIFEST_FILE = DOCTOR_DIR / "manifest.json"
+SESSION_FILE = DOCTOR_DIR / "session.yaml"
+STATUS_FILE = DOCTOR_DIR / "status.json"
+SYMBOLS_DIR = DOCTOR_DIR / "symbols"
+TRACE_DIR = DOCTOR_DIR / "traces"
+TREATMENT_FILE = DOCTOR_DIR / "treatment.md"
+
+GREP_MATCH_LIMIT = 100
+LOG_LEVELS = ("trace", "debug", "info", "warning", "error", "critical")
+RECALL_LIMIT = 5
+# Quiet period (seconds) that closes a batch of file system events in doctor watch.
+WATCH_DEBOUNCE = 0.3
@@ -0,0 +1,181 @@
+"""Content-addressed, compressed evidence store."""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+INDEX_NAME = "index.json"
+KEY_LENGTH = 16
+MARKDOWN_MATCH_LIMIT = 50
+
+
+def evidence_key(
+    term: str,
+    path: str,
+    file_type: str,
+    matches: list[dict],
+    count: int,
+    files: list[dict] | None = None,
+) -> str:
+    """Hash the normalized query and match set; timestamps are not part of the key."""
+    normalized = {
+        "term": term,
+        "path": os.path.normpath(path or "."),
+        "type": file_type or "",
+        "count": count,
+        "matches": sorted((m["file"], str(m["line"]), m["content"]) for m in matches),
+    }
+    if files:
+        # Context blocks make a different record from the same bare matches
+        normalized["blocks"] = [(f["file"], [(b["start"], b["end"]) for b in f["blocks"]]) for f in files]
+    payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()[:KEY_LENGTH]
+
+
+def _compress(data: bytes) -> tuple[bytes, str]:
+    """Compress with zstd when available, else gzip. Returns data and file suffix."""
+    if zstandard is not None:
+        return zstandard.ZstdCompressor().compress(data), ".json.zst"
+    import gzip
+    return gzip.compress(data, mtime=0), ".json.gz"
+
+
+def _decompress(data: bytes, name: str) -> bytes:
+    """Decompress by file suffix."""
+    if name.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"{name} needs the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(data)
+    import gzip
+    return gzip.decompress(data)
+
+
+class EvidenceStore:
+    """Evidence records keyed by content hash, with a small listing index."""
+
+    def __init__(self, evidence_dir: Path) -> None:
+        self.evidence_dir = evidence_dir
+        self.index_file = evidence_dir / INDEX_NAME
+
+    def index(self) -> dict[str, dict[str, Any]]:
+        """Return key -> summary for every stored record."""
+        try:
+            return json.loads(self.index_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def count(self) -> int:
+        """Number of stored records."""
+        return len(self.index())
+
+    def put(
+        self,
+        term: str,
+        path: str,
+        file_type: str,
+        matches: list[dict],
+        count: int,
+        created_at: str,
+        files: list[dict] | None = None,
+    ) -> tuple[str, bool]:
+        """
+        Store a record unless an identical one exists. files optionally holds
+        per-file groups with context blocks (see grep_search_grouped).
+        Returns (key, created). Callers serialize concurrent writers.
+        """
+        key = evidence_key(term, path, file_type, matches, count, files)
+        index = self.index()
+        if key in index:
+            return key, False
+
+        record = {
+            "key": key,
+            "term": term,
+            "path": path or ".",
+            "type": file_type or "",
+            "count": count,
+            "created_at": created_at,
+            "matches": matches,
+        }
+        if files:
+            record["files"] = files
+        data, suffix = _compress(json.dumps(record, ensure_ascii=False).encode("utf-8"))
+        self.evidence_dir.mkdir(parents=True, exist_ok=True)
+        (self.evidence_dir / f"{key}{suffix}").write_bytes(data)
+
+        index[key] = {
+            "term": term,
+            "path": record["path"],
+            "type": record["type"],
+            "count": count,
+            "created_at": created_at,
+            "file": f"{key}{suffix}",
+        }
+        tmp = self.index_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps(index, indent=1, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.index_file)
+        return key, True
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        """Load a full record by key (or unique key prefix)."""
+        index = self.index()
+        found = [k for k in index if k.startswith(key)] if key not in index else [key]
+        if len(found) != 1:
+            return None
+        name = index[found[0]]["file"]
+        raw = (self.evidence_dir / name).read_bytes()
+        return json.loads(_decompress(raw, name))
+
+    @staticmethod
+    def render(record: dict[str, Any], limit: int = MARKDOWN_MATCH_LIMIT) -> str:
+        """Render a record as the markdown evidence snapshot."""
+        count = record["count"]
+        content = f"# Evidence: {record['term']}\n\n"
+        content += f"**Date:** {record['created_at']}\n"
+        content += f"**Key:** {record['key']}\n"
+        content += f"**Matches:** {count}\n\n"
+        content += "## Results\n\n"
+
+        if any(f.get("blocks") for f in record.get("files") or []):
+            return content + EvidenceStore._render_blocks(record["files"], count, limit)
+
+        for m in record["matches"][:limit]:
+            content += f"- `{m['file']}:{m['line']}` — {m['content'][:80]}\n"
+
+        shown = min(limit, len(record["matches"]))
+        if count > shown:
+            content += f"\n*...and {count - shown} more matches*\n"
+        return content
+
+    @staticmethod
+    def _render_blocks(files: list[dict], count: int, limit: int) -> str:
+        """Render per-file context blocks; matching lines are marked with '>'."""
+        content = ""
+        shown = 0
+        for group in files:
+            if shown >= limit:
+                break
+            ranges = ", ".join(f"{b['start']}-{b['end']}" for b in group["blocks"])
+            content += f"### `{group['file']}` ({group['count']} matches, lines {ranges})\n\n"
+            matched = set(group["lines"])
+            width = len(str(group["blocks"][-1]["end"])) if group["blocks"] else 1
+            for block in group["blocks"]:
+                content += "```\n"
+                for offset, line in enumerate(block["lines"]):
+                    lineno = block["start"] + offset
+                    marker = ">" if lineno in matched else " "
+                    content += f"{marker} {lineno:>{width}} | {line}\n"
+                content += "```\n\n"
+            shown += len(group["lines"])
+
+        if count > shown:
+            content += f"*...and {count - shown} more matches*\n"
+        return content
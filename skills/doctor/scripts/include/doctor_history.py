@@ -0,0 +1,190 @@
+"""Archive of finished diagnosis sessions with full-text recall."""
+
+import json
+import os
+import sqlite3
+from pathlib import Path
+from typing import Any
+
+from doctor_config import RECALL_LIMIT
+from doctor_rank import symptom_terms
+
+
+# Override the database location; the default lives outside any project's .doctor/.
+HISTORY_ENV = "DOCTOR_HISTORY_DB"
+HISTORY_VERSION = 1
+
+# Searchable text per archived session; bm25 weights follow the same order.
+FTS_COLUMNS = ("patient", "symptoms", "hypotheses", "diagnosis", "treatment", "evidence")
+FTS_WEIGHTS = (0.5, 4.0, 2.0, 3.0, 1.0, 1.0)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    uid TEXT NOT NULL UNIQUE,
+    project TEXT NOT NULL,
+    patient TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at TEXT,
+    archived_at TEXT NOT NULL,
+    summary TEXT,
+    root_cause TEXT,
+    confidence INTEGER,
+    search_text TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_project ON sessions (project);
+"""
+
+
+def history_path() -> Path:
+    """Database path: $DOCTOR_HISTORY_DB, else the user data directory."""
+    override = os.environ.get(HISTORY_ENV)
+    if override:
+        return Path(override).expanduser()
+    data_home = os.environ.get("XDG_DATA_HOME") or os.path.join(Path.home(), ".local", "share")
+    return Path(data_home, "doctor", "history.db")
+
+
+def _fields(record: dict[str, Any]) -> dict[str, str]:
+    """Flatten an archived session into the text of each FTS column."""
+    diagnosis = record.get("diagnosis") or {}
+    evidence = record.get("evidence") or []
+    return {
+        "patient": record.get("patient", ""),
+        "symptoms": "\n".join(s.get("description", "") for s in record.get("symptoms") or []),
+        "hypotheses": "\n".join(h.get("description", "") for h in record.get("hypotheses") or []),
+        "diagnosis": "\n".join(
+            [diagnosis.get("summary") or "", diagnosis.get("root_cause") or ""]
+            + list(diagnosis.get("contributing_factors") or [])
+        ),
+        "treatment": record.get("treatment") or "",
+        "evidence": "\n".join(
+            " ".join([e.get("term", "")] + list(e.get("files") or [])) for e in evidence
+        ),
+    }
+
+
+class History:
+    """
+    Archived sessions in one SQLite database shared by every project. Text
+    is indexed with FTS5 and ranked by bm25; where SQLite was built without
+    FTS5, recall falls back to scanning for the query words.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(path), timeout=10)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(SCHEMA)
+        self.fts = self._create_fts()
+        self.db.execute(f"PRAGMA user_version = {HISTORY_VERSION}")
+
+    def _create_fts(self) -> bool:
+        """Create the FTS5 table if this SQLite supports it."""
+        try:
+            self.db.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS sessions_fts USING fts5("
+                f"{', '.join(FTS_COLUMNS)}, tokenize='porter unicode61')"
+            )
+        except sqlite3.OperationalError:
+            return False
+        return True
+
+    @classmethod
+    def open(cls, path: Path | None = None) -> "History":
+        """Open (creating if needed) the history database."""
+        return cls(path or history_path())
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self.db.close()
+
+    def __enter__(self) -> "History":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def archive(self, record: dict[str, Any]) -> tuple[int, bool]:
+        """
+        Store one session record, replacing an earlier archive of the same
+        session (same uid). Returns (id, created).
+        """
+        fields = _fields(record)
+        diagnosis = record.get("diagnosis") or {}
+        row = {
+            "uid": record["uid"],
+            "project": record.get("project", ""),
+            "patient": record.get("patient", ""),
+            "status": record.get("status", "investigating"),
+            "created_at": record.get("created_at"),
+            "archived_at": record["archived_at"],
+            "summary": diagnosis.get("summary"),
+            "root_cause": diagnosis.get("root_cause"),
+            "confidence": diagnosis.get("confidence"),
+            "search_text": "\n".join(fields.values()).lower(),
+            "record": json.dumps(record, ensure_ascii=False),
+        }
+        with self.db:
+            existing = self.db.execute("SELECT id FROM sessions WHERE uid = ?", (row["uid"],)).fetchone()
+            if existing is None:
+                cur = self.db.execute(
+                    f"INSERT INTO sessions ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                    tuple(row.values()),
+                )
+                session_id = cur.lastrowid
+            else:
+                session_id = existing["id"]
+                self.db.execute(
+                    f"UPDATE sessions SET {', '.join(f'{k} = ?' for k in row)} WHERE id = ?",
+                    (*row.values(), session_id),
+                )
+            if self.fts:
+                self.db.execute("DELETE FROM sessions_fts WHERE rowid = ?", (session_id,))
+                self.db.execute(
+                    f"INSERT INTO sessions_fts (rowid, {', '.join(FTS_COLUMNS)}) "
+                    f"VALUES (?, {', '.join('?' * len(FTS_COLUMNS))})",
+                    (session_id, *(fields[c] for c in FTS_COLUMNS)),
+                )
+        return session_id, existing is None
+
+    def count(self) -> int:
+        """Number of archived sessions."""
+        return self.db.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def recall(self, text: str, limit: int = RECALL_LIMIT, project: str | None = None) -> list[dict[str, Any]]:
+        """
+        Archived sessions most similar to text, best first. Each result is
+        the archived record plus its "id" and "score" (higher is closer).
+        """
+        terms = sorted(symptom_terms([text]))
+        if not terms or limit <= 0:
+            return []
+        where, params = ("AND s.project = ?", [project]) if project else ("", [])
+
+        if self.fts:
+            query = " OR ".join('"' + t.replace('"', '""') + '"' for t in terms)
+            rows = self.db.execute(
+                f"SELECT s.id, s.record, -bm25(sessions_fts, {', '.join(map(str, FTS_WEIGHTS))}) AS score "
+                f"FROM sessions_fts JOIN sessions s ON s.id = sessions_fts.rowid "
+                f"WHERE sessions_fts MATCH ? {where} ORDER BY score DESC LIMIT ?",
+                [query, *params, limit],
+            ).fetchall()
+        else:
+            # Without FTS5: rank by how many query words each session contains
+            hits = " + ".join("(instr(s.search_text, ?) > 0)" for _ in terms)
+            rows = self.db.execute(
+                f"SELECT s.id, s.record, ({hits}) * 1.0 AS score FROM sessions s "
+                f"WHERE score > 0 {where} ORDER BY score DESC, s.archived_at DESC LIMIT ?",
+                [*terms, *params, limit],
+            ).fetchall()
+
+        results = []
+        for row in rows:
+            record = json.loads(row["record"])
+            record["id"] = row["id"]
+            record["score"] = round(row["score"], 3)
+            results.append(record)
+        return results
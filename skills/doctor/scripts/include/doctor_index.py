@@ -0,0 +1,381 @@
+"""Persistent trigram index for narrowing repeated doctor searches."""
+
+import marshal
+import os
+import stat
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+from doctor_search import BINARY_SNIFF_BYTES, EXCLUDE_DIRS, list_files
+
+
+INDEX_VERSION = 2
+INDEX_MAX_FILE_SIZE = 1024 * 1024
+PARALLEL_MIN_FILES = 256
+# File table and postings live in one file, so a reader never pairs the
+# file ids of one save with the postings of another.
+INDEX_NAME = "index.bin"
+# Files of the version 1 layout, removed on the next save
+LEGACY_NAMES = ("files.json", "postings.bin")
+
+# Per-file states recorded in the file table.
+INDEXED = 1
+UNINDEXED = 0  # Too large to index; always a candidate
+BINARY = -1  # Never searched
+
+_BRE_QUANTIFIERS = ("*", "\\?", "\\{")
+
+
+def file_trigrams(path: str) -> tuple[int, set[bytes] | None]:
+    """Return the index state and trigram set for a file."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read(INDEX_MAX_FILE_SIZE + 1)
+    except OSError:
+        return UNINDEXED, None
+    if len(data) > INDEX_MAX_FILE_SIZE:
+        return UNINDEXED, None
+    if b"\0" in data[:BINARY_SNIFF_BYTES]:
+        return BINARY, None
+    return INDEXED, {data[i:i + 3] for i in range(len(data) - 2)}
+
+
+def _skip_quantifier(term: str, i: int) -> int:
+    """Index just past the quantifier starting at term[i]."""
+    if term.startswith("\\{", i):
+        end = term.find("\\}", i)
+        return end + 2 if end >= 0 else len(term)
+    return i + 2 if term[i] == "\\" else i + 1
+
+
+def _skip_bracket(term: str, i: int) -> int:
+    """
+    Index just past the bracket expression starting at term[i] == '[',
+    scanned as doctor_search._translate_bracket does: a leading ']' (after
+    an optional '^') is a literal, and [:...:], [=...=] and [....] are
+    skipped whole.
+    """
+    j = i + 1
+    if term.startswith("^", j):
+        j += 1
+    if term.startswith("]", j):
+        j += 1
+    while j < len(term) and term[j] != "]":
+        if term.startswith(("[:", "[=", "[."), j):
+            end = term.find(term[j + 1] + "]", j + 2)
+            if end >= 0:
+                j = end + 2
+                continue
+        j += 1
+    return j + 1
+
+
+def literal_runs(term: str) -> list[str] | None:
+    """
+    Extract literal substrings every match of a grep BRE must contain.
+    Returns None when the pattern cannot be narrowed (alternation).
+    Runs inside a group followed by a quantifier are dropped, since the
+    group may match zero times.
+    """
+    if "\\|" in term:
+        return None
+    runs: list[str] = []
+    current = ""
+    # len(runs) when each open group started
+    groups: list[int] = []
+    i = 0
+    while i < len(term):
+        if term.startswith(_BRE_QUANTIFIERS, i):
+            # The preceding atom is optional; drop it from the run
+            current = current[:-1]
+            runs.append(current)
+            current = ""
+            i = _skip_quantifier(term, i)
+            continue
+        c = term[i]
+        if c == "\\" and i + 1 < len(term):
+            nxt = term[i + 1]
+            i += 2
+            if nxt == "(":
+                runs.append(current)
+                current = ""
+                groups.append(len(runs))
+            elif nxt == ")":
+                runs.append(current)
+                current = ""
+                start = groups.pop() if groups else 0
+                if term.startswith(_BRE_QUANTIFIERS, i):
+                    del runs[start:]
+                    i = _skip_quantifier(term, i)
+            elif nxt in "+<>bBwWsS}" or nxt.isdigit():
+                runs.append(current)
+                current = ""
+            else:
+                current += nxt
+        elif c in ".[^$":
+            runs.append(current)
+            current = ""
+            i = _skip_bracket(term, i) if c == "[" else i + 1
+        else:
+            current += c
+            i += 1
+    runs.append(current)
+    return [r for r in runs if len(r.encode("utf-8")) >= 3]
+
+
+def query_trigrams(term: str) -> set[bytes] | None:
+    """Return trigrams every matching line must contain, or None."""
+    runs = literal_runs(term)
+    if not runs:
+        return None
+    grams: set[bytes] = set()
+    for run in runs:
+        data = run.encode("utf-8")
+        grams.update(data[i:i + 3] for i in range(len(data) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """Trigram inverted index over one root, keyed by path, mtime and size."""
+
+    def __init__(self, index_dir: Path, root: str) -> None:
+        self.index_dir = index_dir
+        self.root = os.path.abspath(root)
+        self.files: list[list[Any] | None] = []
+        self.postings: dict[bytes, array] = {}
+
+    @staticmethod
+    def paths(index_dir: Path) -> tuple[Path, ...]:
+        """Return the files that make up an index on disk."""
+        return (index_dir / INDEX_NAME,)
+
+    @classmethod
+    def load(cls, index_dir: Path) -> "TrigramIndex | None":
+        """Load index from disk, or None if missing or incompatible."""
+        try:
+            data = marshal.loads((index_dir / INDEX_NAME).read_bytes())
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+            return None
+        index = cls(index_dir, data["root"])
+        index.files = data["files"]
+        for gram, ids in data["postings"].items():
+            arr = array("I")
+            arr.frombytes(ids)
+            index.postings[gram] = arr
+        return index
+
+    def save(self) -> None:
+        """
+        Write index atomically: one file replaced by a single rename, from a
+        temp file private to this process and thread, so concurrent writers
+        never clobber each other's output and readers see one whole save.
+        """
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        data = marshal.dumps({
+            "version": INDEX_VERSION,
+            "root": self.root,
+            "files": self.files,
+            "postings": {gram: ids.tobytes() for gram, ids in self.postings.items()},
+        })
+        tmp = self.index_dir / f".{INDEX_NAME}.{os.getpid()}.{threading.get_ident()}.tmp"
+        tmp.write_bytes(data)
+        os.replace(tmp, self.index_dir / INDEX_NAME)
+        for name in LEGACY_NAMES:
+            (self.index_dir / name).unlink(missing_ok=True)
+
+    def live_count(self) -> int:
+        """Number of files currently tracked."""
+        return sum(1 for entry in self.files if entry is not None)
+
+    def _add(self, paths: list[str]) -> None:
+        """Extract trigrams for paths and append them to the index."""
+        if not paths:
+            return
+        stats = []
+        for rel in paths:
+            try:
+                st = os.stat(os.path.join(self.root, rel))
+                stats.append((rel, st.st_mtime_ns, st.st_size))
+            except OSError:
+                continue
+        abs_paths = [os.path.join(self.root, rel) for rel, _, _ in stats]
+        if len(abs_paths) < PARALLEL_MIN_FILES:
+            self._append(stats, map(file_trigrams, abs_paths))
+            return
+        with ProcessPoolExecutor() as pool:
+            self._append(stats, pool.map(file_trigrams, abs_paths, chunksize=64))
+
+    def _append(self, stats: list[tuple[str, int, int]], results: Iterable[tuple[int, set[bytes] | None]]) -> None:
+        """Record extracted trigrams under fresh file ids."""
+        for (rel, mtime, size), (state, grams) in zip(stats, results):
+            file_id = len(self.files)
+            self.files.append([rel, mtime, size, state])
+            for gram in grams or ():
+                self.postings.setdefault(gram, array("I")).append(file_id)
+
+    def _walk(self) -> list[str]:
+        """List files under root relative to root, from git when root is a work tree."""
+        return [os.path.relpath(p, self.root) for p in list_files(self.root)]
+
+    def build(self) -> int:
+        """Index every file under root from scratch."""
+        self.files = []
+        self.postings = {}
+        self._add(self._walk())
+        self.save()
+        return self.live_count()
+
+    def update(self) -> dict[str, int]:
+        """Re-index files whose mtime or size changed; drop deleted files."""
+        known = {entry[0]: i for i, entry in enumerate(self.files) if entry is not None}
+        changed: list[str] = []
+        seen = set()
+        for rel in self._walk():
+            seen.add(rel)
+            file_id = known.get(rel)
+            if file_id is not None:
+                entry = self.files[file_id]
+                try:
+                    st = os.stat(os.path.join(self.root, rel))
+                except OSError:
+                    continue
+                if entry[1] == st.st_mtime_ns and entry[2] == st.st_size:
+                    continue
+                self.files[file_id] = None
+            changed.append(rel)
+
+        removed = 0
+        for rel, file_id in known.items():
+            if rel not in seen:
+                self.files[file_id] = None
+                removed += 1
+
+        self._add(changed)
+        if self.live_count() * 2 < len(self.files):
+            self.compact()
+        self.save()
+        return {"changed": len(changed), "removed": removed, "files": self.live_count()}
+
+    def apply(self, paths: Iterable[str], tracked: Callable[[str], bool] | None = None) -> dict[str, int]:
+        """
+        Apply file system events given as root-relative paths: changed files
+        are re-read, while vanished paths (files, or directories along with
+        everything indexed below them) and files rejected by tracked are
+        dropped. Work follows the number of paths, not the size of the tree.
+        """
+        known = {entry[0]: i for i, entry in enumerate(self.files) if entry is not None}
+        changed: list[str] = []
+        removed = 0
+        for rel in sorted(set(paths)):
+            try:
+                st = os.lstat(os.path.join(self.root, rel))
+            except OSError:
+                st = None
+            if st is not None and stat.S_ISDIR(st.st_mode):
+                continue
+            keep = st is not None and stat.S_ISREG(st.st_mode) and (tracked is None or tracked(rel))
+            file_id = known.get(rel)
+            if file_id is not None:
+                entry = self.files[file_id]
+                if keep and entry[1] == st.st_mtime_ns and entry[2] == st.st_size:
+                    continue
+                self.files[file_id] = None
+                removed += not keep
+            elif st is None:
+                prefix = rel + os.sep
+                for other, other_id in known.items():
+                    if other.startswith(prefix) and self.files[other_id] is not None:
+                        self.files[other_id] = None
+                        removed += 1
+            if keep:
+                changed.append(rel)
+
+        if not changed and not removed:
+            return {"changed": 0, "removed": 0, "files": self.live_count()}
+        self._add(changed)
+        if self.live_count() * 2 < len(self.files):
+            self.compact()
+        self.save()
+        return {"changed": len(changed), "removed": removed, "files": self.live_count()}
+
+    def compact(self) -> None:
+        """Drop tombstoned files and renumber postings without re-reading files."""
+        remap = {}
+        files = []
+        for old_id, entry in enumerate(self.files):
+            if entry is not None:
+                remap[old_id] = len(files)
+                files.append(entry)
+        postings = {}
+        for gram, ids in self.postings.items():
+            kept = array("I", (remap[i] for i in ids if i in remap))
+            if kept:
+                postings[gram] = kept
+        self.files = files
+        self.postings = postings
+
+    def candidates(
+        self,
+        term: str,
+        path: str = ".",
+        file_type: str = "",
+        files: Iterable[str] | None = None,
+        mode: str = "auto",
+    ) -> list[str] | None:
+        """
+        Return the files under path that may contain term, in the order and
+        format of the given listing (list_files(path, file_type, mode) when
+        None). Every listed file is re-stat'ed: files the index does not
+        know, or whose mtime or size changed since they were indexed, are
+        always candidates, so a stale index narrows less but never hides a
+        match. Returns None if the index cannot answer.
+        """
+        abs_path = os.path.abspath(path)
+        if abs_path != self.root and not abs_path.startswith(self.root + os.sep):
+            return None
+        prefix = os.path.relpath(abs_path, self.root)
+        prefix = "" if prefix == "." else prefix
+        if any(part in EXCLUDE_DIRS for part in prefix.split(os.sep)):
+            return None
+        if files is None:
+            try:
+                files = list_files(path, file_type, mode=mode)
+            except ValueError:
+                return None
+
+        grams = query_trigrams(term)
+        hit: set[int] | None = None
+        if grams is not None:
+            lists = sorted((self.postings.get(g, array("I")) for g in grams), key=len)
+            hit = set(lists[0])
+            for ids_for_gram in lists[1:]:
+                hit.intersection_update(ids_for_gram)
+                if not hit:
+                    break
+
+        known = {entry[0]: i for i, entry in enumerate(self.files) if entry is not None}
+        cut = len(self.root) + 1
+        results = []
+        for file in files:
+            full = os.path.abspath(file)
+            file_id = known.get(full[cut:]) if full.startswith(self.root + os.sep) else None
+            if file_id is None:
+                results.append(file)
+                continue
+            entry = self.files[file_id]
+            try:
+                st = os.stat(full)
+            except OSError:
+                continue
+            if entry[1] != st.st_mtime_ns or entry[2] != st.st_size:
+                results.append(file)
+            elif entry[3] == BINARY:
+                continue
+            elif hit is None or entry[3] == UNINDEXED or file_id in hit:
+                results.append(file)
+        return results
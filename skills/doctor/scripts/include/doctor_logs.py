@@ -0,0 +1,297 @@
+"""Streaming log ingestion: cluster log lines into templates with counts."""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any, BinaryIO, Iterator
+
+from doctor_config import LOG_LEVELS as LEVELS
+
+INDEX_NAME = "index.json"
+LOGS_VERSION = 2
+MAX_TEMPLATES = 10000
+SAMPLES_PER_TEMPLATE = 3
+MAX_LINE_CHARS = 2000
+
+LEVEL_ALIASES = {
+    "trace": "trace",
+    "debug": "debug",
+    "info": "info",
+    "notice": "info",
+    "warn": "warning",
+    "warning": "warning",
+    "err": "error",
+    "error": "error",
+    "severe": "error",
+    "crit": "critical",
+    "critical": "critical",
+    "fatal": "critical",
+    "panic": "critical",
+    "emerg": "critical",
+    "alert": "critical",
+}
+
+TIMESTAMP_RE = re.compile(
+    r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?"
+    r"|[A-Z][a-z]{2} [ \d]\d \d{2}:\d{2}:\d{2}"
+)
+LEVEL_RE = re.compile(
+    r"""(?:\blevel["']?\s*[=:]\s*["']?|\[|\b)"""
+    r"(TRACE|DEBUG|INFO|NOTICE|WARN(?:ING)?|ERR(?:OR)?|SEVERE|CRIT(?:ICAL)?|FATAL|PANIC|EMERG|ALERT)\b",
+    re.IGNORECASE,
+)
+
+# Variable parts replaced in templates, most specific first.
+MASKS = (
+    (re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"), "<uuid>"),
+    (re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b"), "<ip>"),
+    (re.compile(r"\b0x[0-9a-fA-F]+\b|\b(?=[0-9a-fA-F]*\d)(?=[0-9a-fA-F]*[a-fA-F])[0-9a-fA-F]{8,}\b"), "<hex>"),
+    (re.compile(r"\d+(?:\.\d+)?"), "<num>"),
+)
+
+
+def parse_level(line: str) -> str | None:
+    """Normalized level of a log line, or None if it carries none."""
+    match = LEVEL_RE.search(line, 0, 200)
+    return LEVEL_ALIASES.get(match.group(1).lower()) if match else None
+
+
+def parse_timestamp(line: str) -> str | None:
+    """First timestamp in the line's prefix, as written."""
+    match = TIMESTAMP_RE.search(line, 0, 64)
+    return match.group(0) if match else None
+
+
+def template_of(line: str) -> str:
+    """Mask timestamps, IDs, addresses and numbers so repeated events share one template."""
+    text = TIMESTAMP_RE.sub("<ts>", line, count=1)
+    for pattern, token in MASKS:
+        text = pattern.sub(token, text)
+    return " ".join(text.split())[:MAX_LINE_CHARS]
+
+
+def _iso_key(stamp: str) -> str | None:
+    """Sortable form of an ISO 8601 timestamp; None for formats without a year."""
+    return stamp.replace(" ", "T").replace(",", ".") if stamp[:1].isdigit() else None
+
+
+def _earliest(current: str | None, seen: str) -> str:
+    """Earlier of two timestamps; without a year, the one met first."""
+    if current is None:
+        return seen
+    a, b = _iso_key(current), _iso_key(seen)
+    return seen if a is not None and b is not None and b < a else current
+
+
+def _latest(current: str | None, seen: str) -> str:
+    """Later of two timestamps; without a year, the one met last."""
+    if current is None:
+        return seen
+    a, b = _iso_key(current), _iso_key(seen)
+    return current if a is not None and b is not None and b < a else seen
+
+
+def template_id(level: str, template: str) -> str:
+    """Stable short id of a (level, template) pair."""
+    return hashlib.sha1(f"{level}\0{template}".encode("utf-8")).hexdigest()[:12]
+
+
+def open_log(path: str) -> BinaryIO:
+    """Open a log for streaming; .gz files are decompressed on the fly."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def iter_lines(path: str, start: int = 0, end: int | None = None) -> Iterator[tuple[int, bytes]]:
+    """
+    Yield (byte offset, line) from start up to end. Reads are buffered, so
+    memory stays flat however large the file. Offsets of .gz files count
+    decompressed bytes.
+    """
+    with open_log(path) as f:
+        if start:
+            f.seek(start)
+        offset = start
+        for line in f:
+            if end is not None and offset >= end:
+                break
+            yield offset, line
+            offset += len(line)
+
+
+def read_line_at(path: str, offset: int) -> str | None:
+    """Read the line an evidence link points at."""
+    try:
+        with open_log(path) as f:
+            f.seek(offset)
+            return f.readline().decode("utf-8", "replace").rstrip("\r\n")
+    except (OSError, EOFError):
+        return None
+
+
+class LogIndex:
+    """
+    Templates seen across ingested logs, with level, count, first and last
+    seen timestamps and a few sample (source, offset) links, plus per-source
+    progress so re-ingesting a growing plain log only reads the new tail.
+    """
+
+    def __init__(self, logs_dir: Path) -> None:
+        self.logs_dir = logs_dir
+        self.index_file = logs_dir / INDEX_NAME
+        self.sources: dict[str, dict[str, Any]] = {}
+        self.templates: dict[str, dict[str, Any]] = {}
+        self.dropped = 0
+
+    @classmethod
+    def load(cls, logs_dir: Path) -> "LogIndex":
+        """Load the index, or start an empty one."""
+        index = cls(logs_dir)
+        try:
+            data = json.loads(index.index_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return index
+        if data.get("version") == LOGS_VERSION:
+            index.sources = data["sources"]
+            index.templates = data["templates"]
+            index.dropped = data.get("dropped", 0)
+        return index
+
+    def save(self) -> None:
+        """Write the index atomically."""
+        self.logs_dir.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "version": LOGS_VERSION,
+            "sources": self.sources,
+            "templates": self.templates,
+            "dropped": self.dropped,
+        }
+        tmp = self.index_file.with_name(f".{INDEX_NAME}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, self.index_file)
+
+    def ingest(self, path: str, min_level: str = "warning") -> dict[str, int]:
+        """
+        Stream one log into the index, keeping lines at or above min_level.
+        Unchanged files are skipped; plain files that only grew resume at
+        the previous end. A source is always read at one level: a lower
+        min_level than before re-reads it from the start, while a higher
+        one keeps the level it was read with. Returns lines read, lines
+        kept and new templates.
+        """
+        source = os.path.abspath(path)
+        st = os.stat(source)
+        plain = not source.endswith(".gz")
+        known = self.sources.get(source)
+        start = 0
+        if known is not None and LEVELS.index(min_level) < LEVELS.index(known["min_level"]):
+            # Lines under the old level were never kept
+            self._forget(source)
+            known = None
+        if known is not None:
+            min_level = known["min_level"]
+            if known["size"] == st.st_size and known["mtime"] == st.st_mtime_ns:
+                return {"lines": 0, "kept": 0, "new": 0}
+            if plain and st.st_size >= known["size"]:
+                start = known["offset"]
+            else:
+                # Rewritten, truncated or rotated: count it again from the start
+                self._forget(source)
+                known = None
+
+        threshold = LEVELS.index(min_level)
+        lines = kept = new = 0
+        consumed = start
+        # Stop at the size seen now; a line still being written is left for next time
+        for offset, raw in iter_lines(source, start, st.st_size if plain else None):
+            if plain and not raw.endswith(b"\n"):
+                break
+            consumed = offset + len(raw)
+            lines += 1
+            line = raw.decode("utf-8", "replace").rstrip("\r\n")
+            level = parse_level(line)
+            if level is None or LEVELS.index(level) < threshold:
+                continue
+            kept += 1
+            new += self._add(source, offset, line, level)
+
+        self.sources[source] = {
+            "size": st.st_size,
+            "mtime": st.st_mtime_ns,
+            "offset": consumed,
+            "lines": (known["lines"] if known else 0) + lines,
+            "min_level": min_level,
+        }
+        return {"lines": lines, "kept": kept, "new": new}
+
+    def _add(self, source: str, offset: int, line: str, level: str) -> int:
+        """Count one line under its template. Returns 1 if the template is new."""
+        template = template_of(line)
+        tid = template_id(level, template)
+        seen = parse_timestamp(line)
+        entry = self.templates.get(tid)
+        if entry is None:
+            if len(self.templates) >= MAX_TEMPLATES:
+                self.dropped += 1
+                return 0
+            self.templates[tid] = {
+                "level": level,
+                "template": template,
+                "count": 1,
+                "first_seen": seen,
+                "last_seen": seen,
+                "sources": {source: 1},
+                # First and last timestamp per source, so forgetting one can restore the span
+                "seen": {source: [seen, seen]} if seen else {},
+                "samples": [[source, offset, line[:MAX_LINE_CHARS]]],
+            }
+            return 1
+        entry["count"] += 1
+        entry["sources"][source] = entry["sources"].get(source, 0) + 1
+        if seen:
+            entry["first_seen"] = _earliest(entry["first_seen"], seen)
+            entry["last_seen"] = _latest(entry["last_seen"], seen)
+            span = entry["seen"].setdefault(source, [seen, seen])
+            span[0], span[1] = _earliest(span[0], seen), _latest(span[1], seen)
+        if len(entry["samples"]) < SAMPLES_PER_TEMPLATE:
+            entry["samples"].append([source, offset, line[:MAX_LINE_CHARS]])
+        return 0
+
+    def _forget(self, source: str) -> None:
+        """Drop a source's contribution before it is re-read from the start."""
+        for tid in list(self.templates):
+            entry = self.templates[tid]
+            n = entry["sources"].pop(source, 0)
+            if not n:
+                continue
+            entry["count"] -= n
+            entry["samples"] = [s for s in entry["samples"] if s[0] != source]
+            if entry["count"] <= 0:
+                del self.templates[tid]
+                continue
+            entry["seen"].pop(source, None)
+            first = last = None
+            for lo, hi in entry["seen"].values():
+                first, last = _earliest(first, lo), _latest(last, hi)
+            entry["first_seen"], entry["last_seen"] = first, last
+        self.sources.pop(source, None)
+
+    def top(self, limit: int | None = None, min_level: str = "trace") -> list[tuple[str, dict[str, Any]]]:
+        """Templates at or above min_level, most frequent first."""
+        threshold = LEVELS.index(min_level)
+        ranked = sorted(
+            ((tid, e) for tid, e in self.templates.items() if LEVELS.index(e["level"]) >= threshold),
+            key=lambda item: (-item[1]["count"], item[0]),
+        )
+        return ranked[:limit] if limit is not None else ranked
+
+    def get(self, tid: str) -> tuple[str, dict[str, Any]] | None:
+        """Look up a template by id or unique id prefix."""
+        found = [t for t in self.templates if t.startswith(tid)]
+        if len(found) != 1:
+            return None
+        return found[0], self.templates[found[0]]
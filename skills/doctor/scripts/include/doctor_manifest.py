@@ -0,0 +1,126 @@
+"""Cached directory manifest for incremental surface scans."""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable
+
+
+MANIFEST_VERSION = 1
+
+
+class Manifest:
+    """
+    Directory listings keyed by root and relative directory path, each with
+    the directory mtime it was listed at. Unchanged directories are reused
+    without being re-listed.
+    """
+
+    def __init__(self, manifest_file: Path) -> None:
+        self.manifest_file = manifest_file
+        self.roots: dict[str, dict[str, list[Any]]] = {}
+        self.relisted = 0
+
+    @classmethod
+    def load(cls, manifest_file: Path) -> "Manifest":
+        """Load manifest from disk; a missing or stale file yields an empty one."""
+        manifest = cls(manifest_file)
+        try:
+            data = json.loads(manifest_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return manifest
+        if data.get("version") == MANIFEST_VERSION:
+            manifest.roots = data.get("roots", {})
+        return manifest
+
+    def save(self) -> None:
+        """Write manifest atomically. Concurrent writers each use their own temp file."""
+        self.manifest_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_file.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps({"version": MANIFEST_VERSION, "roots": self.roots}), encoding="utf-8")
+        os.replace(tmp, self.manifest_file)
+
+    def scan(self, root: str, keep: Callable[[str], bool]) -> list[str]:
+        """
+        Walk root once, pruning names rejected by keep before descending.
+        Returns file paths relative to root.
+        """
+        abs_root = os.path.abspath(root)
+        cached = self.roots.get(abs_root, {})
+        fresh: dict[str, list[Any]] = {}
+        results: list[str] = []
+        self.relisted = 0
+
+        stack = [""]
+        while stack:
+            rel = stack.pop()
+            full = os.path.join(abs_root, rel) if rel else abs_root
+            try:
+                mtime = os.stat(full).st_mtime_ns
+            except OSError:
+                continue
+
+            entry = cached.get(rel)
+            if entry is None or entry[0] != mtime:
+                entry = [mtime, *self._list(full, keep)]
+                self.relisted += 1
+            fresh[rel] = entry
+
+            results.extend(os.path.join(rel, name) for name in entry[1])
+            stack.extend(os.path.join(rel, name) for name in entry[2])
+
+        self.roots[abs_root] = fresh
+        return results
+
+    def refresh(self, dirs: set[str], keep: Callable[[str], bool]) -> int:
+        """
+        Re-list cached directories (absolute paths) that changed, so the next
+        scan finds them current; vanished directories are dropped with their
+        subtrees. Directories no scan has listed yet are left alone.
+        Returns the number of entries updated.
+        """
+        updated = 0
+        for abs_root, entries in self.roots.items():
+            for directory in dirs:
+                if directory == abs_root:
+                    rel = ""
+                elif directory.startswith(abs_root + os.sep):
+                    rel = directory[len(abs_root) + 1:]
+                else:
+                    continue
+                if rel not in entries:
+                    continue
+                try:
+                    mtime = os.stat(directory).st_mtime_ns
+                except OSError:
+                    prefix = rel + os.sep
+                    for sub in [d for d in entries if d == rel or d.startswith(prefix)]:
+                        del entries[sub]
+                    updated += 1
+                    continue
+                if entries[rel][0] != mtime:
+                    entries[rel] = [mtime, *self._list(directory, keep)]
+                    updated += 1
+        return updated
+
+    @staticmethod
+    def _list(full: str, keep: Callable[[str], bool]) -> tuple[list[str], list[str]]:
+        """List one directory into kept file and subdirectory names."""
+        files: list[str] = []
+        dirs: list[str] = []
+        try:
+            with os.scandir(full) as it:
+                for entry in it:
+                    if not keep(entry.name):
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            dirs.append(entry.name)
+                        elif entry.is_file():
+                            files.append(entry.name)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return files, dirs
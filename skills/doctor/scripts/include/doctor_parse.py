@@ -1,23 +1,84 @@
 """Parse and manage doctor artifacts."""
 
+import copy
+import fnmatch
 import hashlib
-import subprocess
+import json
+import os
+import sys
+import threading
+import time
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timezone
+from functools import partial
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
 
 import yaml
 
+from doctor_cache import QueryCache, tree_fingerprint
+from doctor_classify import FileClassifier
+from doctor_config import (
+    CACHE_DIR,
+    CLASSIFY_FILE,
+    DOCTOR_DIR,
+    EVIDENCE_DIR,
+    GREP_MATCH_LIMIT,
+    INDEX_DIR,
+    JOURNAL_FILE,
+    LOCK_FILE,
+    LOGS_DIR,
+    MANIFEST_FILE,
+    RECALL_LIMIT,
+    SESSION_FILE,
+    SYMBOLS_DIR,
+    TRACE_DIR,
+    TREATMENT_FILE,
+    WATCH_DEBOUNCE,
+)
+from doctor_evidence import EvidenceStore
+from doctor_history import History
+from doctor_index import TrigramIndex
+from doctor_logs import LogIndex
+from doctor_manifest import Manifest
+from doctor_rank import Ranker, symptom_score, top_k
+from doctor_search import EXCLUDE_DIRS, SearchProgress, git_files, list_files, search_tree, search_tree_many
+from doctor_server import SOCKET_FILE
+from doctor_symbols import SymbolTable
+from doctor_status import load_summary, save_summary, session_identity, status_from, summarize
+from doctor_trace import span, traced
+from doctor_watch import open_watcher, watch_loop
 
-DOCTOR_DIR = Path(".doctor")
-EVIDENCE_DIR = DOCTOR_DIR / "evidence"
-SESSION_FILE = DOCTOR_DIR / "session.yaml"
-TREATMENT_FILE = DOCTOR_DIR / "treatment.md"
 
 VALID_STATUSES = ("investigating", "diagnosed", "treated", "abandoned")
 SYMPTOM_CATEGORIES = ("error", "timeout", "crash", "wrong_output", "performance", "unknown")
 RISK_LEVELS = ("low", "medium", "high")
 EFFORT_LEVELS = ("trivial", "small", "medium", "large")
+SURFACE_ALLOWED_HIDDEN = frozenset({".doctor", ".github", ".circleci", ".devcontainer"})
+SURFACE_EXCLUDE_DIRS = frozenset({"node_modules", "__pycache__", "venv", ".venv", "dist", "build"})
+
+JOURNAL_COMPACT_THRESHOLD = 256
+# Repositories searched at once by grep_search_roots and surface_scan_roots
+ROOT_WORKERS = 4
+SESSION_UPDATE_RETRIES = 10
+ARCHIVE_EVIDENCE_FILES = 20
+
+# Prefer the libyaml-backed loader and dumper when PyYAML was built with them
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+_LOAD_CACHE: dict[str, tuple[tuple, Any]] = {}
+_SESSION_RLOCK = threading.RLock()
+# Serializes query cache index updates between searches running on threads
+_CACHE_LOCK = threading.Lock()
+_lock_depth = 0
 
 
 def now_utc() -> datetime:
@@ -48,23 +109,218 @@ def session_exists() -> bool:
     return SESSION_FILE.exists()
 
 
+def _file_key(paths: tuple[Path, ...]) -> tuple | None:
+    """Return (path, mtime, size) identity for files, or None if any is missing."""
+    key = []
+    for path in paths:
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        key.append((os.path.abspath(path), st.st_mtime_ns, st.st_size))
+    return tuple(key)
+
+
+def _cached(paths: tuple[Path, ...], loader: Callable[[], Any]) -> Any:
+    """
+    Memoize loader on the identity of the files it reads. Lets a resident
+    process (doctor serve) keep the session and index in memory while still
+    seeing writes from other processes.
+    """
+    key = _file_key(paths)
+    if key is None:
+        return None
+    hit = _LOAD_CACHE.get(key[0][0])
+    if hit is not None and hit[0] == key:
+        return hit[1]
+    value = loader()
+    _LOAD_CACHE[key[0][0]] = (key, value)
+    return value
+
+
+@traced("index load")
+def _load_index() -> TrigramIndex | None:
+    """Load the trigram index, reusing an in-memory copy when unchanged."""
+    return _cached(TrigramIndex.paths(INDEX_DIR), lambda: TrigramIndex.load(INDEX_DIR))
+
+
+def _atomic_write(path: Path, content: str) -> None:
+    """Write content via a temp file and rename so readers never see a partial file."""
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _read_journal() -> list[dict[str, Any]]:
+    """Read journal records; a torn trailing line from an interrupted write is ignored."""
+    try:
+        lines = JOURNAL_FILE.read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return []
+    records = []
+    for line in lines:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    return records
+
+
+def _apply(session: dict[str, Any], record: dict[str, Any]) -> None:
+    """Apply one journal record to a session in memory."""
+    op = record["op"]
+    if op == "append":
+        session.setdefault(record["key"], []).append(record["value"])
+    elif op == "extend":
+        session.setdefault(record["key"], []).extend(record["value"])
+    elif op == "update":
+        session.update(record["value"])
+    session["version"] = record["seq"]
+    session["updated_at"] = record["at"]
+
+
+@traced("session load")
+def _load() -> tuple[dict[str, Any] | None, int]:
+    """Load session.yaml plus pending journal records. Returns session and journal length."""
+    def parse() -> dict[str, Any]:
+        return yaml.load(SESSION_FILE.read_text(encoding="utf-8"), Loader=YAML_LOADER) or {}
+
+    base = _cached((SESSION_FILE,), parse)
+    if base is None:
+        return None, 0
+    session = copy.deepcopy(base)
+    session.setdefault("version", 0)
+    records = _read_journal()
+    for record in records:
+        if record.get("seq", 0) > session["version"]:
+            _apply(session, record)
+    return session, len(records)
+
+
 def load_session() -> dict[str, Any] | None:
     """Load current session from disk."""
-    if not SESSION_FILE.exists():
-        return None
-    content = SESSION_FILE.read_text(encoding="utf-8")
-    return yaml.safe_load(content) or {}
+    return _load()[0]
+
+
+@contextmanager
+def _session_lock() -> Iterator[None]:
+    """
+    Hold the session lock: an exclusive flock on .doctor/session.lock shared
+    with other processes, plus an in-process lock for threads. Re-entrant
+    within the holding thread. Without fcntl (Windows) only the in-process
+    lock applies.
+    """
+    global _lock_depth
+    with _SESSION_RLOCK:
+        if _lock_depth:
+            _lock_depth += 1
+            try:
+                yield
+            finally:
+                _lock_depth -= 1
+            return
+        ensure_doctor_dir()
+        with open(LOCK_FILE, "a") as f:
+            if fcntl is not None:
+                with span("lock wait"):
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            _lock_depth = 1
+            try:
+                yield
+            finally:
+                _lock_depth = 0
 
 
 def save_session(session: dict[str, Any]) -> None:
-    """Save session to disk."""
+    """Save session to disk, folding in (compacting) the journal."""
+    with _session_lock():
+        _write_session(session)
+
+
+@traced("session save")
+def _write_session(session: dict[str, Any]) -> None:
+    """Write session.yaml and drop folded journal records. Caller holds the lock."""
     ensure_doctor_dir()
     session["updated_at"] = to_rfc3339(now_utc())
-    SESSION_FILE.write_text(yaml.dump(session, default_flow_style=False, sort_keys=False), encoding="utf-8")
+    session.setdefault("version", 0)
+    _atomic_write(SESSION_FILE, yaml.dump(session, Dumper=YAML_DUMPER, default_flow_style=False, sort_keys=False))
+    # Records at or below the saved version are already in session.yaml
+    pending = [r for r in _read_journal() if r.get("seq", 0) > session["version"]]
+    if pending:
+        _atomic_write(JOURNAL_FILE, "".join(json.dumps(r) + "\n" for r in pending))
+    else:
+        JOURNAL_FILE.unlink(missing_ok=True)
+    save_summary(summarize(session), session_identity())
 
 
-def init_session(patient: str = "") -> dict[str, Any]:
-    """Initialize a new diagnosis session."""
+def compact_session() -> bool:
+    """Fold pending journal records into session.yaml. Returns False if no session."""
+    with _session_lock():
+        session = load_session()
+        if session is None:
+            return False
+        _write_session(session)
+    return True
+
+
+def update_session(mutate: Callable[[dict[str, Any]], None]) -> dict[str, Any] | None:
+    """
+    Apply mutate to the session with optimistic versioning: mutate runs on a
+    lock-free snapshot, and the result is only written if no other writer
+    bumped the version meanwhile. Conflicting updates are retried rather
+    than dropped. Returns None if no session exists.
+    """
+    for _ in range(SESSION_UPDATE_RETRIES):
+        session = load_session()
+        if session is None:
+            return None
+        expected = session["version"]
+        mutate(session)
+        with _session_lock():
+            current, _ = _load()
+            if current is not None and current["version"] == expected:
+                session["version"] = expected + 1
+                _write_session(session)
+                return session
+    raise RuntimeError(f"session update conflicted {SESSION_UPDATE_RETRIES} times")
+
+
+@traced("journal append")
+def _journal(*mutations: tuple[str, str | None, Any]) -> dict[str, Any]:
+    """
+    Record (op, key, value) mutations as journal appends instead of
+    rewriting session.yaml. Compacts once the journal grows past
+    JOURNAL_COMPACT_THRESHOLD records.
+    """
+    with _session_lock():
+        session, journal_len = _load()
+        if session is None:
+            session = init_session()
+        
+        now = to_rfc3339(now_utc())
+        records = []
+        for op, key, value in mutations:
+            record = {"seq": session["version"] + 1, "op": op, "key": key, "value": value, "at": now}
+            _apply(session, record)
+            records.append(record)
+        
+        if journal_len + len(records) > JOURNAL_COMPACT_THRESHOLD:
+            _write_session(session)
+        else:
+            with open(JOURNAL_FILE, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(r) + "\n" for r in records))
+            save_summary(summarize(session), session_identity())
+    return session
+
+
+def init_session(patient: str = "", roots: list[str] | None = None) -> dict[str, Any]:
+    """
+    Initialize a new diagnosis session. roots, if given, are the
+    repositories grep and surface fan out over by default.
+    """
     ensure_doctor_dir()
     now = to_rfc3339(now_utc())
     session = {
@@ -76,33 +332,28 @@ def init_session(patient: str = "") -> dict[str, Any]:
         "hypotheses": [],
         "diagnosis": None,
         "evidence_files": [],
+        "version": 0,
     }
-    save_session(session)
+    if roots:
+        session["roots"] = [os.path.abspath(r) for r in roots]
+    with _session_lock():
+        JOURNAL_FILE.unlink(missing_ok=True)
+        _write_session(session)
     return session
 
 
 def add_symptom(description: str, category: str = "unknown", evidence: str = "") -> dict[str, Any]:
     """Add a symptom to the current session."""
-    session = load_session()
-    if session is None:
-        session = init_session()
-    
     symptom = {
         "description": description,
         "category": category if category in SYMPTOM_CATEGORIES else "unknown",
         "evidence": evidence,
     }
-    session["symptoms"].append(symptom)
-    save_session(session)
-    return session
+    return _journal(("append", "symptoms", symptom))
 
 
 def add_hypothesis(description: str, confidence: int, falsifiable_by: str = "") -> dict[str, Any]:
     """Add a hypothesis to the current session."""
-    session = load_session()
-    if session is None:
-        session = init_session()
-    
     hypothesis = {
         "description": description,
         "confidence": max(0, min(100, confidence)),
@@ -110,118 +361,818 @@ def add_hypothesis(description: str, confidence: int, falsifiable_by: str = "")
         "evidence_against": [],
         "falsifiable_by": falsifiable_by,
     }
-    session["hypotheses"].append(hypothesis)
-    save_session(session)
-    return session
+    return _journal(("append", "hypotheses", hypothesis))
 
 
 def set_diagnosis(summary: str, confidence: int, root_cause: str = "", factors: list[str] | None = None) -> dict[str, Any]:
     """Set the diagnosis for the current session."""
-    session = load_session()
-    if session is None:
-        session = init_session()
-    
-    session["diagnosis"] = {
+    diagnosis = {
         "summary": summary,
         "confidence": max(0, min(100, confidence)),
         "root_cause": root_cause,
         "contributing_factors": factors or [],
     }
-    session["status"] = "diagnosed"
-    save_session(session)
-    return session
+    return _journal(("update", None, {"diagnosis": diagnosis, "status": "diagnosed"}))
+
+
+def _surface_keep(name: str) -> bool:
+    """Return False for hidden and noise names pruned from surface scans."""
+    if name.startswith(".") and name not in SURFACE_ALLOWED_HIDDEN:
+        return False
+    return name not in SURFACE_EXCLUDE_DIRS
+
+
+def _surface_match(rel: str, patterns: list[str]) -> bool:
+    """Match a relative path against rglob-style patterns."""
+    name = os.path.basename(rel)
+    for pattern in patterns:
+        if "/" not in pattern:
+            if fnmatch.fnmatchcase(name, pattern):
+                return True
+        elif fnmatch.fnmatchcase(rel, pattern) or fnmatch.fnmatchcase(rel, f"*/{pattern}"):
+            return True
+    return False
+
 
+def _is_doctor_cache(path: Path) -> bool:
+    """Return True for internal .doctor/ files that are not session artifacts."""
+    if DOCTOR_DIR.name not in path.parts:
+        return False
+    resolved = path.resolve()
+    doctor = DOCTOR_DIR.resolve()
+    if doctor not in resolved.parents:
+        return False
+    return resolved not in (SESSION_FILE.resolve(), TREATMENT_FILE.resolve()) and EVIDENCE_DIR.resolve() not in resolved.parents
 
-def surface_scan(patterns: list[str] | None = None, path: str = ".") -> list[str]:
+
+@traced("surface")
+def surface_scan(patterns: list[str] | None = None, path: str = ".", mode: str = "auto") -> list[str]:
     """
     Scan for relevant files using glob patterns.
     Returns list of matching file paths.
+    Inside a git work tree the files come from the git index and
+    .gitignore is respected; otherwise one pruned walk matches all
+    patterns and directories whose mtime is unchanged since the last scan
+    are reused from the manifest. mode is "auto", "git" or "walk".
     """
     if patterns is None:
         patterns = ["*.py", "*.ts", "*.js", "*.yaml", "*.yml", "*.json", "*.md", "*.toml"]
     
-    results = []
+    listed = git_files(path, exclude_dirs=()) if mode != "walk" else None
+    if listed is not None:
+        files = [
+            rel
+            for rel in (os.path.relpath(f, path) for f in listed)
+            if all(_surface_keep(part) for part in rel.split(os.sep))
+        ]
+    elif mode == "git":
+        raise ValueError(f"'{path}' is not inside a git work tree, or git ignores it")
+    else:
+        manifest = Manifest.load(MANIFEST_FILE)
+        files = manifest.scan(path, _surface_keep)
+        ensure_doctor_dir()
+        manifest.save()
+
     base = Path(path)
-    
-    for pattern in patterns:
-        for f in base.rglob(pattern):
-            # Skip hidden directories and common noise
-            parts = f.parts
-            allowed_hidden = {".doctor", ".github", ".circleci", ".devcontainer"}
-            if any(p.startswith(".") and p not in allowed_hidden for p in parts):
-                continue
-            if any(p in ["node_modules", "__pycache__", "venv", ".venv", "dist", "build"] for p in parts):
-                continue
-            results.append(str(f))
-    
-    return sorted(set(results))
+    return sorted(
+        str(base / rel)
+        for rel in files
+        if _surface_match(rel, patterns) and not _is_doctor_cache(base / rel)
+    )
+
+
+@contextmanager
+def _classified(
+    path: str,
+    include_generated: bool,
+    progress: SearchProgress | None,
+) -> Iterator[Callable[[str], bool] | None]:
+    """
+    Filter a search passes to search_tree as keep: it drops binaries
+    always, and generated, minified, lockfile and large data files unless
+    include_generated. Files are classified by the search's workers as
+    they reach them, so classification shares the search's deadline.
+    Verdicts are cached in .doctor/classify.json by (path, mtime, size),
+    so a file is only read to be classified when new or changed; new ones
+    are saved and skips counted on progress when the search ends. A single
+    file given as path is always searched.
+    """
+    if os.path.isfile(path):
+        yield None
+        return
+    classifier = FileClassifier.load(CLASSIFY_FILE)
+    try:
+        yield lambda file: classifier.keep(file, include_generated)
+    finally:
+        if classifier.fresh:
+            ensure_doctor_dir()
+            classifier.save()
+        if progress is not None:
+            for verdict, n in classifier.skipped.items():
+                progress.skipped[verdict] = progress.skipped.get(verdict, 0) + n
 
 
-def grep_search(term: str, path: str = ".", file_type: str = "") -> tuple[list[dict], int]:
+def grep_search(
+    term: str,
+    path: str = ".",
+    file_type: str = "",
+    max_matches: int | None = GREP_MATCH_LIMIT,
+    mode: str = "auto",
+    progress: SearchProgress | None = None,
+    include_generated: bool = False,
+) -> tuple[list[dict], int]:
     """
-    Search for term using grep. Returns matches and count.
+    Search for term with the in-process search engine. Returns matches and count.
     This is the parameterized determinism pattern:
     - Agent provides subjective term
     - Script returns deterministic results
+
+    When a trigram index exists, only its candidate files are verified.
+    Detail is kept for the first max_matches lines (0 = count only,
+    None = all); the count always covers every match. Inside a git work
+    tree files are listed from git unless mode is "walk". With a
+    SearchProgress, the search stops at its deadline or on Ctrl-C and
+    returns what was found so far; check progress.partial. Binary,
+    generated, minified, lockfile and large data files are skipped (see
+    _classified) unless include_generated.
     """
-    cmd = ["grep", "-rn", "--color=never"]
+    matches, count, _ = _grep(
+        term, path, file_type, max_matches, mode, progress=progress, include_generated=include_generated
+    )
+    return matches, count
+
+
+def grep_search_grouped(
+    term: str,
+    path: str = ".",
+    file_type: str = "",
+    max_matches: int | None = GREP_MATCH_LIMIT,
+    mode: str = "auto",
+    context: int = 0,
+    progress: SearchProgress | None = None,
+    include_generated: bool = False,
+) -> tuple[list[dict], int, list[dict]]:
+    """
+    grep_search that also returns the matches grouped by file. Each group
+    holds the file, its match count, the kept match lines and, with context
+    > 0, merged blocks of surrounding lines ({start, end, lines}) cut from
+    the same read of the file.
+    """
+    return _grep(
+        term, path, file_type, max_matches, mode, context=context, progress=progress, include_generated=include_generated
+    )
+
+
+@traced("search")
+def _grep(
+    term: str,
+    path: str,
+    file_type: str,
+    max_matches: int | None,
+    mode: str = "auto",
+    files: list[str] | None = None,
+    context: int = 0,
+    progress: SearchProgress | None = None,
+    include_generated: bool = False,
+) -> tuple[list[dict], int, list[dict]]:
+    """Run one search. Returns matches, count and per-file groups."""
+    index = _load_index()
+    candidates = index.candidates(term, path, file_type, files, mode) if index else None
+    if candidates is not None:
+        files = candidates
+    limit = sys.maxsize if max_matches is None else max(0, max_matches)
 
-    for d in [".git", "node_modules", "__pycache__", "venv", ".venv", "dist", "build", "vendor"]:
-        cmd.extend(["--exclude-dir", d])
-    if file_type:
-        cmd.extend(["--include", f"*.{file_type}"])
-    cmd.extend([term, path])
-    
-    try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-        lines = result.stdout.strip().split("\n") if result.stdout.strip() else []
-    except (subprocess.TimeoutExpired, FileNotFoundError):
-        lines = []
-    
     matches = []
-    for line in lines[:100]:  # Limit results
-        if ":" in line:
-            parts = line.split(":", 2)
-            if len(parts) >= 3:
+    count = 0
+    groups = []
+    with _classified(path, include_generated, progress) as keep:
+        for file, n, lines, blocks in search_tree(
+            term, path, file_type, limit=limit, files=files, mode=mode, context=context, progress=progress, keep=keep
+        ):
+            count += n
+            kept = lines[:limit - len(matches)]
+            for lineno, text in kept:
                 matches.append({
-                    "file": parts[0],
-                    "line": parts[1],
-                    "content": parts[2].strip(),
+                    "file": file,
+                    "line": str(lineno),
+                    "content": text.strip(),
                 })
-    
-    return matches, len(lines)
+            linenos = [lineno for lineno, _ in kept]
+            groups.append({
+                "file": file,
+                "count": n,
+                "lines": linenos,
+                # Drop windows around matches cut by the overall limit
+                "blocks": [
+                    {"start": first, "end": last, "lines": block}
+                    for first, last, block in blocks
+                    if any(first <= lineno <= last for lineno in linenos)
+                ],
+            })
+
+    return matches, count, groups
+
+
+@traced("search")
+def grep_search_ranked(
+    term: str,
+    path: str = ".",
+    file_type: str = "",
+    max_matches: int | None = GREP_MATCH_LIMIT,
+    mode: str = "auto",
+    progress: SearchProgress | None = None,
+    include_generated: bool = False,
+) -> tuple[list[dict], int]:
+    """
+    grep_search that keeps the max_matches most relevant lines instead of
+    the first ones in walk order. Every match is scored (see doctor_rank)
+    against the surfaced files and the session's symptoms and hypotheses,
+    and only the current top max_matches are held in memory. Each match
+    carries its "score".
+    """
+    index = _load_index()
+    files = index.candidates(term, path, file_type, mode=mode) if index else None
+
+    session = load_session() or {}
+    notes = [s.get("description", "") for s in session.get("symptoms") or []]
+    notes += [h.get("description", "") for h in session.get("hypotheses") or []]
+    with span("rank setup"):
+        ranker = Ranker(surface_scan(path=path, mode=mode), notes)
+
+    total = 0
+    k = None if max_matches is None else max(0, max_matches)
+    # A file's own score is the same for all its lines, so its k best lines by
+    # symptom overlap are all it can add to the top k; the scan keeps only those
+    rank = partial(symptom_score, ranker.terms) if k else None
+
+    def scored(keep: Callable[[str], bool] | None) -> Iterator[tuple[float, dict]]:
+        nonlocal total
+        for file, n, lines, _ in search_tree(
+            term, path, file_type, limit=sys.maxsize if k is None else k, files=files, mode=mode,
+            progress=progress, keep=keep, rank=rank,
+        ):
+            total += n
+            for lineno, text in lines:
+                match = {"file": file, "line": str(lineno), "content": text.strip()}
+                yield ranker.score(file, n, text), match
+
+    with _classified(path, include_generated, progress) as keep:
+        top = top_k(scored(keep), k)
+    matches = [dict(match, score=round(score, 3)) for score, match in top]
+    return matches, total
 
 
-def save_evidence(term: str, matches: list[dict], count: int) -> str:
-    """Save evidence snapshot to .doctor/evidence/."""
+def grep_search_cached(
+    term: str,
+    path: str = ".",
+    file_type: str = "",
+    max_matches: int | None = GREP_MATCH_LIMIT,
+    mode: str = "auto",
+    context: int = 0,
+    progress: SearchProgress | None = None,
+    include_generated: bool = False,
+) -> tuple[list[dict], int, list[dict], bool]:
+    """
+    grep_search_grouped through the query cache in .doctor/cache/. Entries
+    are keyed by (term, path, file_type, excludes, max_matches, mode,
+    context, include_generated) and invalidated by the tree fingerprint,
+    which covers the mtime and size of every listed file, so any edit,
+    addition or removal under path misses. Partial results (see
+    SearchProgress) are never stored. Returns matches, count, groups and
+    whether the result came from the cache.
+    """
+    # List once; the same listing feeds the fingerprint and the search
+    with span("file listing"):
+        files = list(list_files(path, file_type, mode=mode))
+
+    with span("cache lookup"):
+        key = QueryCache.key(
+            term, os.path.abspath(path), file_type, EXCLUDE_DIRS, max_matches, mode, context, include_generated
+        )
+        fingerprint = tree_fingerprint(path, files=files)
+        with _CACHE_LOCK:
+            hit = QueryCache(CACHE_DIR).get(key, fingerprint)
+    if hit is not None:
+        if progress is not None:
+            progress.skipped.update(hit.get("skipped", {}))
+        return hit["matches"], hit["count"], hit["groups"], True
+
+    matches, count, groups = _grep(term, path, file_type, max_matches, mode, files, context, progress, include_generated)
+    if progress is not None and progress.partial:
+        return matches, count, groups, False
     ensure_doctor_dir()
-    
-    content = f"# Evidence: {term}\n\n"
-    content += f"**Date:** {to_rfc3339(now_utc())}\n"
-    content += f"**Matches:** {count}\n\n"
-    content += "## Results\n\n"
-    
-    for m in matches[:50]:
-        content += f"- `{m['file']}:{m['line']}` — {m['content'][:80]}\n"
-    
-    if count > 50:
-        content += f"\n*...and {count - 50} more matches*\n"
-    
-    file_hash = hash_content(content)
-    filename = f"{file_hash}.md"
-    filepath = EVIDENCE_DIR / filename
-    filepath.write_text(content, encoding="utf-8")
-    
-    # Update session
-    session = load_session()
-    if session:
-        if filename not in session.get("evidence_files", []):
-            session.setdefault("evidence_files", []).append(filename)
-            save_session(session)
-    
-    return filename
+    with span("cache store"), _CACHE_LOCK:
+        value = {"matches": matches, "count": count, "groups": groups, "skipped": progress.skipped if progress else {}}
+        QueryCache(CACHE_DIR).put(key, fingerprint, value, [g["file"] for g in groups])
+    return matches, count, groups, False
+
+
+def cache_stats() -> dict[str, int]:
+    """Return query cache statistics."""
+    return QueryCache(CACHE_DIR).stats()
+
 
+def clear_cache() -> int:
+    """Empty the query cache. Returns entries removed."""
+    return QueryCache(CACHE_DIR).clear()
+
+
+@traced("search")
+def grep_search_many(
+    terms: list[str],
+    path: str = ".",
+    file_type: str = "",
+    max_matches: int | None = GREP_MATCH_LIMIT,
+    mode: str = "auto",
+    progress: SearchProgress | None = None,
+    include_generated: bool = False,
+) -> dict[str, tuple[list[dict], int]]:
+    """
+    Search several terms in one tree pass.
+    Returns (matches, count) per term, as grep_search would.
+    """
+    files = None
+    index = _load_index()
+    if index:
+        listed = list(list_files(path, file_type, mode=mode))
+        per_term = [index.candidates(term, path, file_type, listed, mode) for term in terms]
+        if all(c is not None for c in per_term):
+            wanted = {f for c in per_term for f in c}
+            files = [f for f in listed if f in wanted]
+    limit = sys.maxsize if max_matches is None else max(0, max_matches)
+
+    results: dict[str, tuple[list[dict], int]] = {term: ([], 0) for term in terms}
+    with _classified(path, include_generated, progress) as keep:
+        for file, per_file in search_tree_many(
+            terms, path, file_type, limit=limit, files=files, mode=mode, progress=progress, keep=keep
+        ):
+            for term, (n, lines) in zip(terms, per_file):
+                matches, count = results[term]
+                for lineno, text in lines[:limit - len(matches)]:
+                    matches.append({
+                        "file": file,
+                        "line": str(lineno),
+                        "content": text.strip(),
+                    })
+                results[term] = (matches, count + n)
+
+    return results
+
+
+def session_roots() -> list[str]:
+    """Repositories listed under roots: in the session, if any."""
+    session = load_session() or {}
+    return [str(root) for root in session.get("roots") or []]
+
+
+def root_labels(roots: list[str]) -> list[str]:
+    """Short names qualifying paths from each root: its directory name, or the root as given if names collide."""
+    names = [os.path.basename(os.path.abspath(root)) or root for root in roots]
+    return [name if names.count(name) == 1 else root for name, root in zip(names, roots)]
+
+
+def _fan_out(
+    run: Callable[[str, SearchProgress], dict[str, Any]],
+    roots: list[str],
+    timeout: float | None,
+    workers: int,
+    on_result: Callable[[dict[str, Any]], dict[str, Any]] | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Run run(root, progress) for every root on a thread pool, each with its
+    own SearchProgress, so a slow root stops at its own deadline without
+    holding up the others. Results come back in root order, labelled, with
+    an "error" instead of output for a root that failed. On Ctrl-C every
+    unfinished root is stopped and keeps what it found.
+
+    on_result, if given, is called on the calling thread with each root's
+    result as soon as that root finishes, so fast roots are reported while
+    slow ones still run; what it returns is kept in place of the result
+    (e.g. without the matches it already printed).
+    """
+    progresses = [SearchProgress(timeout) for _ in roots]
 
+    def guarded(root: str, progress: SearchProgress) -> dict[str, Any]:
+        if not os.path.isdir(root):
+            return {"error": f"'{root}' is not a directory"}
+        try:
+            return run(root, progress)
+        except (OSError, ValueError) as e:
+            return {"error": str(e)}
+
+    pool = ThreadPoolExecutor(max_workers=max(1, min(workers, len(roots))))
+    pending = {
+        pool.submit(guarded, root, progress): i for i, (root, progress) in enumerate(zip(roots, progresses))
+    }
+    labels = root_labels(roots)
+    results: list[dict[str, Any]] = [{} for _ in roots]
+
+    def finish(done: Iterator[futures.Future]) -> None:
+        for future in done:
+            i = pending.pop(future)
+            result = dict(future.result(), root=labels[i], path=roots[i], progress=progresses[i])
+            results[i] = on_result(result) if on_result is not None else result
+
+    try:
+        try:
+            finish(futures.as_completed(list(pending)))
+        except KeyboardInterrupt:
+            for future, i in pending.items():
+                if not future.done():
+                    progresses[i].cancel("interrupted")
+            finish(futures.as_completed(list(pending)))
+    finally:
+        pool.shutdown(wait=False)
+
+    return results
+
+
+@traced("search")
+def grep_search_roots(
+    term: str,
+    roots: list[str],
+    file_type: str = "",
+    max_matches: int | None = GREP_MATCH_LIMIT,
+    mode: str = "auto",
+    context: int = 0,
+    timeout: float | None = None,
+    cached: bool = True,
+    workers: int = ROOT_WORKERS,
+    include_generated: bool = False,
+    on_result: Callable[[dict[str, Any]], dict[str, Any]] | None = None,
+) -> list[dict[str, Any]]:
+    """
+    grep_search_cached (or grep_search_grouped) over several repositories
+    at once. Returns one result per root, in the order given: its label
+    ("root"), "path", "matches", "count", "groups", whether it was
+    "cached", its SearchProgress and any "error". max_matches and timeout
+    apply to each root separately. on_result sees each root as it
+    finishes (see _fan_out).
+    """
+    def run(root: str, progress: SearchProgress) -> dict[str, Any]:
+        if cached:
+            matches, count, groups, hit = grep_search_cached(
+                term, root, file_type, max_matches, mode, context, progress, include_generated
+            )
+        else:
+            matches, count, groups = grep_search_grouped(
+                term, root, file_type, max_matches, mode, context, progress, include_generated
+            )
+            hit = False
+        return {"matches": matches, "count": count, "groups": groups, "cached": hit}
+
+    return _fan_out(run, roots, timeout, workers, on_result)
+
+
+@traced("surface")
+def surface_scan_roots(
+    patterns: list[str] | None,
+    roots: list[str],
+    mode: str = "auto",
+    workers: int = ROOT_WORKERS,
+) -> list[dict[str, Any]]:
+    """surface_scan over several repositories at once. Returns "files" (or "error") per root, in the order given."""
+    def run(root: str, progress: SearchProgress) -> dict[str, Any]:
+        return {"files": surface_scan(patterns, root, mode)}
+
+    return _fan_out(run, roots, None, workers)
+
+
+def build_index(path: str = ".") -> int:
+    """Build the trigram index for path. Returns number of files indexed."""
+    ensure_doctor_dir()
+    return TrigramIndex(INDEX_DIR, path).build()
+
+
+def update_index() -> dict[str, int] | None:
+    """Re-index changed files. Returns None if no index exists."""
+    index = TrigramIndex.load(INDEX_DIR)
+    if index is None:
+        return None
+    return index.update()
+
+
+def build_symbols(path: str = ".") -> int:
+    """Build the symbol table for path. Returns number of files parsed."""
+    ensure_doctor_dir()
+    return SymbolTable(SYMBOLS_DIR, path).build()
+
+
+def update_symbols() -> dict[str, int] | None:
+    """Re-parse changed files. Returns None if no symbol table exists."""
+    table = SymbolTable.load(SYMBOLS_DIR)
+    if table is None:
+        return None
+    return table.update()
+
+
+def symbol_stats() -> dict[str, Any] | None:
+    """Size of the symbol table, or None if none exists."""
+    table = SymbolTable.load(SYMBOLS_DIR)
+    return table.stats() if table else None
+
+
+def _source_lines(file: str, linenos: set[int]) -> dict[int, str]:
+    """Text of the given lines of one file, read once."""
+    found = {}
+    try:
+        with open(file, encoding="utf-8", errors="replace") as f:
+            for lineno, line in enumerate(f, 1):
+                if lineno in linenos:
+                    found[lineno] = line.strip()
+                    if len(found) == len(linenos):
+                        break
+    except OSError:
+        pass
+    return found
+
+
+@traced("symbols")
+def find_symbol(
+    name: str,
+    references: bool = False,
+    path: str = ".",
+    file_type: str = "",
+    max_matches: int | None = GREP_MATCH_LIMIT,
+) -> tuple[list[dict], int]:
+    """
+    Definitions of name (or, with references, the lines using it) from the
+    symbol table instead of a text scan. Matches have grep_search's shape;
+    definitions add their "kind" and qualified "symbol". The table is
+    brought up to date by file mtime first, and built for path when no
+    table covers it. Returns matches and count.
+    """
+    table = _cached((SymbolTable.path(SYMBOLS_DIR),), lambda: SymbolTable.load(SYMBOLS_DIR))
+    with span("symbols update"):
+        if table is None or not table.covers(path):
+            ensure_doctor_dir()
+            table = SymbolTable(SYMBOLS_DIR, path)
+            table.build()
+        else:
+            table.update()
+
+    found = table.references(name, path, file_type) if references else table.definitions(name, path, file_type)
+    kept = found if max_matches is None else found[:max(0, max_matches)]
+    lines_by_file: dict[str, set[int]] = {}
+    for hit in kept:
+        lines_by_file.setdefault(hit["file"], set()).add(hit["line"])
+    text = {file: _source_lines(file, linenos) for file, linenos in lines_by_file.items()}
+
+    matches = [
+        dict(hit, line=str(hit["line"]), content=text[hit["file"]].get(hit["line"], ""))
+        for hit in kept
+    ]
+    return matches, len(found)
+
+
+def watch_tree(
+    path: str = ".",
+    on_update: Callable[[dict[str, Any]], None] | None = None,
+    debounce: float = WATCH_DEBOUNCE,
+    poll: bool = False,
+) -> None:
+    """
+    Keep the trigram index and surface manifest current while files under
+    path change, until interrupted. The index is built (or caught up) once,
+    then each debounced batch of events re-reads only the files it names.
+    on_update receives one dict per batch: changed, removed, files,
+    relisted (manifest directories), events, ms and the watcher in use.
+    Cached grep results need no work here; they revalidate on lookup.
+    """
+    ensure_doctor_dir()
+    root = os.path.abspath(path)
+    report = on_update or (lambda update: None)
+    index = TrigramIndex.load(INDEX_DIR)
+    if index is None or index.root != root:
+        index = TrigramIndex(INDEX_DIR, path)
+        index.build()
+        report({"action": "build", "files": index.live_count()})
+    else:
+        report({"action": "sync", **index.update()})
+
+    watcher = open_watcher(root, poll)
+    report({"action": "watch", "watcher": watcher.name, "files": index.live_count()})
+
+    def on_batch(paths: set[str] | None) -> None:
+        start = time.perf_counter()
+        if paths is None:
+            # Events were lost; fall back to a full stat pass
+            update = {"action": "sync", **index.update(), "events": 0, "relisted": 0}
+        else:
+            # Follow the same listing the index was built from
+            listed = git_files(root)
+            tracked = None
+            if listed is not None:
+                tracked = {os.path.relpath(f, root) for f in listed}.__contains__
+            update = {"action": "update", **index.apply(paths, tracked), "events": len(paths)}
+            update["relisted"] = _refresh_manifest(root, paths)
+        update["ms"] = (time.perf_counter() - start) * 1000
+        report(update)
+
+    try:
+        watch_loop(watcher, on_batch, debounce)
+    finally:
+        watcher.close()
+
+
+def _refresh_manifest(root: str, paths: set[str]) -> int:
+    """Re-list manifest directories touched by a batch of events."""
+    if not MANIFEST_FILE.exists():
+        return 0
+    dirs = set()
+    for rel in paths:
+        full = os.path.join(root, rel)
+        dirs.add(os.path.dirname(full))
+        if not os.path.lexists(full):
+            dirs.add(full)
+    manifest = Manifest.load(MANIFEST_FILE)
+    relisted = manifest.refresh(dirs, _surface_keep)
+    if relisted:
+        manifest.save()
+    return relisted
+
+
+@traced("evidence write")
+def _write_evidence(
+    term: str,
+    matches: list[dict],
+    count: int,
+    path: str,
+    file_type: str,
+    files: list[dict] | None = None,
+) -> str:
+    """Store one evidence record (deduplicated by content) and return its key."""
+    ensure_doctor_dir()
+    with _session_lock():
+        key, _ = EvidenceStore(EVIDENCE_DIR).put(term, path, file_type, matches, count, to_rfc3339(now_utc()), files)
+    return key
+
+
+def _record_evidence(filenames: list[str]) -> None:
+    """Append evidence filenames to the session in a single journal record."""
+    if not session_exists():
+        return
+    with _session_lock():
+        session = load_session()
+        if not session:
+            return
+        evidence_files = session.get("evidence_files") or []
+        new = [f for f in dict.fromkeys(filenames) if f not in evidence_files]
+        if new:
+            _journal(("extend", "evidence_files", new))
+
+
+def save_evidence(
+    term: str,
+    matches: list[dict],
+    count: int,
+    path: str = ".",
+    file_type: str = "",
+    files: list[dict] | None = None,
+) -> str:
+    """
+    Save evidence to .doctor/evidence/, keyed by a hash of the query and
+    match set. Identical queries reuse the existing record. files adds
+    per-file context blocks from grep_search_grouped. Returns the key.
+    """
+    key = _write_evidence(term, matches, count, path, file_type, files)
+    _record_evidence([key])
+    return key
+
+
+def save_evidence_roots(term: str, results: list[dict[str, Any]], file_type: str = "", context: bool = False) -> dict[str, str]:
+    """
+    Save one evidence record per root with matches from grep_search_roots,
+    in a single session update. Returns the key per root label.
+    """
+    keys = {
+        r["root"]: _write_evidence(term, r["matches"], r["count"], r["path"], file_type, r["groups"] if context else None)
+        for r in results
+        if r.get("count")
+    }
+    _record_evidence(list(keys.values()))
+    return keys
+
+
+def save_evidence_many(
+    results: dict[str, tuple[list[dict], int]],
+    path: str = ".",
+    file_type: str = "",
+) -> dict[str, str]:
+    """Save one evidence record per term with a single session update."""
+    keys = {
+        term: _write_evidence(term, matches, count, path, file_type)
+        for term, (matches, count) in results.items()
+    }
+    _record_evidence(list(keys.values()))
+    return keys
+
+
+async def surface_scan_async(
+    patterns: list[str] | None = None,
+    path: str = ".",
+    mode: str = "auto",
+) -> list[str]:
+    """surface_scan on a worker thread, so it can overlap other operations."""
+    import asyncio
+    return await asyncio.to_thread(surface_scan, patterns, path, mode)
+
+
+async def grep_search_async(
+    term: str,
+    path: str = ".",
+    file_type: str = "",
+    max_matches: int | None = GREP_MATCH_LIMIT,
+    mode: str = "auto",
+    progress: SearchProgress | None = None,
+    include_generated: bool = False,
+) -> tuple[list[dict], int]:
+    """grep_search on a worker thread, so it can overlap other operations."""
+    import asyncio
+    return await asyncio.to_thread(
+        grep_search, term, path, file_type, max_matches, mode, progress, include_generated
+    )
+
+
+async def save_evidence_async(
+    term: str,
+    matches: list[dict],
+    count: int,
+    path: str = ".",
+    file_type: str = "",
+    files: list[dict] | None = None,
+) -> str:
+    """
+    save_evidence on a worker thread. Concurrent saves are serialized by
+    the session lock, like writers in other processes.
+    """
+    import asyncio
+    return await asyncio.to_thread(save_evidence, term, matches, count, path, file_type, files)
+
+
+def list_evidence() -> dict[str, dict[str, Any]]:
+    """Return the evidence index: key -> term, path, type, count, created_at."""
+    return EvidenceStore(EVIDENCE_DIR).index()
+
+
+def render_evidence(key: str) -> str | None:
+    """Render a stored evidence record as markdown, or None if not found."""
+    store = EvidenceStore(EVIDENCE_DIR)
+    record = store.get(key)
+    return store.render(record) if record else None
+
+
+@traced("log ingest")
+def ingest_logs(paths: list[str], min_level: str = "warning") -> dict[str, dict[str, int]]:
+    """
+    Stream log files (plain or .gz) into .doctor/logs/index.json,
+    clustering lines at or above min_level by template. Returns lines read,
+    lines kept and new templates per file.
+    """
+    index = LogIndex.load(LOGS_DIR)
+    stats = {path: index.ingest(path, min_level) for path in paths}
+    ensure_doctor_dir()
+    index.save()
+    return stats
+
+
+def log_templates(limit: int | None = None, min_level: str = "trace") -> list[tuple[str, dict[str, Any]]]:
+    """Ingested log templates, most frequent first."""
+    return LogIndex.load(LOGS_DIR).top(limit, min_level)
+
+
+def log_template(template_id: str) -> tuple[str, dict[str, Any]] | None:
+    """One log template by id or unique prefix."""
+    return LogIndex.load(LOGS_DIR).get(template_id)
+
+
+def add_log_symptom(template_id: str, category: str = "") -> dict[str, Any] | None:
+    """
+    Record a log template as a symptom. The evidence string links back to
+    the template and the byte offsets of its sample lines. Returns the
+    symptom, or None if no template matches.
+    """
+    found = log_template(template_id)
+    if found is None:
+        return None
+    tid, entry = found
+    if not category:
+        if "timeout" in entry["template"].lower() or "timed out" in entry["template"].lower():
+            category = "timeout"
+        else:
+            category = "crash" if entry["level"] == "critical" else "error"
+    seen = f", {entry['first_seen']} .. {entry['last_seen']}" if entry["first_seen"] else ""
+    links = " ".join(f"{source}@{offset}" for source, offset, _ in entry["samples"])
+    symptom = {
+        "description": f"{entry['template'].removeprefix('<ts> ')} ({entry['count']}x {entry['level']}{seen})",
+        "category": category if category in SYMPTOM_CATEGORIES else "unknown",
+        "evidence": f"log:{tid} {links}",
+    }
+    add_symptom(**symptom)
+    return symptom
+
+
+@traced("treatment")
 def generate_treatment(diagnosis: dict[str, Any], options: list[dict[str, Any]], recommended: str = "") -> str:
     """Generate treatment plan markdown from schema."""
     normalized_options: list[dict[str, Any]] = []
@@ -304,41 +1255,106 @@ def generate_treatment(diagnosis: dict[str, Any], options: list[dict[str, Any]],
     TREATMENT_FILE.write_text(content, encoding="utf-8")
     
     # Update session
-    session = load_session()
-    if session:
-        session["status"] = "treated"
-        save_session(session)
+    update_session(lambda session: session.update(status="treated"))
     
     return str(TREATMENT_FILE)
 
 
+def _archive_record() -> dict[str, Any] | None:
+    """Snapshot the session, treatment plan and evidence summaries for the history."""
+    session = load_session()
+    if session is None:
+        return None
+    project = os.path.abspath(".")
+    store = EvidenceStore(EVIDENCE_DIR)
+    evidence = []
+    for key, meta in store.index().items():
+        record = store.get(key) or {}
+        files = list(dict.fromkeys(m["file"] for m in record.get("matches") or []))
+        evidence.append({
+            "key": key,
+            "term": meta.get("term", ""),
+            "count": meta.get("count", 0),
+            "files": files[:ARCHIVE_EVIDENCE_FILES],
+        })
+    try:
+        treatment = TREATMENT_FILE.read_text(encoding="utf-8")
+    except OSError:
+        treatment = ""
+    return {
+        "uid": hash_content(f"{project}\0{session.get('created_at')}\0{session.get('patient')}"),
+        "project": project,
+        "patient": session.get("patient", ""),
+        "status": session.get("status", "investigating"),
+        "created_at": session.get("created_at"),
+        "archived_at": to_rfc3339(now_utc()),
+        "symptoms": session.get("symptoms") or [],
+        "hypotheses": session.get("hypotheses") or [],
+        "diagnosis": session.get("diagnosis"),
+        "treatment": treatment,
+        "evidence": evidence,
+    }
+
+
+@traced("archive")
+def archive_session() -> dict[str, Any] | None:
+    """
+    Save the current session (symptoms, hypotheses, diagnosis, treatment
+    plan and evidence summaries) to the history database. Archiving the
+    same session again replaces its entry. Returns id, created and the
+    archive's session total, or None if no session exists.
+    """
+    with _session_lock():
+        record = _archive_record()
+    if record is None:
+        return None
+    with History.open() as history:
+        session_id, created = history.archive(record)
+        total = history.count()
+    return {"id": session_id, "created": created, "total": total, "path": str(history.path)}
+
+
+@traced("recall")
+def recall_sessions(text: str, limit: int = RECALL_LIMIT, project_only: bool = False) -> list[dict[str, Any]]:
+    """Past sessions most similar to text, best first (see History.recall)."""
+    with History.open() as history:
+        return history.recall(text, limit, os.path.abspath(".") if project_only else None)
+
+
 def clean_doctor() -> bool:
-    """Remove .doctor directory."""
+    """Remove .doctor directory, keeping a running server's socket."""
     if not DOCTOR_DIR.exists():
         return False
     import shutil
-    shutil.rmtree(DOCTOR_DIR)
+    if not SOCKET_FILE.exists():
+        shutil.rmtree(DOCTOR_DIR)
+        return True
+    for child in DOCTOR_DIR.iterdir():
+        if child.name == SOCKET_FILE.name:
+            continue
+        if child.is_dir() and not child.is_symlink():
+            shutil.rmtree(child)
+        else:
+            child.unlink()
     return True
 
 
 def get_status() -> dict[str, Any]:
-    """Get comprehensive status of current session."""
-    if not session_exists():
-        return {"exists": False}
-    
-    session = load_session()
-    if session is None:
+    """
+    Get comprehensive status of current session. Answered from the
+    status.json sidecar when it matches the session files; otherwise the
+    session is loaded and the sidecar rewritten.
+    """
+    identity = session_identity()
+    if identity is None:
         return {"exists": False}
     
-    evidence_count = len(list(EVIDENCE_DIR.glob("*.md"))) if EVIDENCE_DIR.exists() else 0
+    summary = load_summary(identity)
+    if summary is None:
+        session = load_session()
+        if session is None:
+            return {"exists": False}
+        summary = summarize(session)
+        save_summary(summary, identity)
     
-    return {
-        "exists": True,
-        "status": session.get("status", "investigating"),
-        "patient": session.get("patient", "unknown"),
-        "symptoms": len(session.get("symptoms", [])),
-        "hypotheses": len(session.get("hypotheses", [])),
-        "evidence_files": evidence_count,
-        "diagnosed": session.get("diagnosis") is not None,
-        "treated": TREATMENT_FILE.exists(),
-    }
+    return status_from(summary)
@@ -0,0 +1,156 @@
+"""Run a plan of independent doctor operations concurrently."""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+from doctor_parse import (
+    GREP_MATCH_LIMIT,
+    YAML_LOADER,
+    grep_search_async,
+    save_evidence_async,
+    surface_scan_async,
+)
+from doctor_search import WALK_MODES, SearchProgress
+
+
+PLAN_OPS = ("surface", "grep")
+DEFAULT_CONCURRENCY = 4
+
+
+def _check_operation(n: int, op: Any) -> dict[str, Any]:
+    """Validate the shape of one plan entry; n is its 1-based position for error messages."""
+    if not isinstance(op, dict):
+        raise ValueError(f"operation {n}: expected a mapping")
+    name = op.get("op")
+    if name not in PLAN_OPS:
+        raise ValueError(f"operation {n}: 'op' must be one of {', '.join(PLAN_OPS)}")
+    if name == "grep" and not op.get("term"):
+        raise ValueError(f"operation {n}: grep needs a 'term'")
+    return op
+
+
+def _is_int(value: Any) -> bool:
+    """True for ints, but not bools."""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _check_options(op: dict[str, Any]) -> None:
+    """
+    Validate an operation's options before it runs. Raises ValueError,
+    which fails only this operation.
+    """
+    if op.get("mode", "auto") not in WALK_MODES:
+        raise ValueError(f"'mode' must be one of {', '.join(WALK_MODES)}")
+    patterns = op.get("patterns")
+    if patterns is not None and not isinstance(patterns, str) and (
+        not isinstance(patterns, list) or not all(isinstance(p, str) for p in patterns)
+    ):
+        raise ValueError("'patterns' must be a string or a list of strings")
+    timeout = op.get("timeout")
+    if timeout is not None and (not isinstance(timeout, (int, float)) or isinstance(timeout, bool) or timeout <= 0):
+        raise ValueError("'timeout' must be a positive number of seconds")
+    max_matches = op.get("max_matches")
+    if max_matches is not None and (not _is_int(max_matches) or max_matches < 0):
+        raise ValueError("'max_matches' must be a non-negative integer")
+    context = op.get("context")
+    if context is not None and (not _is_int(context) or context < 0):
+        raise ValueError("'context' must be a non-negative integer")
+    if context:
+        raise ValueError("'context' is not supported in plans; use doctor grep --context")
+    if not isinstance(op.get("include_generated", False), bool):
+        raise ValueError("'include_generated' must be true or false")
+
+
+def load_plan(path: str) -> tuple[list[dict[str, Any]], int | None]:
+    """
+    Read a plan file: either a list of operations or a mapping with an
+    "operations" list and an optional "concurrency". Each operation is a
+    mapping with an "op" (surface or grep) and that command's options:
+
+        concurrency: 4
+        operations:
+          - op: surface
+            patterns: ["*.py", "*.yaml"]
+          - op: grep
+            term: connection timeout
+            type: py
+            save: true
+            timeout: 10
+            include_generated: true
+
+    Returns the operations and the concurrency, if the plan sets one.
+    """
+    try:
+        data = yaml.load(Path(path).read_text(encoding="utf-8"), Loader=YAML_LOADER)
+    except yaml.YAMLError as e:
+        raise ValueError(f"invalid YAML: {e}") from e
+    concurrency = None
+    if isinstance(data, dict):
+        concurrency = data.get("concurrency")
+        data = data.get("operations")
+    if not isinstance(data, list):
+        raise ValueError("plan must be a list of operations or have an 'operations' list")
+    if concurrency is not None and (not isinstance(concurrency, int) or concurrency < 1):
+        raise ValueError("'concurrency' must be a positive integer")
+    return [_check_operation(n, op) for n, op in enumerate(data, 1)], concurrency
+
+
+async def _surface(op: dict[str, Any]) -> dict[str, Any]:
+    """Run a surface operation."""
+    patterns = op.get("patterns")
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    files = await surface_scan_async(patterns, str(op.get("path", ".")), op.get("mode", "auto"))
+    return {"files": files}
+
+
+async def _grep(op: dict[str, Any]) -> dict[str, Any]:
+    """Run a grep operation, saving evidence when asked."""
+    term = str(op["term"])
+    path = str(op.get("path", "."))
+    file_type = str(op.get("type", ""))
+    save = bool(op.get("save"))
+    # Evidence keeps the full match set, as with grep --save
+    max_matches = op.get("max_matches", None if save else GREP_MATCH_LIMIT)
+    progress = SearchProgress(op.get("timeout"))
+
+    matches, count = await grep_search_async(
+        term, path, file_type, max_matches, op.get("mode", "auto"), progress, op.get("include_generated", False)
+    )
+    result = {"matches": matches, "count": count, "progress": progress, "evidence": None}
+    if save and count:
+        result["evidence"] = await save_evidence_async(term, matches, count, path, file_type)
+    return result
+
+
+_RUNNERS = {"surface": _surface, "grep": _grep}
+
+
+async def run_plan(operations: list[dict[str, Any]], concurrency: int = DEFAULT_CONCURRENCY) -> list[dict[str, Any]]:
+    """
+    Run operations with at most concurrency of them in flight. Returns one
+    result per operation, in plan order, with its wall time in "ms" and an
+    "error" instead of output if it failed; a failure does not stop the
+    other operations.
+    """
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+    limit = asyncio.Semaphore(concurrency)
+
+    async def run(op: dict[str, Any]) -> dict[str, Any]:
+        async with limit:
+            start = time.perf_counter()
+            try:
+                _check_options(op)
+                result = await _RUNNERS[op["op"]](op)
+            except (OSError, ValueError, TypeError, RuntimeError) as e:
+                result = {"error": str(e)}
+            result["ms"] = (time.perf_counter() - start) * 1000
+            return result
+
+    return await asyncio.gather(*(run(op) for op in operations))
@@ -0,0 +1,140 @@
+"""Relevance scoring for grep matches."""
+
+import heapq
+import math
+import os
+import re
+import time
+from typing import Any, Iterable
+
+from doctor_classify import LOCKFILES
+
+# Component weights; each component scores in [0, 1].
+RANK_WEIGHTS = {
+    "density": 0.30,
+    "type": 0.20,
+    "surface": 0.15,
+    "recency": 0.15,
+    "symptoms": 0.20,
+}
+
+SOURCE_EXTENSIONS = frozenset({
+    ".py", ".ts", ".tsx", ".js", ".jsx", ".go", ".rs", ".java", ".kt", ".rb",
+    ".c", ".cc", ".cpp", ".h", ".hpp", ".cs", ".php", ".scala", ".swift", ".sh",
+})
+CONFIG_EXTENSIONS = frozenset({".yaml", ".yml", ".toml", ".json", ".ini", ".cfg", ".conf", ".env", ".tf"})
+DOC_EXTENSIONS = frozenset({".md", ".rst", ".txt"})
+
+TEST_DIRS = frozenset({"test", "tests", "spec", "specs", "__tests__", "testdata", "fixtures"})
+VENDOR_DIRS = frozenset({"vendor", "third_party", "thirdparty", "external", "node_modules"})
+
+# A file with this many matches gets the full density score.
+DENSITY_SATURATION = 20
+RECENCY_HALF_LIFE_DAYS = 30.0
+
+STOPWORDS = frozenset({
+    "the", "and", "for", "with", "from", "that", "this", "when", "are", "was", "not",
+    "but", "after", "before", "into", "our", "all", "any", "can", "has", "have", "been",
+})
+WORD_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]{2,}")
+
+
+def symptom_terms(texts: Iterable[str]) -> frozenset[str]:
+    """Lowercase words of three or more letters from symptom and hypothesis text."""
+    return frozenset(
+        word.lower()
+        for text in texts
+        for word in WORD_RE.findall(text or "")
+        if word.lower() not in STOPWORDS
+    )
+
+
+def type_score(file: str) -> float:
+    """Prefer source over config over docs; demote tests, vendored code and lockfiles."""
+    name = os.path.basename(file)
+    if name in LOCKFILES or name.endswith((".min.js", ".min.css", ".map")):
+        return 0.05
+    ext = os.path.splitext(name)[1].lower()
+    if ext in SOURCE_EXTENSIONS:
+        score = 1.0
+    elif ext in CONFIG_EXTENSIONS:
+        score = 0.8
+    elif ext in DOC_EXTENSIONS:
+        score = 0.5
+    else:
+        score = 0.4
+    parts = set(file.replace("\\", "/").split("/")[:-1])
+    if parts & VENDOR_DIRS:
+        score *= 0.3
+    elif parts & TEST_DIRS or name.startswith("test_") or ".test." in name or ".spec." in name:
+        score *= 0.6
+    return score
+
+
+def symptom_score(terms: frozenset[str], file: str, text: str) -> float:
+    """Share of symptom terms found in the line or its path, saturating at three."""
+    if not terms:
+        return 0.0
+    words = {w.lower() for w in WORD_RE.findall(text)} | {w.lower() for w in WORD_RE.findall(file)}
+    return min(1.0, len(words & terms) / 3)
+
+
+class Ranker:
+    """
+    Scores matches by term density in their file, file type, membership in
+    the surfaced file set, recency and overlap with recorded symptoms.
+    File-level components are computed once per file.
+    """
+
+    def __init__(self, surfaced: Iterable[str] = (), symptoms: Iterable[str] = (), now: float | None = None) -> None:
+        self.surfaced = frozenset(os.path.normpath(f) for f in surfaced)
+        self.terms = symptom_terms(symptoms)
+        self.now = time.time() if now is None else now
+        self._files: dict[str, float] = {}
+
+    def _recency(self, file: str) -> float:
+        """1.0 for a file modified now, halving every RECENCY_HALF_LIFE_DAYS."""
+        try:
+            age_days = max(0.0, self.now - os.stat(file).st_mtime) / 86400
+        except OSError:
+            return 0.0
+        return 0.5 ** (age_days / RECENCY_HALF_LIFE_DAYS)
+
+    def file_score(self, file: str, count: int) -> float:
+        """Weighted density, type, surface and recency components of file."""
+        cached = self._files.get(file)
+        if cached is not None:
+            return cached
+        density = math.log1p(count) / math.log1p(DENSITY_SATURATION)
+        score = (
+            RANK_WEIGHTS["density"] * min(1.0, density)
+            + RANK_WEIGHTS["type"] * type_score(file)
+            + RANK_WEIGHTS["surface"] * (1.0 if os.path.normpath(file) in self.surfaced else 0.0)
+            + RANK_WEIGHTS["recency"] * self._recency(file)
+        )
+        self._files[file] = score
+        return score
+
+    def line_score(self, file: str, text: str) -> float:
+        """Share of symptom words found in the line or its path (see symptom_score)."""
+        return symptom_score(self.terms, file, text)
+
+    def score(self, file: str, count: int, text: str) -> float:
+        """Total score of one matching line, in [0, 1]."""
+        return self.file_score(file, count) + RANK_WEIGHTS["symptoms"] * self.line_score(file, text)
+
+
+def top_k(scored: Iterable[tuple[float, Any]], k: int | None) -> list[tuple[float, Any]]:
+    """
+    Keep the k highest scored items with a bounded min-heap, so memory is
+    O(k) however many items stream past. Ties keep the earlier item.
+    Returns items best first; k=None keeps everything.
+    """
+    heap: list[tuple[float, int, Any]] = []
+    for seq, (score, item) in enumerate(scored):
+        entry = (score, -seq, item)
+        if k is None or len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif k > 0 and entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+    return [(score, item) for score, _, item in sorted(heap, key=lambda e: e[:2], reverse=True)]
@@ -0,0 +1,832 @@
+"""In-process parallel search engine for doctor evidence gathering."""
+
+import fnmatch
+import heapq
+import mmap
+import os
+import re
+import shutil
+import stat
+import subprocess
+import threading
+import time
+from collections import deque
+from concurrent import futures
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache, partial
+from typing import Any, Callable, Iterable, Iterator
+
+
+EXCLUDE_DIRS = (".doctor", ".git", "node_modules", "__pycache__", "venv", ".venv", "dist", "build", "vendor")
+MAX_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+MMAP_MIN_SIZE = 64 * 1024
+BINARY_SNIFF_BYTES = 8192
+# Match lines longer than this (bytes) are cut to a window around the match.
+MATCH_LINE_MAX = 1024
+# A bounded scan checks its deadline after each newline-aligned segment of this many bytes.
+SCAN_SEGMENT = 8 * 1024 * 1024
+# Seconds to wait for running scans to stop at the deadline before abandoning them.
+STOP_GRACE = 2.0
+
+# Files at least this big are split into newline-aligned chunks searched across processes.
+LARGE_FILE_SIZE = 64 * 1024 * 1024
+LARGE_FILE_CHUNK = 16 * 1024 * 1024
+LARGE_FILE_WORKERS = os.cpu_count() or 1
+
+# One process pool serves every chunked scan, so several large files never oversubscribe the CPUs.
+_CHUNK_POOL: ProcessPoolExecutor | None = None
+_CHUNK_POOL_LOCK = threading.Lock()
+
+# How candidate files are listed: git when inside a work tree, git only, or a plain walk.
+WALK_MODES = ("auto", "git", "walk")
+
+# Characters that make a grep basic regular expression (BRE) non-literal.
+BRE_SPECIAL = set(".[]*^$\\")
+
+POSIX_CLASSES = {
+    "alpha": "a-zA-Z",
+    "digit": "0-9",
+    "alnum": "a-zA-Z0-9",
+    "upper": "A-Z",
+    "lower": "a-z",
+    "space": " \\t\\r\\f\\v",
+    "blank": " \\t",
+    "xdigit": "0-9A-Fa-f",
+    "punct": "!-/:-@\\[-`{-~",
+}
+
+# (buf, pos, end) -> offset of the first match starting in buf[pos:end], or -1
+Matcher = Callable[[bytes, int, int], int]
+# (first line, last line, lines) of one merged context window
+Block = tuple[int, int, list[str]]
+FileResult = tuple[str, int, list[tuple[int, str]], list[Block]]
+
+
+def is_literal(term: str) -> bool:
+    """Return True if term has no BRE metacharacters."""
+    return not any(c in BRE_SPECIAL for c in term)
+
+
+def _translate_bracket(term: str, i: int) -> tuple[str, int]:
+    """Translate a bracket expression starting at term[i] == '['."""
+    j = i + 1
+    out = "["
+    if j < len(term) and term[j] == "^":
+        out += "^\\n"
+        j += 1
+    if j < len(term) and term[j] == "]":
+        out += "\\]"
+        j += 1
+    while j < len(term) and term[j] != "]":
+        if term.startswith("[:", j):
+            end = term.find(":]", j + 2)
+            name = term[j + 2:end] if end >= 0 else ""
+            if name in POSIX_CLASSES:
+                out += POSIX_CLASSES[name]
+                j = end + 2
+                continue
+        c = term[j]
+        out += "\\" + c if c in "\\[" else c
+        j += 1
+    if j >= len(term):
+        raise ValueError(f"unterminated bracket expression in '{term}'")
+    return out + "]", j + 1
+
+
+def translate_bre(term: str) -> str:
+    """
+    Translate a grep basic regular expression (BRE) into Python `re` syntax.
+    Patterns never match across line boundaries, mirroring grep's line model.
+    """
+    out: list[str] = []
+    i = 0
+    at_start = True
+    while i < len(term):
+        c = term[i]
+        if c == "\\" and i + 1 < len(term):
+            nxt = term[i + 1]
+            if nxt in "(|":
+                out.append(nxt)
+                at_start = True
+                i += 2
+                continue
+            if nxt in "){}+?" or nxt.isdigit():
+                out.append(nxt if not nxt.isdigit() else "\\" + nxt)
+            elif nxt in "<>":
+                out.append("\\b")
+            elif nxt in "bBw":
+                out.append("\\" + nxt)
+            elif nxt == "W":
+                out.append("[^\\w\\n]")
+            elif nxt == "s":
+                out.append("[^\\S\\n]")
+            elif nxt == "S":
+                out.append("\\S")
+            else:
+                out.append(re.escape(nxt))
+            i += 2
+        elif c == "[":
+            bracket, i = _translate_bracket(term, i)
+            out.append(bracket)
+        elif c == "*" and at_start:
+            out.append("\\*")
+            i += 1
+        elif c == "^":
+            out.append("^" if at_start else "\\^")
+            i += 1
+            at_start = out[-1] == "^"
+            continue
+        elif c == "$":
+            at_end = i + 1 == len(term) or term.startswith("\\)", i + 1) or term.startswith("\\|", i + 1)
+            out.append("$" if at_end else "\\$")
+            i += 1
+        elif c == ".":
+            out.append(".")
+            i += 1
+        elif c == "*":
+            out.append("*")
+            i += 1
+        else:
+            out.append(re.escape(c))
+            i += 1
+        at_start = False
+    return "".join(out)
+
+
+def compile_prefilter(terms: list[str]) -> Matcher | None:
+    """
+    Compile terms into one alternation that finds the first offset where any
+    term matches. Returns None if the terms cannot be combined (for example
+    when back-references would be renumbered).
+    """
+    parts = []
+    for term in terms:
+        if not is_literal(term) and re.search(r"\\[1-9]", term):
+            return None
+        pattern = re.escape(term) if is_literal(term) else translate_bre(term)
+        parts.append(f"(?:{pattern})")
+    try:
+        regex = re.compile("|".join(parts).encode("utf-8"), re.MULTILINE)
+    except re.error:
+        return None
+
+    def find(buf: bytes, pos: int, end: int) -> int:
+        m = regex.search(buf, pos, end)
+        return m.start() if m else -1
+
+    return find
+
+
+def compile_matcher(term: str) -> Matcher:
+    """
+    Compile term into a matcher returning the offset of the next match at or
+    after pos and before end, or -1. end must be a line boundary. Literal
+    terms use a plain substring search.
+    """
+    if is_literal(term):
+        needle = term.encode("utf-8")
+        return lambda buf, pos, end: buf.find(needle, pos, end)
+
+    try:
+        regex = re.compile(translate_bre(term).encode("utf-8"), re.MULTILINE)
+    except re.error as e:
+        raise ValueError(f"invalid pattern '{term}': {e}") from e
+
+    def find(buf: bytes, pos: int, end: int) -> int:
+        m = regex.search(buf, pos, end)
+        return m.start() if m else -1
+
+    return find
+
+
+def iter_files(path: str = ".", file_type: str = "", exclude_dirs: Iterable[str] = EXCLUDE_DIRS) -> Iterator[str]:
+    """
+    Walk path once in sorted, deterministic order, pruning excluded
+    directories before descending. Symlinks are not followed.
+    """
+    include = f"*.{file_type}" if file_type else ""
+    excluded = frozenset(exclude_dirs)
+
+    if os.path.isfile(path):
+        if not include or fnmatch.fnmatch(os.path.basename(path), include):
+            yield path
+        return
+
+    def walk(dirpath: str) -> Iterator[str]:
+        try:
+            with os.scandir(dirpath) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in excluded:
+                        yield from walk(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    if not include or fnmatch.fnmatch(entry.name, include):
+                        yield entry.path
+            except OSError:
+                continue
+
+    yield from walk(path)
+
+
+def _git_root(path: str) -> str | None:
+    """Return the nearest of path and its parents holding a .git entry, or None."""
+    current = os.path.abspath(path)
+    while True:
+        if os.path.exists(os.path.join(current, ".git")):
+            return current
+        parent = os.path.dirname(current)
+        if parent == current:
+            return None
+        current = parent
+
+
+def _git_ignored(path: str) -> bool:
+    """Return True if git ignores the directory path itself (e.g. logs/ in .gitignore)."""
+    cmd = ["git", "-C", path, "check-ignore", "-q", "."]
+    try:
+        return subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0
+    except OSError:
+        return False
+
+
+def git_files(path: str = ".", file_type: str = "", exclude_dirs: Iterable[str] = EXCLUDE_DIRS) -> list[str] | None:
+    """
+    List regular files under path from the git index plus untracked files
+    not ignored by .gitignore, in the same order and format as iter_files.
+    Ignored directories are never visited. Returns None outside a git work
+    tree, when git is unavailable, and when path was asked for explicitly
+    but git would hide it: path is itself ignored or git lists nothing
+    under it. Callers then walk path instead.
+    """
+    if os.path.isfile(path) or shutil.which("git") is None:
+        return None
+    root = _git_root(path)
+    if root is None or (root != os.path.abspath(path) and _git_ignored(path)):
+        return None
+    cmd = ["git", "-C", path, "ls-files", "-z", "--cached", "--others", "--exclude-standard"]
+    try:
+        proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    except OSError:
+        return None
+    if proc.returncode != 0:
+        return None
+
+    include = f"*.{file_type}" if file_type else ""
+    excluded = frozenset(exclude_dirs)
+    # Unmerged paths appear once per stage; dict keeps the first
+    rels = dict.fromkeys(os.fsdecode(raw) for raw in proc.stdout.split(b"\0") if raw)
+    if not rels:
+        return None
+    files = []
+    for rel in rels:
+        parts = rel.split("/")
+        if excluded.intersection(parts[:-1]):
+            continue
+        if include and not fnmatch.fnmatch(parts[-1], include):
+            continue
+        full = os.path.join(path, *parts)
+        try:
+            # Skip deleted-but-tracked files, symlinks and submodules, as the walk does
+            if not stat.S_ISREG(os.lstat(full).st_mode):
+                continue
+        except OSError:
+            continue
+        files.append((parts, full))
+    files.sort(key=lambda f: f[0])
+    return [full for _, full in files]
+
+
+def list_files(
+    path: str = ".",
+    file_type: str = "",
+    exclude_dirs: Iterable[str] = EXCLUDE_DIRS,
+    mode: str = "auto",
+) -> Iterable[str]:
+    """
+    List candidate files under path. "auto" uses git_files inside a git
+    work tree and falls back to iter_files elsewhere, or when path is
+    ignored by git; "git" requires a work tree; "walk" always walks.
+    """
+    if mode not in WALK_MODES:
+        raise ValueError(f"unknown listing mode '{mode}'")
+    if mode != "walk":
+        files = git_files(path, file_type, exclude_dirs)
+        if files is not None:
+            return files
+        if mode == "git":
+            raise ValueError(f"'{path}' is not inside a git work tree, or git ignores it")
+    return iter_files(path, file_type, exclude_dirs)
+
+
+def _line_text(buf: bytes, line_start: int, line_end: int, match: int) -> str:
+    """
+    Decode one match line. Lines over MATCH_LINE_MAX (minified bundles,
+    one-line JSON) are cut to a window around the match, marked with "...".
+    """
+    if line_end - line_start <= MATCH_LINE_MAX:
+        return buf[line_start:line_end].decode("utf-8", "replace")
+    lo = max(line_start, match - MATCH_LINE_MAX // 2)
+    hi = min(line_end, lo + MATCH_LINE_MAX)
+    lo = max(line_start, hi - MATCH_LINE_MAX)
+    text = buf[lo:hi].decode("utf-8", "ignore")
+    return ("..." if lo > line_start else "") + text + ("..." if hi < line_end else "")
+
+
+def _keep_best(best: list, limit: int, score: float, lineno: int, text: str) -> None:
+    """Push a line into best, a min-heap of at most limit lines; ties keep the earlier line."""
+    entry = (score, -lineno, text)
+    if len(best) < limit:
+        heapq.heappush(best, entry)
+    elif limit > 0 and entry[:2] > best[0][:2]:
+        heapq.heapreplace(best, entry)
+
+
+def _best_lines(best: list) -> list[tuple[int, str]]:
+    """The lines held by a _keep_best heap, in line order."""
+    return sorted((-neg, text) for _, neg, text in best)
+
+
+def scan_buffer(
+    buf: bytes,
+    find: Matcher,
+    limit: int,
+    progress: "SearchProgress | None" = None,
+    rank: Callable[[str], float] | None = None,
+) -> tuple[int, list[tuple[int, str]]]:
+    """
+    Count matching lines in buf and collect up to limit (line number, text)
+    pairs. Only the regions around matches are touched; once limit is
+    reached only the running count is kept. With rank, every matching line
+    is scored instead and the limit highest scored are kept (earlier lines
+    first on ties), in line order, without holding the rest. With a
+    progress object, buf is scanned in newline-aligned segments of
+    SCAN_SEGMENT bytes and the scan stops at its deadline, returning what
+    it counted so far.
+    """
+    count = 0
+    lines: list[tuple[int, str]] = []
+    best: list = []
+    size = len(buf)
+    pos = 0
+    lineno = 1
+    counted_to = 0
+    end = -1
+
+    while pos <= size:
+        if pos > end:
+            if progress is not None and progress.expired():
+                break
+            end = buf.find(b"\n", pos + SCAN_SEGMENT) if progress is not None else -1
+            if end < 0:
+                end = size
+        start = find(buf, pos, end)
+        if start < 0:
+            pos = end + 1
+            continue
+        line_start = buf.rfind(b"\n", pos, start) + 1 or pos
+        if line_start >= size:
+            break
+        line_end = buf.find(b"\n", start)
+        if line_end < 0:
+            line_end = size
+        count += 1
+        if rank is not None:
+            lineno += buf[counted_to:line_start].count(b"\n")
+            counted_to = line_start
+            text = _line_text(buf, line_start, line_end, start)
+            _keep_best(best, limit, rank(text), lineno, text)
+        elif len(lines) < limit:
+            lineno += buf[counted_to:line_start].count(b"\n")
+            counted_to = line_start
+            lines.append((lineno, _line_text(buf, line_start, line_end, start)))
+        pos = line_end + 1
+
+    return count, _best_lines(best) if rank is not None else lines
+
+
+def context_blocks(buf: bytes, linenos: list[int], context: int) -> list[Block]:
+    """
+    Cut context lines around each of the ascending linenos out of buf.
+    Overlapping or adjacent windows merge into one block, so every line is
+    decoded at most once.
+    """
+    windows: list[list[int]] = []
+    for lineno in linenos:
+        lo, hi = max(1, lineno - context), lineno + context
+        if windows and lo <= windows[-1][1] + 1:
+            windows[-1][1] = max(windows[-1][1], hi)
+        else:
+            windows.append([lo, hi])
+
+    blocks: list[Block] = []
+    size = len(buf)
+    pos = 0
+    lineno = 1
+    for lo, hi in windows:
+        while lineno < lo and pos < size:
+            end = buf.find(b"\n", pos)
+            pos = size if end < 0 else end + 1
+            lineno += 1
+        lines = []
+        while lineno <= hi and pos < size:
+            end = buf.find(b"\n", pos)
+            if end < 0:
+                end = size
+            lines.append(buf[pos:end].decode("utf-8", "replace").rstrip("\r"))
+            pos = end + 1
+            lineno += 1
+        if lines:
+            blocks.append((lo, lo + len(lines) - 1, lines))
+    return blocks
+
+
+def with_buffer(
+    path: str,
+    fn: Callable[[bytes], Any],
+    default: Any,
+    large: Callable[[], Any] | None = None,
+) -> Any:
+    """
+    Read path once (mmap above MMAP_MIN_SIZE) and apply fn to its contents.
+    Returns default for empty, binary and unreadable files. Files of
+    LARGE_FILE_SIZE or more are handed to large instead, when given.
+    """
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return default
+            if large is not None and size >= LARGE_FILE_SIZE:
+                if f.read(BINARY_SNIFF_BYTES).find(b"\0") >= 0:
+                    return default
+                return large()
+            if size < MMAP_MIN_SIZE:
+                buf = f.read()
+                if b"\0" in buf[:BINARY_SNIFF_BYTES]:
+                    return default
+                return fn(buf)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if mm.find(b"\0", 0, BINARY_SNIFF_BYTES) >= 0:
+                    return default
+                return fn(mm)
+    except (OSError, ValueError):
+        return default
+
+
+def search_file(
+    path: str,
+    find: Matcher,
+    limit: int,
+    term: str | None = None,
+    progress: "SearchProgress | None" = None,
+    rank: Callable[[str], float] | None = None,
+) -> tuple[int, list[tuple[int, str]]]:
+    """
+    Search a single file, skipping binaries and unreadable files. Given the
+    term, files of LARGE_FILE_SIZE or more go through search_large_file.
+    With a progress object the scan stops at its deadline, and with rank
+    the best scored lines are kept (see scan_buffer).
+    """
+    large = (lambda: search_large_file(path, term, limit, progress=progress, rank=rank)) if term is not None else None
+    return with_buffer(path, lambda buf: scan_buffer(buf, find, limit, progress, rank), (0, []), large)
+
+
+@lru_cache(maxsize=16)
+def _worker_matcher(term: str) -> Matcher:
+    """Matchers are closures and cannot be pickled; each worker compiles its own once."""
+    return compile_matcher(term)
+
+
+def _scan_chunk(
+    path: str,
+    term: str,
+    start: int,
+    end: int,
+    limit: int,
+    deadline: float | None = None,
+    rank: Callable[[str], float] | None = None,
+) -> tuple[int, list[tuple[int, str]], int]:
+    """
+    Search bytes [start, end) of path, stopping at deadline (time.monotonic,
+    which worker processes share). Returns the count, up to limit (line
+    number within the chunk, text) pairs, the best scored with rank (which
+    must pickle), and the chunk's newline count.
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        buf = mm[start:end]
+    progress = None
+    if deadline is not None:
+        progress = SearchProgress()
+        progress.deadline = deadline
+    count, lines = scan_buffer(buf, _worker_matcher(term), limit, progress, rank)
+    return count, lines, buf.count(b"\n")
+
+
+def _ignore_sigint() -> None:
+    """Chunk workers leave Ctrl-C to the search, which stops at its next check."""
+    import signal
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _chunk_pool() -> ProcessPoolExecutor:
+    """
+    The process pool shared by every chunked scan, created on first use.
+    Searches call this from ordered_map's threads, so workers are started by
+    a fork server (or spawned where there is none) rather than forked from
+    this multithreaded process.
+    """
+    global _CHUNK_POOL
+    with _CHUNK_POOL_LOCK:
+        if _CHUNK_POOL is None:
+            import multiprocessing
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _CHUNK_POOL = ProcessPoolExecutor(
+                max_workers=LARGE_FILE_WORKERS,
+                mp_context=multiprocessing.get_context(method),
+                initializer=_ignore_sigint,
+            )
+        return _CHUNK_POOL
+
+
+def _reset_chunk_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a broken pool so the next chunked scan starts a fresh one."""
+    global _CHUNK_POOL
+    with _CHUNK_POOL_LOCK:
+        if _CHUNK_POOL is pool:
+            _CHUNK_POOL = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def chunk_bounds(buf: bytes, chunk_size: int) -> list[tuple[int, int]]:
+    """Split buf into [start, end) ranges of about chunk_size that end just after a newline."""
+    size = len(buf)
+    bounds = []
+    start = 0
+    while start < size:
+        end = buf.find(b"\n", min(start + chunk_size, size) - 1)
+        end = size if end < 0 else end + 1
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+
+def search_large_file(
+    path: str,
+    term: str,
+    limit: int,
+    chunk_size: int = LARGE_FILE_CHUNK,
+    workers: int = LARGE_FILE_WORKERS,
+    progress: "SearchProgress | None" = None,
+    rank: Callable[[str], float] | None = None,
+) -> tuple[int, list[tuple[int, str]]]:
+    """
+    Search one huge file in newline-aligned chunks on the shared process
+    pool (see _chunk_pool). Chunks are merged in file order, and their
+    newline counts give the line number offsets. At most two chunks per
+    worker are in flight, so memory stays bounded by the chunk size rather
+    than the file size. With a progress object the deadline is checked
+    between chunks and running chunks stop there, so the counts reached so
+    far come back. With rank (which must pickle) each chunk keeps its best
+    lines and the merge keeps the best limit of those.
+    """
+    deadline = progress.deadline if progress is not None else None
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        bounds = chunk_bounds(mm, chunk_size)
+
+    count = 0
+    lines: list[tuple[int, str]] = []
+    best: list = []
+    base = 0
+
+    def merge(result: tuple[int, list[tuple[int, str]], int]) -> None:
+        nonlocal count, base
+        n, chunk_lines, newlines = result
+        count += n
+        if rank is not None:
+            for lineno, text in chunk_lines:
+                _keep_best(best, limit, rank(text), base + lineno, text)
+        else:
+            lines.extend((base + lineno, text) for lineno, text in chunk_lines[:limit - len(lines)])
+        base += newlines
+
+    pool = _chunk_pool()
+    window: deque = deque()
+    try:
+        for start, end in bounds:
+            if progress is not None and progress.expired():
+                break
+            window.append(pool.submit(_scan_chunk, path, term, start, end, limit, deadline, rank))
+            if len(window) >= workers * 2:
+                merge(window.popleft().result())
+        while window:
+            merge(window.popleft().result())
+    except BrokenProcessPool:
+        _reset_chunk_pool(pool)
+        raise
+    finally:
+        for future in window:
+            future.cancel()
+    return count, _best_lines(best) if rank is not None else lines
+
+
+def search_file_context(
+    path: str,
+    find: Matcher,
+    limit: int,
+    context: int,
+    progress: "SearchProgress | None" = None,
+) -> tuple[int, list[tuple[int, str]], list[Block]]:
+    """search_file plus merged context blocks around the kept matches, from the same read."""
+    def scan(buf: bytes) -> tuple[int, list[tuple[int, str]], list[Block]]:
+        count, lines = scan_buffer(buf, find, limit, progress)
+        return count, lines, context_blocks(buf, [lineno for lineno, _ in lines], context)
+
+    return with_buffer(path, scan, (0, [], []))
+
+
+class SearchProgress:
+    """
+    Files scanned and skipped by a search and, if it stopped early, why. A search given
+    a progress object stops at its deadline or on Ctrl-C and keeps what it
+    found so far instead of raising.
+    """
+
+    def __init__(self, timeout: float | None = None) -> None:
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        self.scanned = 0
+        self.total: int | None = None
+        self.stopped: str | None = None
+        # Files left out by classification, per verdict (see doctor_classify)
+        self.skipped: dict[str, int] = {}
+
+    @property
+    def partial(self) -> bool:
+        """True if the search stopped before scanning every file."""
+        return self.stopped is not None
+
+    @property
+    def remaining(self) -> int | None:
+        """Files left unscanned, when the candidate list was known up front."""
+        if self.total is None:
+            return None
+        return self.total - self.scanned
+
+    def expired(self) -> bool:
+        """True once the deadline has passed (or the search was cancelled)."""
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def time_left(self) -> float | None:
+        """Seconds until the deadline, or None without one."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def stop(self, reason: str) -> None:
+        """Mark the search as partial ("timeout" or "interrupted")."""
+        self.stopped = self.stopped or reason
+
+    def cancel(self, reason: str) -> None:
+        """Stop a search running on another thread at its next check."""
+        self.stop(reason)
+        self.deadline = time.monotonic()
+
+
+def ordered_map(
+    fn: Callable,
+    items: Iterable,
+    workers: int = MAX_WORKERS,
+    progress: SearchProgress | None = None,
+) -> Iterator:
+    """
+    Apply fn across a thread pool, yielding results in input order. With a
+    progress object, results stop at its deadline or on Ctrl-C and the
+    stop is recorded on it rather than raised. Calls already running are
+    expected to stop at the deadline too (see scan_buffer); their partial
+    results are still yielded, in order, while pending ones are dropped.
+    """
+    if progress is not None and hasattr(items, "__len__"):
+        progress.total = len(items)
+    pool = ThreadPoolExecutor(max_workers=workers)
+    window: deque = deque()
+
+    def result() -> Any:
+        if progress is None:
+            return window.popleft().result()
+        value = window[0].result(timeout=progress.time_left())
+        window.popleft()
+        progress.scanned += 1
+        return value
+
+    try:
+        try:
+            for item in items:
+                if progress is not None and progress.time_left() == 0:
+                    raise futures.TimeoutError
+                window.append(pool.submit(fn, item))
+                if len(window) >= workers * 4:
+                    yield result()
+            while window:
+                yield result()
+            return
+        except (futures.TimeoutError, KeyboardInterrupt) as e:
+            if progress is None:
+                raise
+            # Moves the deadline to now, so running calls stop at their next check
+            progress.cancel("interrupted" if isinstance(e, KeyboardInterrupt) else "timeout")
+        while window and not window[0].cancel():
+            try:
+                value = window[0].result(timeout=STOP_GRACE)
+            except (futures.TimeoutError, KeyboardInterrupt):
+                break
+            window.popleft()
+            progress.scanned += 1
+            yield value
+    finally:
+        # Running scans are abandoned rather than awaited once a search stops early
+        pool.shutdown(wait=progress is None or not progress.partial, cancel_futures=True)
+
+
+def search_tree(
+    term: str,
+    path: str = ".",
+    file_type: str = "",
+    limit: int = 100,
+    files: Iterable[str] | None = None,
+    mode: str = "auto",
+    context: int = 0,
+    progress: SearchProgress | None = None,
+    keep: Callable[[str], bool] | None = None,
+    rank: Callable[[str, str], float] | None = None,
+) -> Iterator[FileResult]:
+    """
+    Search every file under path (or only the given candidate files) in
+    parallel. Yields (file, count, lines, blocks) for each file with at
+    least one match, in walk order; blocks holds merged windows of context
+    lines around the kept matches and is empty when context is 0. mode
+    selects how files are listed (see list_files). With progress, the
+    search stops early at its deadline or on Ctrl-C (see SearchProgress).
+    keep, if given, is called on each file by the worker about to scan it,
+    so its cost shares the deadline; files it rejects are not read. rank,
+    if given, scores a match as rank(file, text) and each file keeps its
+    limit best lines instead of its first ones; it must pickle, as huge
+    files are scored in the chunk workers.
+    """
+    find = compile_matcher(term)
+
+    def run(file: str) -> FileResult:
+        if keep is not None and not keep(file):
+            return file, 0, [], []
+        if context > 0:
+            return file, *search_file_context(file, find, limit, context, progress)
+        count, lines = search_file(file, find, limit, term, progress, partial(rank, file) if rank else None)
+        return file, count, lines, []
+
+    if files is None:
+        files = list_files(path, file_type, mode=mode)
+
+    for result in ordered_map(run, files, progress=progress):
+        if result[1]:
+            yield result
+
+
+def search_tree_many(
+    terms: list[str],
+    path: str = ".",
+    file_type: str = "",
+    limit: int = 100,
+    files: Iterable[str] | None = None,
+    mode: str = "auto",
+    progress: SearchProgress | None = None,
+    keep: Callable[[str], bool] | None = None,
+) -> Iterator[tuple[str, list[tuple[int, list[tuple[int, str]]]]]]:
+    """
+    Search every term in a single tree pass. Each file is read once; a
+    combined prefilter rejects files matching no term before the per-term
+    scans run. Yields (file, [(count, lines) per term]) for files with any
+    match, in walk order. keep filters files as in search_tree.
+    """
+    finders = [compile_matcher(term) for term in terms]
+    prefilter = compile_prefilter(terms)
+
+    def scan_all(buf: bytes) -> list[tuple[int, list[tuple[int, str]]]]:
+        # One prefilter pass cannot stop at a deadline, so it is kept to buffers of a segment
+        if prefilter is not None and len(buf) <= SCAN_SEGMENT and prefilter(buf, 0, len(buf)) < 0:
+            return []
+        return [scan_buffer(buf, find, limit, progress) for find in finders]
+
+    def run(file: str) -> tuple[str, list[tuple[int, list[tuple[int, str]]]]]:
+        if keep is not None and not keep(file):
+            return file, []
+        return file, with_buffer(file, scan_all, [])
+
+    if files is None:
+        files = list_files(path, file_type, mode=mode)
+
+    for file, per_term in ordered_map(run, files, progress=progress):
+        if any(count for count, _ in per_term):
+            yield file, per_term
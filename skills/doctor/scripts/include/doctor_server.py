@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Resident doctor process serving CLI commands over a Unix socket.
+
+`doctor serve` keeps one interpreter warm with PyYAML imported and the
+session and search index cached in memory. Running this module directly
+forwards a command to that server; it only uses the standard library so it
+starts without uv.
+"""
+
+import json
+import os
+import socket
+import sys
+from pathlib import Path
+
+
+SOCKET_FILE = Path(".doctor") / "doctor.sock"
+STOP_COMMAND = "__stop__"
+
+# Exit code telling skill.sh that no server answered and it should fall back.
+EXIT_UNAVAILABLE = 75
+
+# Long-running commands get their own process instead of blocking the server.
+LOCAL_COMMANDS = ("watch",)
+
+
+def run_command(argv: list[str], cwd: str) -> dict:
+    """Run one CLI command in-process and capture its output."""
+    import io
+    import traceback
+    from contextlib import redirect_stderr, redirect_stdout
+
+    import doctor_cli
+
+    out, err = io.StringIO(), io.StringIO()
+    prev = os.getcwd()
+    try:
+        os.chdir(cwd)
+        with redirect_stdout(out), redirect_stderr(err):
+            try:
+                code = doctor_cli.main(argv)
+            except SystemExit as e:
+                code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            except Exception:
+                traceback.print_exc()
+                code = 1
+    finally:
+        os.chdir(prev)
+    return {"code": code, "stdout": out.getvalue(), "stderr": err.getvalue()}
+
+
+def _connect(socket_path: Path, timeout: float | None = None) -> socket.socket | None:
+    """Connect to a running server, or return None."""
+    if not hasattr(socket, "AF_UNIX") or not socket_path.exists():
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(str(socket_path))
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def request(socket_path: Path, argv: list[str], cwd: str) -> dict | None:
+    """Send a command to the server. Returns None if no server answered."""
+    sock = _connect(socket_path)
+    if sock is None:
+        return None
+    with sock, sock.makefile("rwb") as stream:
+        stream.write(json.dumps({"argv": argv, "cwd": cwd}).encode("utf-8") + b"\n")
+        stream.flush()
+        line = stream.readline()
+    return json.loads(line) if line else None
+
+
+def serve(socket_path: Path = SOCKET_FILE) -> int:
+    """Serve commands one at a time until a stop request arrives."""
+    import socketserver
+
+    if not hasattr(socket, "AF_UNIX"):
+        print("error: doctor serve requires Unix domain sockets", file=sys.stderr)
+        return 1
+
+    socket_path = socket_path.resolve()
+    probe = _connect(socket_path, timeout=1.0)
+    if probe is not None:
+        probe.close()
+        print(f"error: server already running on {socket_path}", file=sys.stderr)
+        return 1
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    if socket_path.exists():
+        socket_path.unlink()
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            req = json.loads(self.rfile.readline() or b"{}")
+            argv = req.get("argv") or []
+            if argv == [STOP_COMMAND]:
+                self.server.stopping = True
+                response = {"code": 0, "stdout": "server stopped\n", "stderr": ""}
+            elif argv[:1] == ["serve"]:
+                response = {"code": 1, "stdout": "", "stderr": "error: server already running\n"}
+            else:
+                response = run_command(argv, req.get("cwd") or os.getcwd())
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+    # Preload the heavy imports so the first forwarded command is warm too
+    import doctor_cli  # noqa: F401
+
+    with socketserver.UnixStreamServer(str(socket_path), Handler) as server:
+        server.stopping = False
+        print(f"serving: {socket_path}", flush=True)
+        try:
+            while not server.stopping:
+                server.handle_request()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            socket_path.unlink(missing_ok=True)
+    return 0
+
+
+def stop(socket_path: Path = SOCKET_FILE) -> bool:
+    """Ask a running server to exit. Returns False if none was running."""
+    return request(socket_path, [STOP_COMMAND], os.getcwd()) is not None
+
+
+def main(argv: list[str]) -> int:
+    """Forward argv to a running server, printing its output."""
+    if argv[:1] and argv[0] in LOCAL_COMMANDS:
+        return EXIT_UNAVAILABLE
+    try:
+        response = request(SOCKET_FILE, argv, os.getcwd())
+    except (OSError, ValueError):
+        response = None
+    if response is None:
+        return EXIT_UNAVAILABLE
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+    return response["code"]
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
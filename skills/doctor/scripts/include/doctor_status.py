@@ -0,0 +1,79 @@
+"""
+Session summary sidecar. Writers refresh .doctor/status.json with the
+counts `doctor status` shows, tagged with the identity of session.yaml and
+the journal, so status can answer without loading PyYAML.
+"""
+
+import json
+import os
+import threading
+from typing import Any
+
+from doctor_config import EVIDENCE_DIR, JOURNAL_FILE, SESSION_FILE, STATUS_FILE, TREATMENT_FILE
+from doctor_evidence import EvidenceStore
+
+
+def session_identity() -> list[Any] | None:
+    """(mtime, size) of session.yaml and the journal; None without a session."""
+    identity: list[Any] = []
+    for path in (SESSION_FILE, JOURNAL_FILE):
+        try:
+            st = os.stat(path)
+        except OSError:
+            if path == SESSION_FILE:
+                return None
+            identity.append(None)
+            continue
+        identity.append([st.st_mtime_ns, st.st_size])
+    return identity
+
+
+def summarize(session: dict[str, Any]) -> dict[str, Any]:
+    """The session-derived part of the status."""
+    return {
+        "status": session.get("status", "investigating"),
+        "patient": session.get("patient", "unknown"),
+        "symptoms": len(session.get("symptoms", [])),
+        "hypotheses": len(session.get("hypotheses", [])),
+        "diagnosed": session.get("diagnosis") is not None,
+    }
+
+
+def save_summary(summary: dict[str, Any], identity: list[Any] | None) -> None:
+    """Write the sidecar for the session state identified by identity."""
+    if identity is None:
+        return
+    tmp = STATUS_FILE.with_name(f".{STATUS_FILE.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        tmp.write_text(json.dumps({"identity": identity, "summary": summary}), encoding="utf-8")
+        os.replace(tmp, STATUS_FILE)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+
+
+def load_summary(identity: list[Any]) -> dict[str, Any] | None:
+    """The sidecar summary, if it was written for exactly this session state."""
+    try:
+        data = json.loads(STATUS_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return data.get("summary") if data.get("identity") == identity else None
+
+
+def status_from(summary: dict[str, Any]) -> dict[str, Any]:
+    """Complete a summary with evidence and treatment state, as get_status returns it."""
+    return {
+        "exists": True,
+        **summary,
+        "evidence_files": EvidenceStore(EVIDENCE_DIR).count(),
+        "treated": TREATMENT_FILE.exists(),
+    }
+
+
+def fast_status() -> dict[str, Any] | None:
+    """Status from the sidecar alone; None when it is missing or stale."""
+    identity = session_identity()
+    if identity is None:
+        return {"exists": False}
+    summary = load_summary(identity)
+    return status_from(summary) if summary is not None else None
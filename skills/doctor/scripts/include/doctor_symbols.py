@@ -0,0 +1,433 @@
+"""Symbol table of definitions and references for doctor grep --def / --refs."""
+
+import ast
+import marshal
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from doctor_index import INDEX_MAX_FILE_SIZE, PARALLEL_MIN_FILES
+from doctor_search import BINARY_SNIFF_BYTES, list_files
+
+
+SYMBOLS_VERSION = 1
+TABLE_NAME = "table.bin"
+
+LANGUAGES = {
+    ".py": "python",
+    ".pyi": "python",
+    ".js": "js",
+    ".jsx": "js",
+    ".mjs": "js",
+    ".cjs": "js",
+    ".ts": "js",
+    ".tsx": "js",
+    ".yaml": "yaml",
+    ".yml": "yaml",
+}
+
+IDENTIFIER = re.compile(r"[A-Za-z_$][\w$]*")
+# Reserved words are never recorded as references
+JS_KEYWORDS = frozenset(
+    "abstract any as async await boolean break case catch class const constructor continue debugger "
+    "declare default delete do else enum export extends false finally for from function get if "
+    "implements import in instanceof interface keyof let module namespace never new null number "
+    "object of private protected public readonly return set static string super switch this throw "
+    "true try type typeof undefined unknown var void while with yield".split()
+)
+YAML_WORDS = frozenset({"true", "false", "yes", "no", "on", "off", "null"})
+
+_JS_STRING = re.compile(r"\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'|`(?:\\.|[^`\\])*`")
+# (pattern, kind, where): "module" bindings only count at brace depth 0, methods only inside a block
+_JS_DEFS = (
+    (re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*([A-Za-z_$][\w$]*)"), "function", "any"),
+    (re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:abstract\s+)?class\s+([A-Za-z_$][\w$]*)"), "class", "any"),
+    (re.compile(r"^\s*(?:export\s+)?(?:declare\s+)?interface\s+([A-Za-z_$][\w$]*)"), "interface", "any"),
+    (re.compile(r"^\s*(?:export\s+)?(?:declare\s+)?type\s+([A-Za-z_$][\w$]*)\s*(?:<[^=]*>)?\s*="), "type", "any"),
+    (re.compile(r"^\s*(?:export\s+)?(?:declare\s+)?(?:const\s+)?enum\s+([A-Za-z_$][\w$]*)"), "enum", "any"),
+    (
+        re.compile(
+            r"^\s*(?:export\s+)?(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*(?::[^=]+)?="
+            r"\s*(?:async\s+)?(?:function\b|\([^)]*\)\s*(?::[^=]+)?=>|[A-Za-z_$][\w$]*\s*=>)"
+        ),
+        "function",
+        "module",
+    ),
+    (re.compile(r"^\s*(?:export\s+)?(?:const|let|var)\s+([A-Za-z_$][\w$]*)"), "variable", "module"),
+    (
+        re.compile(
+            r"^\s*(?:(?:public|private|protected|static|async|readonly|override|get|set)\s+)*"
+            r"\*?([A-Za-z_$][\w$]*)\s*(?:<[^>]*>)?\s*\([^)]*\)\s*(?::\s*[^{;]+)?\{"
+        ),
+        "method",
+        "block",
+    ),
+)
+_YAML_KEY = re.compile(r"^(\s*)(?:-\s+)?([\"']?)([^\s#\"'{}\[\],&*!|>%@`][^:#]*?)\2\s*:(?:\s+|$)")
+
+
+def language(path: str) -> str | None:
+    """Language parsed for path, by extension."""
+    return LANGUAGES.get(os.path.splitext(path)[1].lower())
+
+
+def _add_ref(refs: dict[str, list[int]], name: str, line: int) -> None:
+    """Record one reference line, once per line."""
+    lines = refs.setdefault(name, [])
+    if not lines or lines[-1] != line:
+        lines.append(line)
+
+
+def _token_refs(text: str, refs: dict[str, list[int]], skip: frozenset[str], first_line: int = 1) -> None:
+    """Record every identifier in text as a reference."""
+    for offset, line in enumerate(text.splitlines()):
+        for name in IDENTIFIER.findall(line):
+            if name not in skip and len(name) > 1:
+                _add_ref(refs, name, first_line + offset)
+
+
+class _PythonVisitor(ast.NodeVisitor):
+    """Collect definitions with their qualified scope, and name and attribute uses."""
+
+    def __init__(self) -> None:
+        self.defs: list[list[Any]] = []
+        self.refs: dict[str, list[int]] = {}
+        self.scope: list[tuple[str, str]] = []
+
+    def _define(self, name: str, kind: str, line: int) -> None:
+        qualified = ".".join([s for s, _ in self.scope] + [name])
+        self.defs.append([name, kind, line, qualified])
+
+    def _visit_function(self, node: ast.FunctionDef | ast.AsyncFunctionDef) -> None:
+        in_class = bool(self.scope) and self.scope[-1][1] == "class"
+        self._define(node.name, "method" if in_class else "function", node.lineno)
+        for decorator in node.decorator_list:
+            self.visit(decorator)
+        self.visit(node.args)
+        if node.returns is not None:
+            self.visit(node.returns)
+        self.scope.append((node.name, "function"))
+        for child in node.body:
+            self.visit(child)
+        self.scope.pop()
+
+    visit_FunctionDef = _visit_function
+    visit_AsyncFunctionDef = _visit_function
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        self._define(node.name, "class", node.lineno)
+        for child in node.decorator_list + node.bases + node.keywords:
+            self.visit(child)
+        self.scope.append((node.name, "class"))
+        for child in node.body:
+            self.visit(child)
+        self.scope.pop()
+
+    def _visit_assign(self, node: ast.Assign | ast.AnnAssign) -> None:
+        # Module and class level names are definitions; locals are not
+        if not self.scope or self.scope[-1][1] == "class":
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            for target in targets:
+                for name in ast.walk(target):
+                    if isinstance(name, ast.Name):
+                        self._define(name.id, "variable", name.lineno)
+        self.generic_visit(node)
+
+    visit_Assign = _visit_assign
+    visit_AnnAssign = _visit_assign
+
+    def visit_Import(self, node: ast.Import | ast.ImportFrom) -> None:
+        for alias in node.names:
+            _add_ref(self.refs, alias.name.rsplit(".", 1)[-1], node.lineno)
+
+    visit_ImportFrom = visit_Import
+
+    def visit_Name(self, node: ast.Name) -> None:
+        if not isinstance(node.ctx, ast.Store):
+            _add_ref(self.refs, node.id, node.lineno)
+
+    def visit_Attribute(self, node: ast.Attribute) -> None:
+        _add_ref(self.refs, node.attr, node.end_lineno or node.lineno)
+        self.visit(node.value)
+
+
+def parse_python(text: str) -> tuple[list[list[Any]], dict[str, list[int]]]:
+    """Definitions and references of Python source; tokens only if it does not parse."""
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        refs: dict[str, list[int]] = {}
+        _token_refs(text, refs, frozenset())
+        return [], refs
+    visitor = _PythonVisitor()
+    visitor.visit(tree)
+    return visitor.defs, {name: sorted(set(lines)) for name, lines in visitor.refs.items()}
+
+
+def parse_js(text: str) -> tuple[list[list[Any]], dict[str, list[int]]]:
+    """
+    Definitions and references of JS/TS source, line by line without a full
+    parser. Brace depth tells module-level bindings from locals.
+    """
+    defs: list[list[Any]] = []
+    refs: dict[str, list[int]] = {}
+    in_comment = False
+    depth = 0
+    for lineno, line in enumerate(text.splitlines(), 1):
+        if in_comment:
+            end = line.find("*/")
+            if end < 0:
+                continue
+            line = line[end + 2:]
+            in_comment = False
+        line = _JS_STRING.sub('""', line)
+        while "/*" in line:
+            start = line.index("/*")
+            end = line.find("*/", start + 2)
+            if end < 0:
+                line = line[:start]
+                in_comment = True
+                break
+            line = line[:start] + " " + line[end + 2:]
+        line = line.split("//", 1)[0]
+
+        defined = None
+        for pattern, kind, where in _JS_DEFS:
+            if (where == "module" and depth) or (where == "block" and not depth):
+                continue
+            m = pattern.match(line)
+            if m and m.group(1) not in JS_KEYWORDS:
+                defined = m.group(1)
+                defs.append([defined, kind, lineno, defined])
+                break
+        for name in IDENTIFIER.findall(line):
+            if name != defined and name not in JS_KEYWORDS and len(name) > 1:
+                _add_ref(refs, name, lineno)
+        depth = max(0, depth + line.count("{") - line.count("}"))
+    return defs, refs
+
+
+def parse_yaml(text: str) -> tuple[list[list[Any]], dict[str, list[int]]]:
+    """Mapping keys (qualified by their parent keys) and identifiers used in values."""
+    defs: list[list[Any]] = []
+    refs: dict[str, list[int]] = {}
+    parents: list[tuple[int, str]] = []
+    for lineno, line in enumerate(text.splitlines(), 1):
+        if not line.strip() or line.lstrip().startswith(("#", "---", "...")):
+            continue
+        m = _YAML_KEY.match(line)
+        value = line
+        if m:
+            # A key opening a list item ("- name: x") nests one level deeper than the dash
+            indent = len(m.group(1)) + (2 if line[len(m.group(1)):].startswith("-") else 0)
+            key = m.group(3).strip()
+            while parents and parents[-1][0] >= indent:
+                parents.pop()
+            qualified = ".".join([p for _, p in parents] + [key])
+            defs.append([key, "key", lineno, qualified])
+            parents.append((indent, key))
+            value = line[m.end():]
+        _token_refs(value.split(" #", 1)[0], refs, YAML_WORDS, lineno)
+    return defs, refs
+
+
+PARSERS = {"python": parse_python, "js": parse_js, "yaml": parse_yaml}
+
+
+def encode(defs: list[list[Any]], refs: dict[str, list[int]]) -> tuple[str, str]:
+    """
+    Pack one file's symbols as text: defs as "\nname<TAB>kind<TAB>line<TAB>qualified"
+    records and refs as "\nname line,line,..." records. Lookups are then
+    str.find calls, and the table loads as a few strings per file.
+    """
+    def_text = "".join(
+        f"\n{name.replace(chr(9), ' ')}\t{kind}\t{line}\t{qualified.replace(chr(9), ' ')}"
+        for name, kind, line, qualified in defs
+    )
+    ref_text = "".join(f"\n{name} {','.join(map(str, lines))}" for name, lines in refs.items())
+    return def_text + "\n", ref_text + "\n"
+
+
+def parse_file(path: str) -> tuple[str, str] | None:
+    """
+    Encoded definitions and references of one file, or None if it cannot
+    be read, is binary or too large.
+    """
+    lang = language(path)
+    if lang is None:
+        return None
+    try:
+        with open(path, "rb") as f:
+            data = f.read(INDEX_MAX_FILE_SIZE + 1)
+    except OSError:
+        return None
+    if len(data) > INDEX_MAX_FILE_SIZE or b"\0" in data[:BINARY_SNIFF_BYTES]:
+        return None
+    return encode(*PARSERS[lang](data.decode("utf-8", errors="replace")))
+
+
+def _records(text: str, needle: str) -> Iterator[str]:
+    """Each encoded record in text containing needle (which carries its own delimiters)."""
+    pos = text.find(needle)
+    while pos >= 0:
+        start = text.rfind("\n", 0, pos + 1) + 1
+        end = text.find("\n", pos + 1)
+        yield text[start:end]
+        pos = text.find(needle, end)
+
+
+class SymbolTable:
+    """
+    Definitions and references per file under one root, keyed by path,
+    mtime and size. Each entry is [mtime, size, defs, refs] with defs and
+    refs packed as text by encode(). Stored with marshal in a single file.
+    """
+
+    def __init__(self, symbols_dir: Path, root: str) -> None:
+        self.symbols_dir = symbols_dir
+        self.root = os.path.abspath(root)
+        self.files: dict[str, list[Any]] = {}
+
+    @staticmethod
+    def path(symbols_dir: Path) -> Path:
+        """The file holding a table on disk."""
+        return symbols_dir / TABLE_NAME
+
+    @classmethod
+    def load(cls, symbols_dir: Path) -> "SymbolTable | None":
+        """Load the table from disk, or None if missing or incompatible."""
+        try:
+            data = marshal.loads(cls.path(symbols_dir).read_bytes())
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != SYMBOLS_VERSION:
+            return None
+        table = cls(symbols_dir, data["root"])
+        table.files = data["files"]
+        return table
+
+    def save(self) -> None:
+        """Write the table atomically."""
+        self.symbols_dir.mkdir(parents=True, exist_ok=True)
+        path = self.path(self.symbols_dir)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(marshal.dumps({"version": SYMBOLS_VERSION, "root": self.root, "files": self.files}))
+        os.replace(tmp, path)
+
+    def covers(self, path: str) -> bool:
+        """True if path lies under the table's root."""
+        abs_path = os.path.abspath(path)
+        return abs_path == self.root or abs_path.startswith(self.root + os.sep)
+
+    def _walk(self) -> list[str]:
+        """Parseable files under root relative to root, from git when root is a work tree."""
+        root = self.root.rstrip(os.sep) + os.sep
+        rels = []
+        for path in list_files(self.root):
+            if language(path):
+                path = os.path.abspath(path)
+                rels.append(path[len(root):] if path.startswith(root) else os.path.relpath(path, self.root))
+        return rels
+
+    def _parse(self, stats: list[tuple[str, int, int]]) -> None:
+        """Parse files (on a process pool when there are many) and store their entries."""
+        paths = [os.path.join(self.root, rel) for rel, _, _ in stats]
+        if len(paths) < PARALLEL_MIN_FILES:
+            self._store(stats, map(parse_file, paths))
+            return
+        with ProcessPoolExecutor() as pool:
+            self._store(stats, pool.map(parse_file, paths, chunksize=32))
+
+    def _store(self, stats: list[tuple[str, int, int]], results: Iterable[tuple[str, str] | None]) -> None:
+        """Record parse results; unparseable files keep an empty entry so they are not re-read."""
+        for (rel, mtime, size), parsed in zip(stats, results):
+            defs, refs = parsed or ("\n", "\n")
+            self.files[rel] = [mtime, size, defs, refs]
+
+    def build(self) -> int:
+        """Parse every file under root from scratch. Returns the number of files."""
+        self.files = {}
+        self.update()
+        return len(self.files)
+
+    def update(self) -> dict[str, int]:
+        """Re-parse files whose mtime or size changed and drop deleted ones."""
+        changed = []
+        seen = set()
+        for rel in self._walk():
+            try:
+                st = os.stat(os.path.join(self.root, rel))
+            except OSError:
+                continue
+            seen.add(rel)
+            entry = self.files.get(rel)
+            if entry is None or entry[0] != st.st_mtime_ns or entry[1] != st.st_size:
+                changed.append((rel, st.st_mtime_ns, st.st_size))
+        removed = [rel for rel in self.files if rel not in seen]
+        for rel in removed:
+            del self.files[rel]
+
+        if changed or removed:
+            self._parse(changed)
+            self.save()
+        return {"changed": len(changed), "removed": len(removed), "files": len(self.files)}
+
+    def _entries(self, path: str, file_type: str) -> Iterator[tuple[str, list[Any]]]:
+        """
+        (path as the tree walk formats it, entry) for files under path, or
+        for path itself when it names a file, in path order.
+        """
+        prefix = os.path.relpath(os.path.abspath(path), self.root)
+        suffix = f".{file_type.lstrip('.')}" if file_type else ""
+        for rel in sorted(self.files, key=lambda r: r.split(os.sep)):
+            if not rel.endswith(suffix):
+                continue
+            if prefix == ".":
+                yield os.path.join(path, rel), self.files[rel]
+            elif rel == prefix:
+                yield path, self.files[rel]
+            elif rel.startswith(prefix + os.sep):
+                yield os.path.join(path, rel[len(prefix) + 1:]), self.files[rel]
+
+    def definitions(self, name: str, path: str = ".", file_type: str = "") -> list[dict[str, Any]]:
+        """
+        Where name is defined. A dotted name (Class.method, a.b.key) matches
+        the qualified name; a plain one matches definitions of that name in
+        any scope.
+        """
+        needle = f"\t{name}\n" if "." in name else f"\n{name}\t"
+        found = []
+        for file, entry in self._entries(path, file_type):
+            if needle not in entry[2]:
+                continue
+            for record in _records(entry[2], needle):
+                defined, kind, line, qualified = record.split("\t")
+                if (qualified if "." in name else defined) == name:
+                    found.append({"file": file, "line": int(line), "kind": kind, "symbol": qualified})
+        return found
+
+    def references(self, name: str, path: str = ".", file_type: str = "") -> list[dict[str, Any]]:
+        """Lines using name (the last part of a dotted name): calls, reads and attribute access."""
+        needle = f"\n{name.rsplit('.', 1)[-1]} "
+        found = []
+        for file, entry in self._entries(path, file_type):
+            pos = entry[3].find(needle)
+            if pos < 0:
+                continue
+            lines = entry[3][pos + len(needle):entry[3].find("\n", pos + 1)]
+            found.extend({"file": file, "line": int(line)} for line in lines.split(","))
+        return found
+
+    def stats(self) -> dict[str, Any]:
+        """Files, definitions and distinct referenced names in the table."""
+        names = set()
+        for entry in self.files.values():
+            names.update(record.split(" ", 1)[0] for record in entry[3].split("\n") if record)
+        return {
+            "root": self.root,
+            "files": len(self.files),
+            "definitions": sum(entry[2].count("\n") - 1 for entry in self.files.values()),
+            "names": len(names),
+        }
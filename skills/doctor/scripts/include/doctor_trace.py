@@ -0,0 +1,156 @@
+"""Per-phase timing for doctor commands."""
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator, TextIO
+
+# Environment switch: DOCTOR_TRACE=1 (or summary|trace|cprofile) traces every command.
+TRACE_ENV = "DOCTOR_TRACE"
+# Epoch nanoseconds taken by the launcher before starting Python, to time uv/interpreter startup.
+TRACE_T0_ENV = "DOCTOR_TRACE_T0"
+TRACE_MODES = ("summary", "trace", "cprofile")
+
+_lock = threading.Lock()
+_enabled = False
+_origin = 0.0
+_spans: list[tuple[str, float, float, int]] = []
+
+
+def env_mode() -> str | None:
+    """Tracing mode requested through DOCTOR_TRACE, if any."""
+    value = os.environ.get(TRACE_ENV, "").strip().lower()
+    if value in ("", "0", "false", "no", "off"):
+        return None
+    return value if value in TRACE_MODES else "trace"
+
+
+def enable() -> None:
+    """Start collecting spans, discarding any from a previous command."""
+    global _enabled, _origin
+    with _lock:
+        _spans.clear()
+        _origin = time.perf_counter()
+        _enabled = True
+
+
+def disable() -> None:
+    """Stop collecting spans."""
+    global _enabled
+    _enabled = False
+
+
+def enabled() -> bool:
+    """Return True while spans are being collected."""
+    return _enabled
+
+
+def record(name: str, start: float, end: float) -> None:
+    """Record a span from perf_counter timestamps."""
+    if _enabled:
+        with _lock:
+            _spans.append((name, start, end, threading.get_ident()))
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time the enclosed block as one phase. Free when tracing is off."""
+    if not _enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, start, time.perf_counter())
+
+
+def traced(name: str) -> Callable[[Callable], Callable]:
+    """Decorator form of span()."""
+    def wrap(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def inner(*args: Any, **kwargs: Any) -> Any:
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with span(name):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+def record_startup(import_start: float, import_start_ns: int) -> None:
+    """
+    Record launcher-to-interpreter startup when the launcher exported
+    DOCTOR_TRACE_T0, ending where module imports began.
+    """
+    try:
+        t0_ns = int(os.environ.get(TRACE_T0_ENV, ""))
+    except ValueError:
+        return
+    elapsed = (import_start_ns - t0_ns) / 1e9
+    if 0 < elapsed < 3600:
+        record("startup", import_start - elapsed, import_start)
+
+
+def spans() -> list[tuple[str, float, float, int]]:
+    """Collected spans as (name, start, end, thread id), in start order."""
+    with _lock:
+        return sorted(_spans, key=lambda s: s[1])
+
+
+def elapsed(end: float) -> float:
+    """Seconds from the earliest recorded span (or enable()) to end."""
+    return end - min([_origin] + [s[1] for s in spans()])
+
+
+def summary(total: float) -> list[tuple[str, int, float, float]]:
+    """
+    Aggregate spans by name into (name, calls, milliseconds, percent of
+    total), slowest first. Nested phases are counted inside their parents too.
+    """
+    totals: dict[str, list[float]] = {}
+    for name, start, end, _ in spans():
+        entry = totals.setdefault(name, [0, 0.0])
+        entry[0] += 1
+        entry[1] += end - start
+    rows = [
+        (name, int(calls), seconds * 1000, 100 * seconds / total if total > 0 else 0.0)
+        for name, (calls, seconds) in totals.items()
+    ]
+    rows.sort(key=lambda r: -r[2])
+    return rows
+
+
+def print_summary(total: float, out: TextIO = sys.stderr) -> None:
+    """Print the per-phase table followed by the command total."""
+    print(f"\n{'phase':<18} {'calls':>5} {'ms':>10} {'%':>6}", file=out)
+    for name, calls, ms, percent in summary(total):
+        print(f"{name:<18} {calls:>5} {ms:>10.1f} {percent:>5.1f}%", file=out)
+    print(f"{'total':<18} {'':>5} {total * 1000:>10.1f} {100.0:>5.1f}%", file=out)
+
+
+def write_chrome_trace(path: Path, metadata: dict[str, Any] | None = None) -> Path:
+    """Write spans as Chrome trace events (chrome://tracing, Perfetto)."""
+    pid = os.getpid()
+    collected = spans()
+    origin = min([_origin] + [s[1] for s in collected])
+    tids: dict[int, int] = {}
+    events = []
+    for name, start, end, ident in collected:
+        events.append({
+            "name": name,
+            "ph": "X",
+            "ts": round((start - origin) * 1e6, 1),
+            "dur": round((end - start) * 1e6, 1),
+            "pid": pid,
+            "tid": tids.setdefault(ident, len(tids)),
+        })
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {"traceEvents": events, "displayTimeUnit": "ms", "otherData": metadata or {}}
+    path.write_text(json.dumps(payload, indent=1), encoding="utf-8")
+    return path
@@ -0,0 +1,247 @@
+"""File system watching for doctor watch: inotify on Linux, polling elsewhere."""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import stat
+import struct
+import time
+from typing import Callable, Iterable
+
+from doctor_config import WATCH_DEBOUNCE
+from doctor_search import EXCLUDE_DIRS
+
+
+# Longest a busy stream of events can hold a batch open.
+WATCH_MAX_DELAY = 2.0
+POLL_INTERVAL = 2.0
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_ONLYDIR
+EVENT = struct.Struct("iIII")
+
+
+def _walk_dirs(root: str, rel: str, excluded: frozenset[str]) -> Iterable[tuple[str, list[str]]]:
+    """Yield (relative dir, relative files) for rel and every directory below it."""
+    stack = [rel]
+    while stack:
+        current = stack.pop()
+        files = []
+        try:
+            with os.scandir(os.path.join(root, current)) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in excluded:
+                                stack.append(os.path.join(current, entry.name))
+                        elif entry.is_file(follow_symlinks=False):
+                            files.append(os.path.join(current, entry.name))
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+        yield current, files
+
+
+class InotifyWatcher:
+    """
+    Recursive inotify watch over root. Directories created or moved in are
+    watched as they appear and their files reported; excluded directories
+    (.doctor, .git, ...) are never watched, so doctor's own writes do not
+    feed back.
+    """
+
+    name = "inotify"
+
+    def __init__(self, root: str, exclude_dirs: Iterable[str] = EXCLUDE_DIRS) -> None:
+        self.root = os.path.abspath(root)
+        self.excluded = frozenset(exclude_dirs)
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs: dict[int, str] = {}
+        self.overflowed = False
+        try:
+            self._add_tree("")
+        except OSError:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        """Release the inotify descriptor and its watches."""
+        os.close(self.fd)
+
+    def _add_tree(self, rel: str) -> list[str]:
+        """Watch rel and its subdirectories. Returns the files found in them."""
+        found = []
+        for current, files in _walk_dirs(self.root, rel, self.excluded):
+            path = os.path.join(self.root, current) if current else self.root
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+            if wd < 0:
+                errno = ctypes.get_errno()
+                if errno == 28:  # ENOSPC: fs.inotify.max_user_watches reached
+                    raise OSError(errno, "inotify watch limit reached")
+                continue
+            self.dirs[wd] = current
+            found.extend(files)
+        return found
+
+    def _drop_tree(self, rel: str) -> None:
+        """Forget watches for rel and below after it moved away."""
+        prefix = rel + os.sep
+        for wd, current in list(self.dirs.items()):
+            if current == rel or current.startswith(prefix):
+                self.libc.inotify_rm_watch(self.fd, wd)
+                del self.dirs[wd]
+
+    def read(self, timeout: float | None) -> set[str]:
+        """
+        Wait up to timeout for events and return the relative paths they
+        touched. Removed directories are reported by their own path. Sets
+        overflowed if the kernel queue overflowed and events were lost.
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed: set[str] = set()
+        offset = 0
+        while offset + EVENT.size <= len(data):
+            wd, mask, _, length = EVENT.unpack_from(data, offset)
+            raw = data[offset + EVENT.size:offset + EVENT.size + length].rstrip(b"\0")
+            offset += EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                self.overflowed = True
+                continue
+            if mask & IN_IGNORED:
+                self.dirs.pop(wd, None)
+                continue
+            parent = self.dirs.get(wd)
+            if parent is None or not raw:
+                continue
+            name = os.fsdecode(raw)
+            rel = os.path.join(parent, name) if parent else name
+            if mask & IN_ISDIR:
+                if name in self.excluded:
+                    continue
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    changed.update(self._add_tree(rel))
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self._drop_tree(rel)
+                    changed.add(rel)
+                continue
+            changed.add(rel)
+        return changed
+
+
+class PollingWatcher:
+    """Fallback watcher: re-stat the tree every interval and diff (mtime, size) per file."""
+
+    name = "polling"
+
+    def __init__(self, root: str, exclude_dirs: Iterable[str] = EXCLUDE_DIRS, interval: float = POLL_INTERVAL) -> None:
+        self.root = os.path.abspath(root)
+        self.excluded = frozenset(exclude_dirs)
+        self.interval = interval
+        self.overflowed = False
+        self.next_poll = time.monotonic() + interval
+        self.state = self._snapshot()
+
+    def close(self) -> None:
+        """Nothing to release."""
+
+    def _snapshot(self) -> dict[str, tuple[int, int]]:
+        """(mtime, size) of every regular file under root."""
+        state = {}
+        for _, files in _walk_dirs(self.root, "", self.excluded):
+            for rel in files:
+                try:
+                    st = os.lstat(os.path.join(self.root, rel))
+                except OSError:
+                    continue
+                if stat.S_ISREG(st.st_mode):
+                    state[rel] = (st.st_mtime_ns, st.st_size)
+        return state
+
+    def read(self, timeout: float | None) -> set[str]:
+        """Sleep until the next poll (or timeout) and return files that changed since the last one."""
+        wait = self.next_poll - time.monotonic()
+        if timeout is not None and timeout < wait:
+            time.sleep(max(0.0, timeout))
+            return set()
+        time.sleep(max(0.0, wait))
+        self.next_poll = time.monotonic() + self.interval
+        state = self._snapshot()
+        changed = {rel for rel, sig in state.items() if self.state.get(rel) != sig}
+        changed.update(rel for rel in self.state if rel not in state)
+        self.state = state
+        return changed
+
+
+def open_watcher(root: str, poll: bool = False, interval: float = POLL_INTERVAL) -> InotifyWatcher | PollingWatcher:
+    """inotify watcher where available, else the polling fallback."""
+    if not poll and os.name == "posix":
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError):
+            # Not Linux, no inotify in libc, or too many directories to watch
+            pass
+    return PollingWatcher(root, interval=interval)
+
+
+def watch_loop(
+    watcher: InotifyWatcher | PollingWatcher,
+    on_batch: Callable[[set[str] | None], None],
+    debounce: float = WATCH_DEBOUNCE,
+    max_delay: float = WATCH_MAX_DELAY,
+) -> None:
+    """
+    Collect events into batches and hand each to on_batch once the tree has
+    been quiet for debounce seconds, or max_delay after the batch opened.
+    on_batch gets None when events were lost and a full resync is needed.
+    Runs until interrupted; a pending batch is flushed before returning.
+    """
+    pending: set[str] = set()
+    opened = 0.0
+    try:
+        while True:
+            timeout = None
+            if pending or watcher.overflowed:
+                timeout = max(0.0, min(debounce, opened + max_delay - time.monotonic()))
+            events = watcher.read(timeout)
+            now = time.monotonic()
+            if events:
+                if not pending:
+                    opened = now
+                pending |= events
+                if now - opened < max_delay:
+                    continue
+            if watcher.overflowed:
+                watcher.overflowed = False
+                pending.clear()
+                on_batch(None)
+            elif pending:
+                batch, pending = pending, set()
+                on_batch(batch)
+    except KeyboardInterrupt:
+        if pending:
+            on_batch(pending)
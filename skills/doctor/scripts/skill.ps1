@@ -2,11 +2,28 @@ $ErrorActionPreference = "Stop"
 
 $ScriptDir = Split-Path -Parent $MyInvocation.MyCommand.Path
 $IncludeDir = Join-Path $ScriptDir "include"
+$Bundle = Join-Path $ScriptDir "dist/doctor.pyz"
+
+# Run the CLI from the bundle built by build_bundle.py while no source is newer; otherwise through uv.
+function Invoke-Cli {
+    param([string[]]$Arguments)
+
+    $python = Get-Command python -ErrorAction SilentlyContinue
+    if ($python -and (Test-Path $Bundle)) {
+        $built = (Get-Item $Bundle).LastWriteTime
+        $stale = Get-ChildItem (Join-Path $IncludeDir "*.py") | Where-Object { $_.LastWriteTime -gt $built } | Select-Object -First 1
+        if (-not $stale) {
+            & $python.Source $Bundle @Arguments
+            return
+        }
+    }
+    & uv run python doctor_cli.py @Arguments
+}
 
 function Show-Help {
     Push-Location $IncludeDir
     try {
-        & uv run python doctor_cli.py help
+        Invoke-Cli -Arguments @("help")
     } finally {
         Pop-Location
     }
@@ -41,9 +58,14 @@ function Invoke-Validate {
 function Invoke-Dispatch {
     param([string[]]$Arguments)
     
+    # With --profile or DOCTOR_TRACE, let the trace include time spent before Python starts.
+    if ($env:DOCTOR_TRACE -or ($Arguments | Where-Object { $_ -like "--profile*" })) {
+        $env:DOCTOR_TRACE_T0 = [string]([DateTimeOffset]::UtcNow.ToUnixTimeMilliseconds() * 1000000)
+    }
+    
     Push-Location $IncludeDir
     try {
-        & uv run python doctor_cli.py @Arguments
+        Invoke-Cli -Arguments $Arguments
     } finally {
         Pop-Location
     }
@@ -54,7 +76,8 @@ $command = if ($args.Count -gt 0) { $args[0] } else { "help" }
 switch ($command) {
     "help" { Show-Help }
     "validate" { Invoke-Validate }
-    { $_ -in @("status", "init", "surface", "grep", "symptom", "intake", "hypothesize", "diagnose", "treat", "clean") } {
+    "serve" { Invoke-Dispatch -Arguments $args }
+    { $_ -in @("status", "init", "surface", "grep", "run", "cache", "evidence", "logs", "index", "symbols", "watch", "symptom", "intake", "hypothesize", "diagnose", "treat", "compact", "clean", "archive", "recall") } {
         Invoke-Dispatch -Arguments $args
     }
     default {
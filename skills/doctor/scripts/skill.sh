@@ -3,10 +3,23 @@ set -euo pipefail
 
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 INCLUDE_DIR="$SCRIPT_DIR/include"
+SOCKET_FILE="$INCLUDE_DIR/.doctor/doctor.sock"
+BUNDLE="$SCRIPT_DIR/dist/doctor.pyz"
+EXIT_UNAVAILABLE=75
+
+# Run the CLI from the bundle built by build_bundle.py while no source is newer; otherwise through uv.
+run_cli() {
+    if [[ -f "$BUNDLE" ]] && command -v python3 &>/dev/null \
+        && [[ -z "$(find "$INCLUDE_DIR" -maxdepth 1 -name '*.py' -newer "$BUNDLE" -print -quit)" ]]; then
+        python3 "$BUNDLE" "$@"
+    else
+        uv run python doctor_cli.py "$@"
+    fi
+}
 
 cmd_help() {
     cd "$INCLUDE_DIR"
-    uv run python doctor_cli.py help
+    run_cli help
 }
 
 cmd_validate() {
@@ -36,7 +49,28 @@ cmd_validate() {
 
 cmd_dispatch() {
     cd "$INCLUDE_DIR"
-    uv run python doctor_cli.py "$@"
+
+    # With --profile or DOCTOR_TRACE, let the trace include time spent before Python starts.
+    if [[ -n "${DOCTOR_TRACE:-}" || " $* " == *" --profile"* ]]; then
+        DOCTOR_TRACE_T0="$(date +%s%N)"
+        export DOCTOR_TRACE_T0
+    fi
+
+    # Forward to a running 'doctor serve' process; fall back when none answers.
+    if [[ -S "$SOCKET_FILE" ]] && command -v python3 &>/dev/null; then
+        local code=0
+        python3 doctor_server.py "$@" || code=$?
+        if [[ $code -ne $EXIT_UNAVAILABLE ]]; then
+            return $code
+        fi
+    fi
+
+    run_cli "$@"
+}
+
+cmd_serve() {
+    cd "$INCLUDE_DIR"
+    run_cli serve "$@"
 }
 
 case "${1:-help}" in
@@ -46,7 +80,11 @@ case "${1:-help}" in
     validate)
         cmd_validate
         ;;
-    status|init|surface|grep|symptom|intake|hypothesize|diagnose|treat|clean)
+    serve)
+        shift
+        cmd_serve "$@"
+        ;;
+    status|init|surface|grep|run|cache|evidence|logs|index|symbols|watch|symptom|intake|hypothesize|diagnose|treat|compact|clean|archive|recall)
         cmd_dispatch "$@"
         ;;
     *)